@@ -0,0 +1,101 @@
+# app/db/pool.py
+
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+
+
+class MetricasPool:
+    """Contadores de checkout de conexões de um pool (tempo de espera e timeouts)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+
+    def registrar(self, espera: float, timeout: bool = False) -> None:
+        with self._lock:
+            if timeout:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.espera_total += espera
+            self.espera_maxima = max(self.espera_maxima, espera)
+
+    def resumo(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.espera_total / total * 1000, 3) if total else 0.0,
+                "max_wait_ms": round(self.espera_maxima * 1000, 3)
+            }
+
+
+class _CheckoutMedido:
+    """Mede o tempo de cada checkout (espera por conexão livre, conexão nova e pre-ping)."""
+
+    metricas: MetricasPool
+
+    def connect(self):
+        inicio = time.perf_counter()
+        try:
+            conexao = super().connect()
+        except exc.TimeoutError:
+            self.metricas.registrar(time.perf_counter() - inicio, timeout=True)
+            raise
+        self.metricas.registrar(time.perf_counter() - inicio)
+        return conexao
+
+
+# As métricas ficam na classe porque o SQLAlchemy recria o pool (dispose/recreate)
+class QueuePoolMedido(_CheckoutMedido, QueuePool):
+    metricas = MetricasPool()
+
+
+class AsyncQueuePoolMedido(_CheckoutMedido, AsyncAdaptedQueuePool):
+    metricas = MetricasPool()
+
+
+def opcoes_engine(url: str, assincrono: bool = False) -> Dict[str, Any]:
+    """
+    Argumentos de create_engine/create_async_engine a partir de Settings.
+    O SQLite mantém o pool padrão do SQLAlchemy, que não aceita as opções de
+    dimensionamento.
+    """
+    opcoes: Dict[str, Any] = {"query_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    if make_url(url).get_backend_name() == 'sqlite':
+        return opcoes
+    opcoes.update(
+        poolclass=AsyncQueuePoolMedido if assincrono else QueuePoolMedido,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING
+    )
+    return opcoes
+
+
+def estado_pool(pool) -> Dict[str, Any]:
+    """Conexões em uso/livres do pool e, se medido, as métricas de checkout."""
+    estado: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        estado.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow()
+        )
+    if isinstance(pool, _CheckoutMedido):
+        estado.update(pool.metricas.resumo())
+    return estado
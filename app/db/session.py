@@ -1,17 +1,21 @@
 # app/db/session.py
 
+from typing import AsyncIterator
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 # Importa o objeto 'settings' que contém a URL do banco
 from app.core.config import settings
+from app.db.pool import estado_pool, opcoes_engine
 
 DATABASE_URL = settings.DATABASE_URL
 
 if DATABASE_URL is None:
     raise ValueError("DATABASE_URL is not configured")
 
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **opcoes_engine(DATABASE_URL))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -23,4 +27,62 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# --- Acesso assíncrono (endpoints async) ---
+
+# Driver assíncrono equivalente a cada driver síncrono suportado
+DRIVERS_ASSINCRONOS = {
+    'mysql': 'mysql+aiomysql',
+    'mysql+pymysql': 'mysql+aiomysql',
+    'mysql+mysqldb': 'mysql+aiomysql',
+    'mariadb': 'mariadb+aiomysql',
+    'mariadb+pymysql': 'mariadb+aiomysql',
+    'sqlite': 'sqlite+aiosqlite',
+    'sqlite+pysqlite': 'sqlite+aiosqlite',
+}
+
+def async_database_url(url: str) -> str:
+    """Converte a DATABASE_URL síncrona para o driver assíncrono correspondente."""
+    url_obj = make_url(url)
+    driver = DRIVERS_ASSINCRONOS.get(url_obj.drivername)
+    if driver is None:
+        # Já é assíncrona (ex: mysql+aiomysql) ou não há equivalente conhecido
+        return url
+    return url_obj.set(drivername=driver).render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or async_database_url(DATABASE_URL)
+
+_async_engine = None
+_async_sessionmaker = None
+
+def get_async_engine():
+    """
+    Cria o engine assíncrono na primeira chamada, para que o driver
+    (aiomysql/aiosqlite) só seja exigido quando for de fato usado.
+    """
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, **opcoes_engine(ASYNC_DATABASE_URL, assincrono=True))
+        _async_sessionmaker = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+def get_async_sessionmaker():
+    get_async_engine()
+    return _async_sessionmaker
+
+async def get_async_db() -> AsyncIterator:
+    # A sessão só abre uma conexão na primeira consulta; com o snapshot já
+    # carregado, a maioria das requisições não chega a usar o banco
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+def pool_metrics():
+    """Estado dos pools de conexão (síncrono e, se já criado, assíncrono)."""
+    metricas = {"sync": estado_pool(engine.pool)}
+    if _async_engine is not None:
+        metricas["async"] = estado_pool(_async_engine.pool)
+    return metricas
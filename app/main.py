@@ -1,16 +1,33 @@
 from fastapi import FastAPI, Request, Depends, HTTPException, UploadFile, File
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, Response, FileResponse
+from fastapi.responses import HTMLResponse, Response, FileResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Optional
-from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
+import shutil
+import tempfile
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from datetime import datetime
 
 # Importações do projeto
 from app.models import IndividuoCreate, ResultadoProcessamentoIndividual, ErroLinha
 from app.services.anthropometry_service import AnthropometryService
-from app.db.session import get_db
+from app.services.records import ResultadoRegistro
+from app.services.json_serialization import MEDIA_TYPE_JSON, resposta_lote_json
+from app.services.reference_snapshot import get_reference_snapshot_async, preload_reference_snapshot, refresh_reference_snapshot_async
+from app.services.batch_streaming import MEDIA_TYPE_NDJSON, iniciar_blocos, iter_ndjson_lote
+from app.services.parallel_batch import encerrar_pool
+from app.services.batch_jobs import STATUS_CONCLUIDO, batch_jobs
+from app.services.result_store import result_store
+from app.services.pdf_report import FilaPdfCheia, pdf_render_pool
+from app.services.export_service import MEDIA_TYPE_XLSX, escrever_xlsx_exportacao, iter_arquivo, iter_csv_exportacao
+from app.services.columnar_export import (MEDIA_TYPE_ARROW, MEDIA_TYPE_PARQUET, escrever_arrow_exportacao,
+                                          escrever_parquet_exportacao)
+from app.services.pyarrow_support import PyarrowIndisponivel, importar_pyarrow
+from app.services.columnar_ingestion import EXTENSOES_COLUNARES
+from app.services.xlsx_ingestion import EXTENSOES_XLSX
+from app.db.session import get_async_db, pool_metrics
 from app.core.config import settings
 
 from fastapi.staticfiles import StaticFiles
@@ -22,12 +39,40 @@ class BatchProcessingResponse(BaseModel):
     summary: dict
     results: List[ResultadoProcessamentoIndividual]
     errors: List[ErroLinha]
-
-# Importação para o novo gerador de PDF (Puro Python)
-from fpdf import FPDF
-from fpdf.enums import Align
-
-app = FastAPI(title=settings.APP_NAME, debug=settings.DEBUG)
+    # Identificador dos resultados guardados no servidor, aceito pelas exportações
+    results_handle: Optional[str] = None
+
+def _resposta_lote(resultados: List[ResultadoRegistro], erros: List[ErroLinha], total_processed: int,
+                   results_handle: Optional[str] = None) -> Response:
+    """
+    Monta a resposta do lote e guarda os resultados para as exportações
+    (a menos que já estejam guardados sob `results_handle`).
+
+    Os resultados já saem validados do serviço: são serializados direto dos
+    registros com orjson, sem o jsonable_encoder nem a revalidação do
+    response_model (que continua valendo para a documentação da API).
+    """
+    summary = {
+        "total_processed": total_processed,
+        "success_count": len(resultados),
+        "error_count": len(erros)
+    }
+    if results_handle is None:
+        results_handle = result_store.guardar(resultados, erros, summary)
+    return Response(content=resposta_lote_json(resultados, erros, summary, results_handle), media_type=MEDIA_TYPE_JSON)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Com REFERENCE_ARTIFACT_PATH as referências são mapeadas já na inicialização
+    preload_reference_snapshot()
+    yield
+    # Encerra os jobs, o pool de PDFs e os processos de cálculo do lote, se tiverem sido criados
+    batch_jobs.encerrar()
+    pdf_render_pool.encerrar()
+    encerrar_pool()
+
+
+app = FastAPI(title=settings.APP_NAME, debug=settings.DEBUG, lifespan=lifespan)
 
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 templates = Jinja2Templates(directory="app/templates")
@@ -42,14 +87,18 @@ async def favicon():
     """Serve o favicon da aplicação."""
     return FileResponse("app/static/favicon.svg", media_type="image/svg+xml")
 
+async def _servico_com_snapshot(db: AsyncSession) -> AnthropometryService:
+    """Serviço sobre o snapshot de referência, carregado do banco sem bloquear o event loop."""
+    return AnthropometryService(db=None, snapshot=await get_reference_snapshot_async(db))
+
 @app.post("/api/processar/individual", response_model=ResultadoProcessamentoIndividual)
 async def processar_dados_individuais(
     individuo_data: IndividuoCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Processa os dados de um único indivíduo e retorna a avaliação nutricional."""
     try:
-        service = AnthropometryService(db=db)
+        service = await _servico_com_snapshot(db)
         return service.process_individual_data(individuo_data)
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
@@ -57,35 +106,76 @@ async def processar_dados_individuais(
         print(f"Erro inesperado no processamento individual: {e}")
         raise HTTPException(status_code=500, detail=f"Erro interno no servidor: {e}")
 
+@app.post("/api/referencias/recarregar")
+async def recarregar_referencias(db: AsyncSession = Depends(get_async_db)):
+    """Recarrega o snapshot em memória das tabelas de referência (do banco ou do artefato configurado)."""
+    try:
+        snapshot = await refresh_reference_snapshot_async(db)
+        return {"success": True, "linhas_referencia": int(snapshot.disponivel.sum())}
+    except Exception as e:
+        print(f"Erro ao recarregar tabelas de referência: {e}")
+        raise HTTPException(status_code=500, detail=f"Erro ao recarregar tabelas de referência: {e}")
+
+def _fechar_ao_terminar(arquivo, linhas):
+    """Mantém o arquivo temporário do upload aberto até o fim da resposta em stream."""
+    try:
+        yield from linhas
+    finally:
+        arquivo.close()
+
+def _validar_arquivo_lote(batchFile: UploadFile) -> None:
+    if not batchFile.filename:
+        raise HTTPException(status_code=400, detail="Nenhum arquivo foi enviado.")
+    
+    if batchFile.filename.endswith(EXTENSOES_COLUNARES):
+        # Parquet/Arrow dependem do pyarrow, opcional no servidor
+        try:
+            importar_pyarrow()
+        except PyarrowIndisponivel as pi:
+            raise HTTPException(status_code=501, detail=str(pi))
+    elif not batchFile.filename.endswith((".csv", ".tsv") + EXTENSOES_XLSX):
+        raise HTTPException(status_code=400, detail="Formato de arquivo inválido. Use CSV, TSV, XLSX, Parquet ou Arrow.")
+
 @app.post("/api/processar/lote", response_model=BatchProcessingResponse)
 async def processar_dados_lote(
     batchFile: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Processa um arquivo em lote (CSV/TSV) e retorna os resultados."""
-    if not batchFile.filename:
-        raise HTTPException(status_code=400, detail="Nenhum arquivo foi enviado.")
+    """
+    Processa um arquivo em lote (CSV/TSV, XLSX, Parquet ou Arrow) e retorna os resultados.
+
+    Com `?stream=true` a resposta é NDJSON: uma linha por resultado ou erro,
+    enviada conforme o processamento avança, e uma linha final de resumo.
+    """
+    _validar_arquivo_lote(batchFile)
     
-    if not (batchFile.filename.endswith(".csv") or batchFile.filename.endswith(".tsv")):
-        raise HTTPException(status_code=400, detail="Formato de arquivo inválido. Use CSV ou TSV.")
+    if stream:
+        # O upload é fechado quando o endpoint retorna; a cópia fica com a resposta
+        arquivo = tempfile.TemporaryFile()
+        try:
+            shutil.copyfileobj(batchFile.file, arquivo, settings.UPLOAD_CHUNK_BYTES)
+            arquivo.seek(0)
+            service = await _servico_com_snapshot(db)
+            blocos = iniciar_blocos(service.iter_batch_stream(arquivo, batchFile.filename))
+        except ValueError as ve:
+            arquivo.close()
+            raise HTTPException(status_code=400, detail=str(ve))
+        except Exception as e:
+            arquivo.close()
+            print(f"Erro inesperado no processamento em lote: {e}")
+            raise HTTPException(status_code=500, detail=f"Erro interno no servidor ao processar o lote: {e}")
+        return StreamingResponse(_fechar_ao_terminar(arquivo, iter_ndjson_lote(blocos)), media_type=MEDIA_TYPE_NDJSON)
     
     try:
-        contents = await batchFile.read()
-        if not contents:
-            raise HTTPException(status_code=400, detail="Arquivo está vazio.")
-            
-        service = AnthropometryService(db=db)
-        processed_data = service.process_batch_data(contents, batchFile.filename)
+        # O upload é lido em blocos direto do arquivo temporário, sem carregá-lo inteiro
+        service = await _servico_com_snapshot(db)
+        processed_data = service.process_batch_stream(batchFile.file, batchFile.filename)
         
-        return BatchProcessingResponse(
-            success=True,
-            summary={
-                "total_processed": processed_data["total_rows_attempted"],
-                "success_count": len(processed_data["resultados_individuais"]),
-                "error_count": len(processed_data["erros_por_linha"])
-            },
-            results=processed_data["resultados_individuais"],
-            errors=processed_data["erros_por_linha"]
+        return _resposta_lote(
+            processed_data["resultados_individuais"],
+            processed_data["erros_por_linha"],
+            processed_data["total_rows_attempted"]
         )
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
@@ -94,289 +184,182 @@ async def processar_dados_lote(
         raise HTTPException(status_code=500, detail=f"Erro interno no servidor ao processar o lote: {e}")
 
 
+@app.post("/api/jobs/lote", status_code=202)
+async def criar_job_lote(
+    batchFile: UploadFile = File(...),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Agenda o processamento de um arquivo em lote e retorna imediatamente o
+    id do job. O andamento fica em /api/jobs/{job_id} e os resultados, ao
+    final, em /api/jobs/{job_id}/resultado.
+    """
+    _validar_arquivo_lote(batchFile)
+    
+    arquivo = tempfile.TemporaryFile()
+    try:
+        shutil.copyfileobj(batchFile.file, arquivo, settings.UPLOAD_CHUNK_BYTES)
+        arquivo.seek(0)
+        service = await _servico_com_snapshot(db)
+        job = batch_jobs.submeter(arquivo, batchFile.filename, service.snapshot, service.z_score_metodo)
+    except ValueError as ve:
+        arquivo.close()
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        arquivo.close()
+        print(f"Erro inesperado ao agendar o lote: {e}")
+        raise HTTPException(status_code=500, detail=f"Erro interno no servidor ao agendar o lote: {e}")
+    return job.progresso()
+
+def _obter_job(job_id: str):
+    job = batch_jobs.obter(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado ou expirado.")
+    return job
+
+@app.get("/api/jobs/{job_id}")
+async def status_job_lote(job_id: str):
+    """Retorna o status, as linhas processadas até agora e a vazão do job."""
+    return _obter_job(job_id).progresso()
+
+@app.get("/api/jobs/{job_id}/resultado", response_model=BatchProcessingResponse)
+async def resultado_job_lote(job_id: str):
+    """Retorna os resultados de um job concluído, no mesmo formato de /api/processar/lote."""
+    job = _obter_job(job_id)
+    if not job.finalizado:
+        raise HTTPException(status_code=409, detail="O job ainda está em processamento.")
+    if job.status != STATUS_CONCLUIDO:
+        raise HTTPException(status_code=400, detail=job.erro)
+    
+    if job.results_handle is None or result_store.obter(job.results_handle) is None:
+        # Os resultados são guardados ao concluir o job; só voltam ao store se tiverem expirado
+        job.results_handle = result_store.guardar(job.resultados, job.erros, job.resumo())
+    return _resposta_lote(job.resultados, job.erros, job.linhas_processadas, job.results_handle)
+
 class ReportData(BaseModel):
     """Modelo de dados para receber as informações para o relatório PDF."""
     identifier: str
     sub_identifier: Optional[str] = None
-    batch_results: BatchProcessingResponse
-
-class PDF(FPDF):
-    """Classe customizada para criar o PDF com cabeçalho e rodapé."""
-    def __init__(self, identifier: str = '', sub_identifier: str = ''):
-        super().__init__(orientation='L', unit='mm', format='A4')
-        self.identifier = identifier
-        self.sub_identifier = sub_identifier
-        self.set_auto_page_break(auto=True, margin=15)
-
-    def header(self):
-        self.set_font('Helvetica', 'B', 16)
-        self.cell(0, 10, self.identifier, 0, 1, 'L')
-        if self.sub_identifier:
-            self.set_font('Helvetica', '', 12)
-            self.cell(0, 8, self.sub_identifier, 0, 1, 'L')
-        self.ln(5)
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Helvetica', 'I', 8)
-        now = datetime.now().strftime('%d/%m/%Y %H:%M:%S')
-        self.cell(0, 10, f'Página {self.page_no()}/{{nb}}', 0, 0, 'C')
-        self.cell(0, 10, f'Gerado em: {now}', 0, 0, 'R')
-
-def get_fpdf_color(classification_text: Optional[str]):
-    """Retorna uma tupla de cor RGB para o fpdf2 com base no texto da classificação."""
-    if not classification_text:
-        return None
-    lower_class = classification_text.lower().replace(' ', '_')
-    if any(s in lower_class for s in ['magreza_acentuada', 'muito_baixo_peso', 'obesidade_grave', 'erro']): return (254, 226, 226)
-    if any(s in lower_class for s in ['magreza', 'baixo_peso', 'baixa_estatura', 'obesidade']): return (254, 242, 242)
-    if any(s in lower_class for s in ['eutrofia', 'peso_adequado', 'estatura_adequada']): return (236, 253, 245)
-    if any(s in lower_class for s in ['risco_de_sobrepeso', 'sobrepeso']): return (254, 252, 232)
-    return None
-
-def encode_for_latin1(text: str) -> str:
-    """Codifica o texto para o formato latin-1, substituindo caracteres incompatíveis."""
-    return text.encode('latin-1', 'replace').decode('latin-1')
+    # Os resultados vêm no corpo ou, de preferência, pelo handle devolvido no lote
+    batch_results: Optional[BatchProcessingResponse] = None
+    results_handle: Optional[str] = None
+
+def _resultados_do_handle(results_handle: str):
+    armazenado = result_store.obter(results_handle)
+    if armazenado is None:
+        raise HTTPException(status_code=404, detail="Resultados não encontrados ou expirados. Processe o lote novamente.")
+    return armazenado
 
 @app.post("/api/export/pdf")
 async def export_pdf_fpdf(report_data: ReportData):
-    """Gera um relatório PDF usando FPDF2."""
-    try:
-        pdf = PDF(identifier=report_data.identifier, sub_identifier=report_data.sub_identifier or '')
-        pdf.alias_nb_pages()
-        pdf.add_page()
-        
-        pdf.set_font('Helvetica', 'B', 8)
-        pdf.set_fill_color(22, 78, 99)
-        pdf.set_text_color(255, 255, 255)
-        col_widths = (25, 35, 25, 20, 20, 17, 35, 17, 38, 10, 30)
-        header = ['ID', 'Nome', 'Idade', 'Data Nasc.', 'Data Aval.', 'Peso(kg)', 'P/I', 'Altura(cm)', 'A/I', 'IMC', 'IMC/I']
-        for i, header_text in enumerate(header):
-            pdf.cell(col_widths[i], 8, header_text, border=1, align='C', fill=True)
-        pdf.ln()
-
-        pdf.set_font('Helvetica', '', 7)
-        pdf.set_text_color(0, 0, 0)
-        
-        def get_classification_from_indicators(indicators, prefix):
-            return next((i.classificacao for i in indicators if i.tipo.startswith(prefix)), "N/A")
-
-        for res in report_data.batch_results.results or []:
-            imc_i_class = get_classification_from_indicators(res.indicadores, "IMC-para-Idade")
-            color = get_fpdf_color(imc_i_class)
-            fill = bool(color)
-            if color:
-                pdf.set_fill_color(*color)
-
-            pdf.cell(col_widths[0], 6, encode_for_latin1(res.id_paciente or ''), border=1, align='L', fill=fill)
-            pdf.cell(col_widths[1], 6, encode_for_latin1(res.nome or 'N/A'), border=1, align='L', fill=fill)
-            pdf.cell(col_widths[2], 6, res.idade if res.idade else "N/A", border=1, align='L', fill=fill)
-            pdf.cell(col_widths[3], 6, res.data_nascimento.strftime('%d/%m/%Y'), border=1, align='C', fill=fill)
-            pdf.cell(col_widths[4], 6, res.data_avaliacao.strftime('%d/%m/%Y'), border=1, align='C', fill=fill)
-            pdf.cell(col_widths[5], 6, f"{res.peso_kg:.1f}", border=1, align='C', fill=fill)
-            pdf.cell(col_widths[6], 6, encode_for_latin1(get_classification_from_indicators(res.indicadores, "Peso-para-Idade")), border=1, align='L', fill=fill)
-            pdf.cell(col_widths[7], 6, f"{res.altura_cm:.1f}", border=1, align='C', fill=fill)
-            pdf.cell(col_widths[8], 6, encode_for_latin1(get_classification_from_indicators(res.indicadores, "Altura-para-Idade")), border=1, align='L', fill=fill)
-            pdf.cell(col_widths[9], 6, f"{res.imc:.2f}" if res.imc else "N/A", border=1, align='C', fill=fill)
-            pdf.cell(col_widths[10], 6, encode_for_latin1(imc_i_class), border=1, align='L', fill=fill)
-            pdf.ln()
-
-        if report_data.batch_results.errors:
-            pdf.set_font('Helvetica', 'B', 8)
-            pdf.set_fill_color(254, 226, 226)
-            pdf.set_text_color(0, 0, 0)
-            pdf.cell(sum(col_widths), 8, 'Registros com Erro no Processamento', border=1, align='C', fill=True)
-            pdf.ln()
-            pdf.set_font('Helvetica', '', 7)
-            for err in report_data.batch_results.errors:
-                nome = err.dados_originais.get('nome', 'N/A')
-                erro_msg = f"Linha {err.linha}: {nome} - Erro: {err.erro}"
-                pdf.multi_cell(sum(col_widths), 6, encode_for_latin1(erro_msg), border=1, align=Align.L, fill=True)
-
-        # Correção: pdf.output() retorna bytearray, converter para bytes
-        pdf_output = pdf.output()
-        if isinstance(pdf_output, bytearray):
-            pdf_bytes = bytes(pdf_output)
-        else:
-            pdf_bytes = pdf_output
-        
-        file_name = f"Relatorio_{report_data.identifier.replace(' ', '_')}.pdf"
-        return Response(content=pdf_bytes, media_type="application/pdf", headers={"Content-Disposition": f"attachment; filename=\"{file_name}\""})
+    """Gera um relatório PDF usando FPDF2, num pool separado do event loop."""
+    if report_data.results_handle:
+        armazenado = _resultados_do_handle(report_data.results_handle)
+        results, errors = armazenado.resultados, armazenado.erros
+    elif report_data.batch_results is not None:
+        results, errors = report_data.batch_results.results, report_data.batch_results.errors
+    else:
+        raise HTTPException(status_code=400, detail="Informe batch_results ou results_handle.")
 
+    try:
+        pdf_bytes = await pdf_render_pool.renderizar(report_data.identifier, report_data.sub_identifier, results, errors)
+    except FilaPdfCheia as fc:
+        raise HTTPException(status_code=503, detail=str(fc), headers={"Retry-After": "5"})
     except Exception as e:
         print(f"Erro ao gerar PDF com fpdf2: {e}")
         raise HTTPException(status_code=500, detail="Ocorreu um erro ao gerar o relatório em PDF.")
 
+    file_name = f"Relatorio_{report_data.identifier.replace(' ', '_')}.pdf"
+    return Response(content=pdf_bytes, media_type="application/pdf", headers={"Content-Disposition": f"attachment; filename=\"{file_name}\""})
+
+@app.get("/api/metricas/banco")
+async def metricas_banco():
+    """Conexões em uso e tempo de espera no checkout dos pools do banco."""
+    return pool_metrics()
+
+@app.get("/api/metricas/pdf")
+async def metricas_pdf():
+    """Relatórios em geração, profundidade da fila e recusas do pool de PDF."""
+    return pdf_render_pool.metricas()
+
 
 class ExportRequest(BaseModel):
     """Modelo para requisição de exportação"""
-    results: List[ResultadoProcessamentoIndividual]
-    summary: dict
+    results: Optional[List[ResultadoProcessamentoIndividual]] = None
+    summary: Optional[dict] = None
+    results_handle: Optional[str] = None
     escola: Optional[str] = None
     turma: Optional[str] = None
 
+def _resultados_exportacao(request: ExportRequest) -> List[ResultadoProcessamentoIndividual]:
+    """Resultados da exportação: do handle guardado no servidor ou do próprio corpo."""
+    if request.results_handle:
+        return _resultados_do_handle(request.results_handle).resultados
+    if request.results is None:
+        raise HTTPException(status_code=400, detail="Informe results ou results_handle.")
+    return request.results
+
 
 @app.post("/api/export/csv")
 async def export_csv(request: ExportRequest):
-    """Exporta os resultados para formato CSV"""
-    try:
-        import csv
-        import io
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Cabeçalho
-        headers = [
-            'ID', 'Nome', 'Sexo', 'Data Nascimento', 'Data Avaliação', 'Idade', 
-            'Peso (kg)', 'Altura (cm)', 'IMC', 'Peso/Idade', 'Altura/Idade', 'IMC/Idade'
-        ]
-        
-        if request.escola:
-            headers.insert(0, 'Escola')
-        if request.turma:
-            headers.insert(1 if request.escola else 0, 'Turma')
-            
-        writer.writerow(headers)
-        
-        # Dados
-        for resultado in request.results:
-            row = []
-            
-            if request.escola:
-                row.append(request.escola)
-            if request.turma:
-                row.append(request.turma)
-                
-            # Buscar indicadores
-            peso_idade = next((ind.classificacao for ind in resultado.indicadores if 'Peso-para-Idade' in ind.tipo), 'N/A')
-            altura_idade = next((ind.classificacao for ind in resultado.indicadores if 'Altura-para-Idade' in ind.tipo), 'N/A')
-            imc_idade = next((ind.classificacao for ind in resultado.indicadores if 'IMC-para-Idade' in ind.tipo), 'N/A')
-            
-            row.extend([
-                resultado.id_paciente or '',  # ID do paciente
-                resultado.nome,
-                resultado.sexo,
-                resultado.data_nascimento.strftime('%d/%m/%Y'),
-                resultado.data_avaliacao.strftime('%d/%m/%Y'),
-                resultado.idade,
-                float(resultado.peso_kg),
-                float(resultado.altura_cm),
-                resultado.imc or 'N/A',
-                peso_idade,
-                altura_idade,
-                imc_idade
-            ])
-            
-            writer.writerow(row)
-        
-        csv_content = output.getvalue()
-        output.close()
-        
-        return Response(
-            content=csv_content.encode('utf-8'),
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=resultados_antropometria.csv"}
-        )
-        
-    except Exception as e:
-        print(f"Erro ao exportar CSV: {e}")
-        raise HTTPException(status_code=500, detail="Erro ao gerar arquivo CSV")
+    """Exporta os resultados para formato CSV, enviado em blocos conforme é gerado"""
+    resultados = _resultados_exportacao(request)
+    return StreamingResponse(
+        iter_csv_exportacao(resultados, request.escola, request.turma),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=resultados_antropometria.csv"}
+    )
 
 
 @app.post("/api/export/xlsx")
 async def export_xlsx(request: ExportRequest):
     """Exporta os resultados para formato Excel"""
+    resultados = _resultados_exportacao(request)
+    # A planilha é gravada num arquivo temporário (fora do event loop) e enviada em blocos
+    arquivo = tempfile.TemporaryFile()
     try:
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, PatternFill, Alignment
-        from openpyxl.utils import get_column_letter
-        import io
-        
-        wb = Workbook()
-        ws = wb.active
-        if ws is None:
-            ws = wb.create_sheet("Resultados Antropometria")
-        else:
-            ws.title = "Resultados Antropometria"
-        
-        # Cabeçalho com estilo
-        headers = [
-            'ID', 'Nome', 'Sexo', 'Data Nascimento', 'Data Avaliação', 'Idade', 
-            'Peso (kg)', 'Altura (cm)', 'IMC', 'Peso/Idade', 'Altura/Idade', 'IMC/Idade'
-        ]
-        
-        col_offset = 0
-        if request.escola:
-            headers.insert(0, 'Escola')
-            col_offset += 1
-        if request.turma:
-            headers.insert(1 if request.escola else 0, 'Turma')
-            col_offset += 1
-        
-        # Estilo do cabeçalho
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_font = Font(color="FFFFFF", bold=True)
-        
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal="center")
-        
-        # Dados
-        for row_idx, resultado in enumerate(request.results, 2):
-            col = 1
-            
-            if request.escola:
-                ws.cell(row=row_idx, column=col, value=request.escola)
-                col += 1
-            if request.turma:
-                ws.cell(row=row_idx, column=col, value=request.turma)
-                col += 1
-            
-            # Buscar indicadores
-            peso_idade = next((ind.classificacao for ind in resultado.indicadores if 'Peso-para-Idade' in ind.tipo), 'N/A')
-            altura_idade = next((ind.classificacao for ind in resultado.indicadores if 'Altura-para-Idade' in ind.tipo), 'N/A')
-            imc_idade = next((ind.classificacao for ind in resultado.indicadores if 'IMC-para-Idade' in ind.tipo), 'N/A')
-            
-            values = [
-                resultado.id_paciente or '',  # ID do paciente
-                resultado.nome,
-                resultado.sexo,
-                resultado.data_nascimento.strftime('%d/%m/%Y'),
-                resultado.data_avaliacao.strftime('%d/%m/%Y'),
-                resultado.idade,
-                float(resultado.peso_kg),
-                float(resultado.altura_cm),
-                resultado.imc or 'N/A',
-                peso_idade,
-                altura_idade,
-                imc_idade
-            ]
-            
-            for val in values:
-                ws.cell(row=row_idx, column=col, value=val)
-                col += 1
-        
-        # Ajustar largura das colunas
-        for col in range(1, len(headers) + 1):
-            ws.column_dimensions[get_column_letter(col)].width = 15
-        
-        # Salvar em buffer
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
-        
-        return Response(
-            content=output.read(),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": "attachment; filename=resultados_antropometria.xlsx"}
-        )
-        
+        await run_in_threadpool(escrever_xlsx_exportacao, resultados, request.escola, request.turma, arquivo)
     except Exception as e:
+        arquivo.close()
         print(f"Erro ao exportar Excel: {e}")
         raise HTTPException(status_code=500, detail="Erro ao gerar arquivo Excel")
+    
+    return StreamingResponse(
+        iter_arquivo(arquivo, settings.UPLOAD_CHUNK_BYTES),
+        media_type=MEDIA_TYPE_XLSX,
+        headers={"Content-Disposition": "attachment; filename=resultados_antropometria.xlsx"}
+    )
+
+async def _exportacao_colunar(request: ExportRequest, escrever, media_type: str, extensao: str) -> StreamingResponse:
+    resultados = _resultados_exportacao(request)
+    arquivo = tempfile.TemporaryFile()
+    try:
+        await run_in_threadpool(escrever, resultados, request.escola, request.turma, arquivo)
+    except PyarrowIndisponivel as pi:
+        arquivo.close()
+        raise HTTPException(status_code=501, detail=str(pi))
+    except Exception as e:
+        arquivo.close()
+        print(f"Erro ao exportar {extensao}: {e}")
+        raise HTTPException(status_code=500, detail=f"Erro ao gerar arquivo {extensao}")
+
+    return StreamingResponse(
+        iter_arquivo(arquivo, settings.UPLOAD_CHUNK_BYTES),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=resultados_antropometria.{extensao}"}
+    )
+
+
+@app.post("/api/export/arrow")
+async def export_arrow(request: ExportRequest):
+    """Exporta os resultados como arquivo Arrow IPC, com colunas tipadas (requer pyarrow)"""
+    return await _exportacao_colunar(request, escrever_arrow_exportacao, MEDIA_TYPE_ARROW, "arrow")
+
+
+@app.post("/api/export/parquet")
+async def export_parquet(request: ExportRequest):
+    """Exporta os resultados como Parquet, com colunas tipadas (requer pyarrow)"""
+    return await _exportacao_colunar(request, escrever_parquet_exportacao, MEDIA_TYPE_PARQUET, "parquet")
 
 class ManualBatchRequest(BaseModel):
     pessoas: List[IndividuoCreate]
@@ -385,47 +368,43 @@ class ManualBatchRequest(BaseModel):
 @app.post("/api/processar/manual-batch", response_model=BatchProcessingResponse)
 async def processar_dados_manual_batch(
     request: ManualBatchRequest,
-    db: Session = Depends(get_db)
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Processa uma lista de pessoas enviadas manualmente e retorna os resultados."""
+    """
+    Processa uma lista de pessoas enviadas manualmente e retorna os resultados.
+
+    Com `?stream=true` a resposta é NDJSON, como em /api/processar/lote.
+    """
     try:
-        service = AnthropometryService(db=db)
+        service = await _servico_com_snapshot(db)
         
         # Converte lista de pessoas para formato similar ao CSV
-        resultados_individuais = []
-        erros_por_linha = []
-        
-        for index, pessoa in enumerate(request.pessoas, start=1):
-            try:
-                resultado = service.process_individual_data(pessoa)
-                resultados_individuais.append(resultado)
-            except Exception as e:
-                erro = ErroLinha(
-                    linha=index,
-                    erro=str(e),
-                    dados_originais={
-                        "id_paciente": pessoa.id_paciente,
-                        "nome": pessoa.nome,
-                        "data_nascimento": pessoa.data_nascimento.isoformat() if pessoa.data_nascimento else None,
-                        "data_avaliacao": pessoa.data_avaliacao.isoformat() if pessoa.data_avaliacao else None,
-                        "sexo": pessoa.sexo,
-                        "peso_kg": pessoa.peso_kg,
-                        "altura_cm": pessoa.altura_cm
-                    }
-                )
-                erros_por_linha.append(erro)
+        linhas = [
+            (index, pessoa, {
+                "id_paciente": pessoa.id_paciente,
+                "nome": pessoa.nome,
+                "data_nascimento": pessoa.data_nascimento.isoformat() if pessoa.data_nascimento else None,
+                "data_avaliacao": pessoa.data_avaliacao.isoformat() if pessoa.data_avaliacao else None,
+                "sexo": pessoa.sexo,
+                "peso_kg": pessoa.peso_kg,
+                "altura_cm": pessoa.altura_cm
+            })
+            for index, pessoa in enumerate(request.pessoas, start=1)
+        ]
+
+        if stream:
+            tamanho = settings.BATCH_CHUNK_ROWS
+            blocos = iniciar_blocos(
+                service.process_individuals_batch(linhas[inicio:inicio + tamanho])
+                for inicio in range(0, len(linhas), tamanho)
+            )
+            return StreamingResponse(iter_ndjson_lote(blocos), media_type=MEDIA_TYPE_NDJSON)
+
+        resultados_individuais, erros_por_linha = service.process_individuals_batch(linhas)
         
-        return BatchProcessingResponse(
-            success=True,
-            summary={
-                "total_processed": len(request.pessoas),
-                "success_count": len(resultados_individuais),
-                "error_count": len(erros_por_linha)
-            },
-            results=resultados_individuais,
-            errors=erros_por_linha
-        )
+        return _resposta_lote(resultados_individuais, erros_por_linha, len(request.pessoas))
         
     except Exception as e:
         print(f"Erro inesperado no processamento manual batch: {e}")
-        raise HTTPException(status_code=500, detail=f"Erro interno no servidor: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Erro interno no servidor: {e}")
@@ -3,10 +3,11 @@
 from datetime import date
 from decimal import Decimal
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_serializer
 from enum import Enum
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import Column, Integer, String, Float, DateTime
 from app.db.session import Base
+from app.services.age import descrever_idade
 
 # --- Modelos Pydantic (para validação na API) ---
 
@@ -44,12 +45,25 @@ class ResultadoProcessamentoIndividual(BaseModel):
     sexo: str
     data_nascimento: date
     data_avaliacao: date  # <-- CAMPO ADICIONADO AQUI
-    idade: str
+    # Quando o serviço informa idade_meses, o texto da idade só é montado na
+    # serialização (ou ao ler idade_formatada)
+    idade: Optional[str] = None
+    idade_meses: Optional[int] = Field(default=None, exclude=True)
     peso_kg: Decimal
     altura_cm: Decimal
     imc: Optional[float]
     indicadores: List[Indicador]
 
+    @property
+    def idade_formatada(self) -> str:
+        if self.idade is not None:
+            return self.idade
+        return descrever_idade(self.idade_meses) if self.idade_meses is not None else ""
+
+    @field_serializer('idade')
+    def _serializar_idade(self, idade: Optional[str]) -> str:
+        return self.idade_formatada
+
 class ErroLinha(BaseModel):
     linha: int
     erro: str
@@ -104,4 +118,14 @@ class TabelaClassificacao(Base):
     sexo_aplicavel = Column(String(10), nullable=True)
     z_score_min = Column(Float, nullable=False)
     z_score_max = Column(Float, nullable=False)
-    classificacao = Column(String(255), nullable=False)
\ No newline at end of file
+    classificacao = Column(String(255), nullable=False)
+
+class CargaReferencia(Base):
+    """Checksum de cada arquivo de data/sisvan_tables já carregado no banco."""
+    __tablename__ = 'sisvan_cargas_referencia'
+
+    id = Column(Integer, primary_key=True, index=True)
+    arquivo = Column(String(255), nullable=False, unique=True)
+    checksum = Column(String(64), nullable=False)
+    linhas = Column(Integer, nullable=False)
+    carregado_em = Column(DateTime, nullable=False)
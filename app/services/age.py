@@ -0,0 +1,80 @@
+# app/services/age.py
+
+from datetime import date
+from typing import Sequence, Tuple
+
+import numpy as np
+
+# Dias de cada mês em ano não bissexto (fevereiro bissexto é tratado à parte)
+_DIAS_NO_MES = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def _dias_no_mes(ano: int, mes: int) -> int:
+    if mes == 2 and ano % 4 == 0 and (ano % 100 != 0 or ano % 400 == 0):
+        return 29
+    return _DIAS_NO_MES[mes - 1]
+
+
+def idade_em_meses_e_dias(nascimento: date, avaliacao: date) -> Tuple[int, int]:
+    """
+    Meses completos e dias restantes entre as datas, com a mesma regra do
+    relativedelta: o aniversário de meses cai no mesmo dia do nascimento,
+    ou no último dia do mês quando ele é mais curto (31/01 + 1 mês = 28/02).
+    """
+    if avaliacao < nascimento:
+        raise ValueError("Data de avaliação não pode ser anterior ao nascimento.")
+    meses = (avaliacao.year - nascimento.year) * 12 + avaliacao.month - nascimento.month
+    ancora = _aniversario_de_meses(nascimento, meses)
+    if avaliacao < ancora:
+        meses -= 1
+        ancora = _aniversario_de_meses(nascimento, meses)
+    return meses, (avaliacao - ancora).days
+
+
+def _aniversario_de_meses(nascimento: date, meses: int) -> date:
+    ano, mes = divmod(nascimento.month - 1 + meses, 12)
+    ano += nascimento.year
+    return date(ano, mes + 1, min(nascimento.day, _dias_no_mes(ano, mes + 1)))
+
+
+def idades_em_lote(nascimentos: np.ndarray, avaliacoes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Versão vetorizada de idade_em_meses_e_dias para colunas datetime64[D].
+
+    Os meses vêm da diferença entre as datas truncadas ao mês; o aniversário
+    de meses é o dia do nascimento limitado ao tamanho do mês alvo, e quando
+    a avaliação cai antes dele o mês ainda não se completou. Linhas com
+    avaliação anterior ao nascimento devem ser separadas antes pelo chamador.
+    """
+    nascimentos = np.asarray(nascimentos, dtype='datetime64[D]')
+    avaliacoes = np.asarray(avaliacoes, dtype='datetime64[D]')
+    mes_nascimento = nascimentos.astype('datetime64[M]')
+    dia_nascimento = nascimentos - mes_nascimento.astype('datetime64[D]')  # 0 = dia 1
+
+    def aniversario(meses: np.ndarray) -> np.ndarray:
+        mes_alvo = mes_nascimento + meses
+        inicio = mes_alvo.astype('datetime64[D]')
+        ultimo_dia = (mes_alvo + 1).astype('datetime64[D]') - inicio - 1
+        return inicio + np.minimum(dia_nascimento, ultimo_dia)
+
+    meses = (avaliacoes.astype('datetime64[M]') - mes_nascimento).astype(np.int64)
+    ancora = aniversario(meses)
+    incompleto = avaliacoes < ancora
+    meses -= incompleto
+    ancora = np.where(incompleto, aniversario(meses), ancora)
+    return meses, (avaliacoes - ancora).astype(np.int64)
+
+
+def datas_para_array(datas: Sequence[date]) -> np.ndarray:
+    return np.array(datas, dtype='datetime64[D]')
+
+
+def descrever_idade(meses: int) -> str:
+    """Texto da idade em anos e meses (ex: '2 anos e 1 mês'); '0 meses' para menos de um mês."""
+    anos, meses = divmod(meses, 12)
+    partes = []
+    if anos > 0:
+        partes.append(f"{anos} ano{'s' if anos > 1 else ''}")
+    if meses > 0:
+        partes.append(f"{meses} {'meses' if meses > 1 else 'mês'}")
+    return " e ".join(partes) if partes else "0 meses"
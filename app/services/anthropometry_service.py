@@ -1,23 +1,57 @@
 # app/services/anthropometry_service.py
 
+import codecs
 import csv
 import io
-from datetime import date, datetime
-from decimal import Decimal, InvalidOperation
-from typing import List, Dict, Any, Optional, Tuple
+import itertools
+import re
+from datetime import date
+from decimal import Decimal
+from typing import List, Dict, Any, BinaryIO, Iterator, Mapping, Optional, Sequence, Tuple, Union
 
-from dateutil.relativedelta import relativedelta
+import numpy as np
 from sqlalchemy.orm import Session
 
 from app.models import (
     IndividuoCreate,
     ResultadoProcessamentoIndividual,
-    Indicador,
     ErroLinha,
     TabelaReferenciaSISVAN,
     TabelaClassificacao,
     SexoEnum
 )
+from app.services.reference_snapshot import (
+    ReferenceSnapshot,
+    INDICADOR_MAP,
+    COLUNAS_Z,
+    SEXOS,
+    get_reference_snapshot
+)
+from app.services.age import descrever_idade, idade_em_meses_e_dias, idades_em_lote
+from app.services.date_parsing import parse_data_flexivel
+from app.services.ingestion_plan import (
+    IngestionPlan,
+    normalizar_cabecalho,
+    parse_decimal_flexivel,
+    parse_sexo_flexivel
+)
+from app.services.columnar_ingestion import EXTENSOES_COLUNARES, BlocoColunar, entrada_do_bloco, iter_blocos_colunares
+from app.services.records import ColunasResultados, EntradaLote, IndicadorRegistro, Individuo, ResultadoRegistro, ResultadosLote
+from app.services.xlsx_ingestion import EXTENSOES_XLSX, iter_blocos_xlsx
+from app.services.batch_engine import (
+    LoteCalculado,
+    NOMES_INDICADORES,
+    arredondar_imc,
+    calcular_lote,
+    fixar_escores_z,
+    interpolar_z_score
+)
+from app.services.lms import INDICADORES_LMS_RESTRITO, z_score_lms
+from app.services.parallel_batch import BlocoBruto, processar_blocos_em_paralelo
+from app.core.config import settings
+
+# Fins de linha aceitos nos arquivos de texto: Windows, Mac antigo e Unix
+_FIM_DE_LINHA = re.compile(r'\r\n|\r|\n')
 
 def get_reference_value(db: Session, table_name: str, age_in_months: int, gender: str) -> Optional[TabelaReferenciaSISVAN]:
     indicador_map = {'pi_m': 'peso_idade', 'pi_f': 'peso_idade','ei_m': 'estatura_idade', 'ei_f': 'estatura_idade', 'imci_m': 'imc_idade', 'imci_f': 'imc_idade'}
@@ -36,33 +70,34 @@ def get_classification_rule(db: Session, table_name: str, age_in_months: int, z_
     return str(rule.classificacao) if rule else "Classificação não encontrada"
 
 class AnthropometryService:
-    def __init__(self, db: Optional[Session]):
+    def __init__(self, db: Optional[Session], snapshot: Optional[ReferenceSnapshot] = None):
         self.db = db
+        self._snapshot = snapshot
+        self.z_score_metodo = settings.Z_SCORE_METODO
+        self.numeric_mode = settings.NUMERIC_MODE
+
+    @property
+    def snapshot(self) -> ReferenceSnapshot:
+        """Snapshot das tabelas de referência, carregado do banco só na primeira vez no processo."""
+        if self._snapshot is None:
+            if self.db is None:
+                raise ValueError("Nenhuma fonte de dados de referência configurada.")
+            self._snapshot = get_reference_snapshot(self.db)
+        return self._snapshot
 
     def calculate_age_exact(self, birth_date: date, evaluation_date: date) -> Tuple[int, int, int, str, int, int]:
         """
         Calcula idade exata em anos, meses e dias, retornando também
         o total em meses e total em dias
         """
-        if evaluation_date < birth_date:
-            raise ValueError("Data de avaliação não pode ser anterior ao nascimento.")
-        
-        delta = relativedelta(evaluation_date, birth_date)
-        total_months = delta.years * 12 + delta.months
+        total_months, days = idade_em_meses_e_dias(birth_date, evaluation_date)
+        years, months = divmod(total_months, 12)
         total_days = (evaluation_date - birth_date).days
         
         # Formato da string de idade
-        age_str_parts = []
-        if delta.years > 0:
-            age_str_parts.append(f"{delta.years} ano{'s' if delta.years > 1 else ''}")
-        if delta.months > 0:
-            age_str_parts.append(f"{delta.months} {'meses' if delta.months > 1 else 'mês'}")
-        if not age_str_parts and delta.days > 0:
-            age_str_parts.append(f"{delta.days} dias")
-        
-        age_str = " e ".join(age_str_parts) if age_str_parts else "0 dias"
+        age_str = descrever_idade(total_months) if total_months > 0 else f"{days} dias"
         
-        return (delta.years, delta.months, delta.days, age_str, total_months, total_days)
+        return (years, months, days, age_str, total_months, total_days)
 
     def calculate_imc(self, peso_kg: float, altura_cm: float) -> Optional[float]:
         """
@@ -75,26 +110,24 @@ class AnthropometryService:
         imc = peso_kg / (altura_m * altura_m)
         return round(imc, 2)
 
+    def _calculate_imc_value(self, peso_kg: Decimal, altura_cm: Decimal) -> Union[Decimal, float]:
+        """IMC sem arredondamento, na aritmética do modo numérico (NUMERIC_MODE)."""
+        if self.numeric_mode == 'float':
+            altura_m = float(altura_cm) / 100
+            return float(peso_kg) / (altura_m * altura_m)
+        altura_m = altura_cm / Decimal(100)
+        return peso_kg / (altura_m * altura_m)
+
     def _calculate_age(self, birth_date: date, evaluation_date: date) -> Tuple[int, str]:
-        if evaluation_date < birth_date:
-            raise ValueError("Data de avaliação não pode ser anterior ao nascimento.")
-        
-        delta = relativedelta(evaluation_date, birth_date)
-        age_in_months = delta.years * 12 + delta.months
-        
-        age_str_parts = []
-        if delta.years > 0: 
-            age_str_parts.append(f"{delta.years} ano{'s' if delta.years > 1 else ''}")
-        if delta.months > 0: 
-            age_str_parts.append(f"{delta.months} {'meses' if delta.months > 1 else 'mês'}")
-        
-        if not age_str_parts: 
-            return 0, "0 meses"
-        return age_in_months, " e ".join(age_str_parts)
+        age_in_months, _ = idade_em_meses_e_dias(birth_date, evaluation_date)
+        return age_in_months, descrever_idade(age_in_months)
 
-    def _interpolate_z_score(self, value: Decimal, ref_row: TabelaReferenciaSISVAN) -> Optional[float]:
+    def _interpolate_z_score(self, value: Union[Decimal, float], ref_values: Sequence[Optional[float]]) -> Optional[float]:
         z_scores = [-3.0, -2.0, -1.0, 0.0, 1.0, 2.0, 3.0]
-        ref_values = [getattr(ref_row, f'valor_z_{"neg" if z < 0 else "pos"}_{abs(int(z))}' if z != 0 else 'valor_z_0') for z in z_scores]
+        if isinstance(ref_values, TabelaReferenciaSISVAN):
+            ref_values = [getattr(ref_values, coluna) for coluna in COLUNAS_Z]
+        if self.numeric_mode == 'float':
+            return interpolar_z_score(float(value), ref_values)
         ref_values_decimal = [Decimal(str(v)) if v is not None else None for v in ref_values]
         
         for i in range(len(ref_values_decimal) - 1):
@@ -113,30 +146,40 @@ class AnthropometryService:
             return 3.1
         return None
 
-    def _get_indicator(self, table_name: str, age_in_months: int, value: Decimal, gender: str) -> Optional[Indicador]:
-        if self.db is None:
+    def _get_indicator(self, table_name: str, age_in_months: int, value: Union[Decimal, float], gender: str) -> Optional[IndicadorRegistro]:
+        if self.db is None and self._snapshot is None:
             # Para testes sem DB, retorna um indicador placeholder
-            return Indicador(
+            return IndicadorRegistro(
                 tipo=f"Teste-{table_name}",
                 valor_observado=value,
                 escore_z=0.0,
                 classificacao="Teste - Sem DB"
             )
         
-        ref = get_reference_value(self.db, table_name, age_in_months, gender)
-        if not ref: return None
-        z_score = self._interpolate_z_score(value, ref)
+        db_indicator_name = INDICADOR_MAP.get(table_name)
+        if not db_indicator_name: return None
+        ref_values = self.snapshot.valores_referencia(db_indicator_name, gender, age_in_months)
+        if not ref_values: return None
+        lms = self.snapshot.parametros_lms(db_indicator_name, gender, age_in_months) if self.z_score_metodo == 'lms' else None
+        if lms:
+            z_score = z_score_lms(float(value), *lms, restrito=db_indicator_name in INDICADORES_LMS_RESTRITO)
+        else:
+            z_score = self._interpolate_z_score(value, ref_values)
         if z_score is None: return None
+        z_score = float(fixar_escores_z(z_score))
         
-        classification = get_classification_rule(self.db, table_name, age_in_months, z_score)
+        classification = self.snapshot.classificar(db_indicator_name, age_in_months, z_score) or "Classificação não encontrada"
         indicador_display_map = {"pi": "Peso-para-Idade (P/I)", "ei": "Altura-para-Idade (A/I)", "imci": "IMC-para-Idade (IMC/I)"}
         display_name = indicador_display_map.get(table_name.split('_')[0], table_name)
         
-        return Indicador(tipo=display_name, valor_observado=value, escore_z=round(z_score, 2), classificacao=classification or "Não aplicável")
+        return IndicadorRegistro(tipo=display_name, valor_observado=value, escore_z=round(z_score, 2), classificacao=classification or "Não aplicável")
 
     def process_individual_data(self, data: IndividuoCreate) -> ResultadoProcessamentoIndividual:
+        return self._evaluate_individual(data).para_modelo()
+
+    def _evaluate_individual(self, data: Individuo) -> ResultadoRegistro:
         age_in_months, age_str = self._calculate_age(data.data_nascimento, data.data_avaliacao)
-        indicadores: List[Indicador] = []
+        indicadores: List[IndicadorRegistro] = []
         
         if age_in_months <= 120:
             p_i = self._get_indicator(f"pi_{data.sexo.value.lower()}", age_in_months, data.peso_kg, data.sexo.value)
@@ -145,171 +188,272 @@ class AnthropometryService:
             a_i = self._get_indicator(f"ei_{data.sexo.value.lower()}", age_in_months, data.altura_cm, data.sexo.value)
             if a_i: indicadores.append(a_i)
             
-        imc_decimal: Optional[Decimal] = None
+        imc: Optional[Union[Decimal, float]] = None
         if data.altura_cm > 0:
-            altura_m = data.altura_cm / Decimal(100)
-            imc_decimal = data.peso_kg / (altura_m * altura_m)
+            imc = self._calculate_imc_value(data.peso_kg, data.altura_cm)
             if age_in_months <= 228:
-                imc_i = self._get_indicator(f"imci_{data.sexo.value.lower()}", age_in_months, imc_decimal, data.sexo.value)
+                imc_i = self._get_indicator(f"imci_{data.sexo.value.lower()}", age_in_months, imc, data.sexo.value)
                 if imc_i: indicadores.append(imc_i)
         
-        return ResultadoProcessamentoIndividual(
+        return ResultadoRegistro(
             id_paciente=data.id_paciente,
             nome=data.nome,
             sexo=data.sexo.name.capitalize(),
             data_nascimento=data.data_nascimento,
             data_avaliacao=data.data_avaliacao,
             idade=age_str,
+            idade_meses=None,
             peso_kg=data.peso_kg,
             altura_cm=data.altura_cm,
-            imc=float(round(imc_decimal, 2)) if imc_decimal is not None else None,
+            imc=arredondar_imc(imc) if imc is not None else None,
             indicadores=indicadores
         )
 
-    def _parse_date_flexible(self, date_str: str) -> date:
-        for fmt in ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y'):
-            try: 
-                return datetime.strptime(date_str, fmt).date()
-            except (ValueError, TypeError): 
+    def process_individuals_batch(self, linhas: List[Tuple[int, Individuo, Mapping[str, Any]]],
+                                  entrada: Optional[EntradaLote] = None) -> Tuple[ResultadosLote, List[ErroLinha]]:
+        """
+        Processa várias pessoas de uma vez com o motor vetorizado.
+
+        Cada item é (número da linha, dados validados, dados originais).
+        `entrada` traz outras linhas do mesmo bloco já em colunas (leitura de
+        Parquet/Arrow), avaliadas junto, na ordem dos números de linha. Os
+        resultados são registros internos (ver app.services.records), com as
+        colunas calculadas pelo motor. Sem dados de referência disponíveis
+        (testes sem DB), processa linha a linha.
+        """
+        erros: List[ErroLinha] = []
+
+        if self.db is None and self._snapshot is None:
+            registros: List[ResultadoRegistro] = []
+            for linha, individuo, dados_originais in linhas:
+                try:
+                    registros.append(self._evaluate_individual(individuo))
+                except Exception as e:
+                    erros.append(ErroLinha(linha=linha, erro=str(e), dados_originais=dados_originais))
+            return ResultadosLote(registros), erros
+
+        entrada_linhas = EntradaLote.de_individuos([linha for linha, _, _ in linhas], [individuo for _, individuo, _ in linhas])
+        invertidas = entrada_linhas.data_avaliacao < entrada_linhas.data_nascimento
+        for i in np.flatnonzero(invertidas).tolist():
+            linha, _, dados_originais = linhas[i]
+            erros.append(ErroLinha(linha=linha, erro="Data de avaliação não pode ser anterior ao nascimento.", dados_originais=dados_originais))
+        if invertidas.any():
+            entrada_linhas = entrada_linhas.filtrar(~invertidas)
+        if entrada is not None:
+            entrada_linhas = EntradaLote.juntar(entrada, entrada_linhas)
+        return self._evaluate_columns(entrada_linhas), erros
+
+    def _evaluate_columns(self, entrada: EntradaLote) -> ResultadosLote:
+        # Idades de todas as linhas de uma vez sobre as colunas de datas
+        idades, _ = idades_em_lote(entrada.data_nascimento, entrada.data_avaliacao)
+        lote = calcular_lote(self.snapshot, sexo=entrada.sexo, idade_meses=idades, peso_kg=entrada.peso_kg,
+                             altura_cm=entrada.altura_cm, metodo=self.z_score_metodo)
+        colunas = ColunasResultados(
+            id_paciente=entrada.id_paciente,
+            nome=entrada.nome,
+            sexo=entrada.sexo,
+            data_nascimento=entrada.data_nascimento,
+            data_avaliacao=entrada.data_avaliacao,
+            idade_meses=idades,
+            peso_kg=entrada.peso_kg,
+            altura_cm=entrada.altura_cm,
+            # Preenchidos ao montar os registros, com o mesmo arredondamento
+            imc=np.empty(len(entrada)),
+            escores_z={indicador: np.full(len(entrada), np.nan) for indicador in NOMES_INDICADORES},
+            codigos_classificacao=lote.codigos_classificacao,
+            rotulos=lote.rotulos
+        )
+        rotulos_sexo = [SexoEnum(sexo).name.capitalize() for sexo in SEXOS]
+        registros = [
+            self._build_batch_result(i, lote, colunas, id_paciente, nome, rotulos_sexo[sexo], nascimento, avaliacao,
+                                     idade, peso_kg, altura_cm)
+            for i, (id_paciente, nome, sexo, nascimento, avaliacao, idade, peso_kg, altura_cm) in enumerate(zip(
+                entrada.id_paciente, entrada.nome, entrada.sexo.tolist(), entrada.data_nascimento.tolist(),
+                entrada.data_avaliacao.tolist(), idades.tolist(), entrada.peso_decimal, entrada.altura_decimal))
+        ]
+        return ResultadosLote(registros, colunas)
+
+    def _build_batch_result(self, i: int, lote: LoteCalculado, colunas: ColunasResultados, id_paciente: Optional[str],
+                            nome: str, sexo: str, data_nascimento: date, data_avaliacao: date, age_in_months: int,
+                            peso_kg: Decimal, altura_cm: Decimal) -> ResultadoRegistro:
+        # No modo float o IMC já calculado pelo motor é reaproveitado
+        imc = float(lote.imc[i]) if self.numeric_mode == 'float' else self._calculate_imc_value(peso_kg, altura_cm)
+
+        indicadores: List[IndicadorRegistro] = []
+        for indicador, valor in (('peso_idade', peso_kg), ('estatura_idade', altura_cm), ('imc_idade', imc)):
+            z_score = lote.escores_z[indicador][i]
+            if np.isnan(z_score):
                 continue
-        raise ValueError(f"Formato de data inválido: '{date_str}'. Use AAAA-MM-DD ou DD/MM/AAAA.")
+            escore_z = colunas.escores_z[indicador][i] = round(float(z_score), 2)
+            indicadores.append(IndicadorRegistro(
+                tipo=NOMES_INDICADORES[indicador],
+                valor_observado=valor,
+                escore_z=escore_z,
+                classificacao=lote.classificacao(indicador, i)
+            ))
+
+        colunas.imc[i] = imc_arredondado = arredondar_imc(imc)
+        return ResultadoRegistro(
+            id_paciente=id_paciente,
+            nome=nome,
+            sexo=sexo,
+            data_nascimento=data_nascimento,
+            data_avaliacao=data_avaliacao,
+            idade=None,
+            idade_meses=age_in_months,
+            peso_kg=peso_kg,
+            altura_cm=altura_cm,
+            imc=imc_arredondado,
+            indicadores=indicadores
+        )
+
+    def _parse_date_flexible(self, date_str: str) -> date:
+        return parse_data_flexivel(date_str)
 
     def _parse_float_flexible(self, value_str: str) -> Decimal:
-        try: 
-            # Remove espaços e normaliza separadores decimais
-            normalized = str(value_str).strip().replace(',', '.')
-            # Remove aspas se existirem
-            normalized = normalized.strip('"').strip("'")
-            return Decimal(normalized)
-        except (InvalidOperation, TypeError): 
-            raise ValueError(f"Valor numérico inválido: '{value_str}'.")
+        return parse_decimal_flexivel(value_str)
 
     def _parse_sex_flexible(self, sex_str: str) -> SexoEnum:
-        """Converte valores flexíveis de sexo para SexoEnum"""
-        if not sex_str:
-            raise ValueError("Sexo é obrigatório")
-        
-        sex_normalized = str(sex_str).strip().upper()
-        
-        # Mapeamentos flexíveis
-        male_values = ['M', 'MASCULINO', 'MALE', 'HOMEM', 'MACHO']
-        female_values = ['F', 'FEMININO', 'FEMALE', 'MULHER', 'FEMEA']
-        
-        if sex_normalized in male_values:
-            return SexoEnum.M
-        elif sex_normalized in female_values:
-            return SexoEnum.F
-        else:
-            raise ValueError(f"Valor de sexo inválido: '{sex_str}'. Use M/F, Masculino/Feminino, etc.")
+        return parse_sexo_flexivel(sex_str)
 
     def _normalize_header(self, header: str) -> str:
-        """Normaliza headers para matching flexível"""
-        if not header:
-            return ""
-        
-        # Remove espaços, converte para minúsculas e remove caracteres especiais
-        normalized = header.strip().lower()
-        normalized = normalized.replace(' ', '_').replace('-', '_').replace('(', '').replace(')', '')
-        
-        # Mapeamentos específicos
-        header_mappings = {
-            'id': 'id_paciente',
-            'identificacao': 'id_paciente',
-            'id_paciente': 'id_paciente',
-            'sus': 'id_paciente',
-            'cpf': 'id_paciente',
-            'cartao_sus': 'id_paciente',
-            'numero_sus': 'id_paciente',
-            'nome_completo': 'nome',
-            'data_de_nascimento': 'data_nascimento',
-            'data_da_avaliacao': 'data_avaliacao',
-            'data_avaliacao': 'data_avaliacao',
-            'gender': 'sexo',
-            'peso_kg': 'peso_kg',
-            'peso__kg_': 'peso_kg',
-            'altura_cm': 'altura_cm',
-            'altura__cm_': 'altura_cm'
-        }
-        
-        return header_mappings.get(normalized, normalized)
+        return normalizar_cabecalho(header)
+
     def process_batch_data(self, file_contents: bytes, filename: str) -> Dict[str, Any]:
         # Validação de arquivo vazio
         if not file_contents:
             raise ValueError("Arquivo está vazio")
+        return self.process_batch_stream(io.BytesIO(file_contents), filename)
+
+    def process_batch_stream(self, stream: BinaryIO, filename: str) -> Dict[str, Any]:
+        """Processa um arquivo em lote lido incrementalmente de um stream binário."""
+        resultados_individuais = ResultadosLote()
+        erros_por_linha: List[ErroLinha] = []
+        for resultados_bloco, erros_bloco in self.iter_batch_stream(stream, filename):
+            resultados_individuais.acrescentar(resultados_bloco)
+            erros_por_linha.extend(erros_bloco)
         
-        try: 
-            decoded_content = file_contents.decode('utf-8-sig')  # Remove BOM se existir
-        except UnicodeDecodeError: 
+        return {
+            "resultados_individuais": resultados_individuais, 
+            "erros_por_linha": erros_por_linha,
+            "total_rows_attempted": len(resultados_individuais) + len(erros_por_linha)
+        }
+
+    def _iter_text_lines(self, stream: BinaryIO, chunk_size: int) -> Iterator[str]:
+        """
+        Decodifica o stream em blocos de `chunk_size` bytes e devolve uma
+        linha de texto por vez, com o fim de linha original ('\\r\\n', '\\r'
+        ou '\\n'), que o csv.reader reconhece.
+        """
+        decoder = codecs.getincrementaldecoder('utf-8-sig')()  # Remove BOM se existir
+        pending = ''
+        while True:
+            chunk = stream.read(chunk_size)
             try:
-                decoded_content = file_contents.decode('utf-8')
+                text = pending + decoder.decode(chunk, final=not chunk)
             except UnicodeDecodeError:
                 raise ValueError("Não foi possível decodificar o arquivo. Verifique se ele está no formato UTF-8.")
+            # Um '\r' no fim do bloco pode ser a primeira metade de um '\r\n'
+            limite = len(text) - 1 if chunk and text.endswith('\r') else len(text)
+            inicio = 0
+            for fim_de_linha in _FIM_DE_LINHA.finditer(text, 0, limite):
+                yield text[inicio:fim_de_linha.end()]
+                inicio = fim_de_linha.end()
+            pending = text[inicio:]
+            if not chunk:
+                break
+        if pending:
+            yield pending
+
+    def iter_batch_stream(self, stream: BinaryIO, filename: str) -> Iterator[Tuple[ResultadosLote, List[ErroLinha]]]:
+        """
+        Lê o arquivo em blocos e entrega (resultados, erros) a cada
+        BATCH_CHUNK_ROWS linhas, sem manter o arquivo inteiro em memória.
+        Com BATCH_WORKERS > 1 os blocos são processados num pool de processos,
+        mantendo a ordem das linhas.
+        """
+        raw_blocks = self._iter_raw_blocks(stream, filename)
+        if settings.BATCH_WORKERS > 1 and (self.db is not None or self._snapshot is not None):
+            yield from processar_blocos_em_paralelo(raw_blocks, self.snapshot, self.z_score_metodo, self.numeric_mode, settings.BATCH_WORKERS)
+        else:
+            for raw_block in raw_blocks:
+                yield self.process_raw_block(raw_block)
+
+    def _iter_raw_blocks(self, stream: BinaryIO, filename: str) -> Iterator[BlocoBruto]:
+        """
+        Valida o cabeçalho, monta o plano de leitura do arquivo e agrupa as
+        linhas do csv.reader, com seus números de linha, em blocos. Arquivos
+        Parquet/Arrow e planilhas .xlsx são lidos pelas colunas tipadas, sem
+        parse de texto.
+        """
+        if filename.endswith(EXTENSOES_COLUNARES):
+            yield from iter_blocos_colunares(stream, filename, settings.BATCH_CHUNK_ROWS)
+            return
+        if filename.endswith(EXTENSOES_XLSX):
+            yield from iter_blocos_xlsx(stream, filename, settings.BATCH_CHUNK_ROWS)
+            return
 
+        lines = self._iter_text_lines(stream, settings.UPLOAD_CHUNK_BYTES)
+        sample_lines = list(itertools.islice(lines, 3))  # Pega as primeiras 3 linhas
+        
         # Validação de conteúdo vazio após decodificação
-        if not decoded_content.strip():
+        if not sample_lines:
+            raise ValueError("Arquivo está vazio")
+        if not ''.join(sample_lines).strip():
             raise ValueError("Arquivo não contém dados válidos")
 
-        # Determinar delimitador
+        # Determinar delimitador pelo primeiro bloco
         sniffer = csv.Sniffer()
         try:
-            sample_lines = decoded_content.splitlines()[:3]  # Pega as primeiras 3 linhas
-            if sample_lines:
-                dialect = sniffer.sniff('\n'.join(sample_lines))
-                delimiter = dialect.delimiter
-            else:
-                raise ValueError("Arquivo não contém linhas válidas")
+            dialect = sniffer.sniff('\n'.join(line.rstrip('\r\n') for line in sample_lines))
+            delimiter = dialect.delimiter
         except csv.Error:
             delimiter = ',' if filename.endswith('.csv') else '\t'
         
-        # Processar CSV
-        reader = csv.DictReader(io.StringIO(decoded_content), delimiter=delimiter)
-        
-        # Validar headers obrigatórios
-        required_headers = {'data_nascimento', 'data_avaliacao', 'sexo', 'peso_kg', 'altura_cm'}
-        normalized_headers = {self._normalize_header(header): header for header in reader.fieldnames or []}
-        
-        missing_headers = required_headers - set(normalized_headers.keys())
-        if missing_headers:
-            raise ValueError(f"Headers obrigatórios não encontrados: {', '.join(missing_headers)}")
-        
-        resultados_individuais, erros_por_linha = [], []
-        total_rows_attempted = 0
+        # Processar CSV (linhas vazias são ignoradas, como no DictReader)
+        reader = (row for row in csv.reader(itertools.chain(sample_lines, lines), delimiter=delimiter) if row)
+        plano = IngestionPlan(next(reader, []))  # Valida os headers obrigatórios
         
+        bloco: List[Tuple[int, List[str]]] = []
         for i, row in enumerate(reader):
             line_number = i + 2  # +2 porque começamos da linha 2 (linha 1 é o header)
-            total_rows_attempted += 1
-            
-            try:
-                # Normalizar as chaves do row
-                normalized_row = {}
-                for header, value in row.items():
-                    normalized_key = self._normalize_header(header)
-                    normalized_row[normalized_key] = value.strip() if value else ''
-                
-                # Validar campos obrigatórios (exceto nome que é opcional)
-                for field in required_headers:
-                    if not normalized_row.get(field):
-                        raise ValueError(f"{field} é obrigatório")
-                
-                # Criar IndividuoCreate
-                individuo_data = IndividuoCreate(
-                    id_paciente=normalized_row.get('id_paciente', '').strip() or None,  # Opcional
-                    nome=normalized_row.get('nome', f'Pessoa {line_number-1}'),  # Nome padrão se não informado
-                    data_nascimento=self._parse_date_flexible(normalized_row['data_nascimento']),
-                    data_avaliacao=self._parse_date_flexible(normalized_row['data_avaliacao']),
-                    sexo=self._parse_sex_flexible(normalized_row['sexo']),
-                    peso_kg=self._parse_float_flexible(normalized_row['peso_kg']),
-                    altura_cm=self._parse_float_flexible(normalized_row['altura_cm'])
-                )
-                
-                resultado = self.process_individual_data(individuo_data)
-                resultados_individuais.append(resultado)
+            bloco.append((line_number, row))
+            if len(bloco) >= settings.BATCH_CHUNK_ROWS:
+                if not plano.preparado:
+                    plano.preparar([row for _, row in bloco])
+                yield plano, bloco
+                bloco = []
+        
+        if bloco:
+            if not plano.preparado:
+                plano.preparar([row for _, row in bloco])
+            yield plano, bloco
 
+    def process_raw_block(self, raw_block: BlocoBruto) -> Tuple[ResultadosLote, List[ErroLinha]]:
+        """
+        Valida e avalia um bloco de linhas brutas; também é a unidade de
+        trabalho dos processos do pool. Blocos Parquet/Arrow vão ao motor
+        como colunas; só as linhas com erro são lidas uma a uma.
+        """
+        plano, linhas = raw_block
+        entrada: Optional[EntradaLote] = None
+        if isinstance(linhas, BlocoColunar):
+            bloco = linhas
+            restantes: Sequence[int] = range(len(bloco))
+            if self.db is not None or self._snapshot is not None:
+                entrada, restantes = entrada_do_bloco(plano, bloco)
+            linhas = [(bloco.primeira_linha + i, bloco.linha(i)) for i in restantes]
+
+        erros_por_linha: List[ErroLinha] = []
+        linhas_validas: List[Tuple[int, Individuo, Mapping[str, Any]]] = []
+        for line_number, row in linhas:
+            try:
+                linhas_validas.append((line_number, plano.parse(line_number, row), plano.linha_bruta(row)))
             except Exception as e:
-                erros_por_linha.append(ErroLinha(linha=line_number, erro=str(e), dados_originais=row))
-        
-        return {
-            "resultados_individuais": resultados_individuais, 
-            "erros_por_linha": erros_por_linha,
-            "total_rows_attempted": total_rows_attempted
-        }
\ No newline at end of file
+                erros_por_linha.append(ErroLinha(linha=line_number, erro=str(e), dados_originais=plano.linha_bruta(row)))
+        return self._finish_block(linhas_validas, erros_por_linha, entrada)
+
+    def _finish_block(self, linhas_validas: List[Tuple[int, Individuo, Mapping[str, Any]]], erros_leitura: List[ErroLinha],
+                      entrada: Optional[EntradaLote] = None) -> Tuple[ResultadosLote, List[ErroLinha]]:
+        resultados, erros_calculo = self.process_individuals_batch(linhas_validas, entrada)
+        return resultados, sorted(erros_leitura + erros_calculo, key=lambda erro: erro.linha)
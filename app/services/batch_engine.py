@@ -0,0 +1,206 @@
+# app/services/batch_engine.py
+
+from decimal import ROUND_HALF_EVEN, Decimal
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.services.classification_index import ClassificationIndex
+from app.services.lms import INDICADORES_LMS_RESTRITO, z_scores_lms
+from app.services.reference_snapshot import ReferenceSnapshot, INDICADORES
+
+# Escores z correspondentes às 7 colunas de referência
+Z_SCORES = np.array([-3.0, -2.0, -1.0, 0.0, 1.0, 2.0, 3.0])
+
+# Idade máxima (em meses) em que cada indicador é avaliado
+IDADE_LIMITE_INDICADOR = {'peso_idade': 120, 'estatura_idade': 228, 'imc_idade': 228}
+
+NOMES_INDICADORES = {
+    'peso_idade': "Peso-para-Idade (P/I)",
+    'estatura_idade': "Altura-para-Idade (A/I)",
+    'imc_idade': "IMC-para-Idade (IMC/I)"
+}
+
+CLASSIFICACAO_NAO_ENCONTRADA = "Classificação não encontrada"
+
+# Casas decimais em que os escores z são fixados antes de classificar e arredondar
+CASAS_ESCORE_Z = 10
+
+
+def fixar_escores_z(z):
+    """
+    Fixa escores z (array ou escalar) em CASAS_ESCORE_Z casas decimais.
+
+    O cálculo vetorizado em float e o escalar em Decimal diferem no último
+    bit (-2.9250000000000003 contra -2.925), o que muda round(z, 2) nos
+    empates e a classificação exatamente sobre um ponto de corte. Os dois
+    caminhos passam por aqui antes de classificar e arredondar.
+    """
+    return np.round(z, CASAS_ESCORE_Z)
+
+
+def arredondar_imc(imc: Union[Decimal, float]) -> float:
+    """
+    IMC exibido, com duas casas e arredondamento half-even do Decimal nos
+    dois modos numéricos: 44.1 kg / 168 cm dá exatamente 15.625, que vira
+    15.62 em Decimal mas 15.63 com round() sobre o float calculado. O
+    float é fixado em CASAS_ESCORE_Z casas antes, como os escores z.
+    """
+    if not isinstance(imc, Decimal):
+        imc = Decimal(repr(round(float(imc), CASAS_ESCORE_Z)))
+    return float(imc.quantize(Decimal('0.01'), rounding=ROUND_HALF_EVEN))
+
+
+def interpolar_z_scores(valores: np.ndarray, referencias: np.ndarray) -> np.ndarray:
+    """
+    Versão vetorizada de AnthropometryService._interpolate_z_score.
+
+    `referencias` tem forma (n, 7), uma linha de valores de referência por
+    medida. A faixa de cada medida é a posição de inserção (searchsorted à
+    esquerda) do valor na sua linha, obtida contando os valores de
+    referência estritamente menores; a interpolação linear é feita de uma
+    vez. Fora das curvas o escore é limitado a ±3.1; linhas sem referência
+    resultam em NaN.
+    """
+    n = len(valores)
+    z = np.full(n, np.nan)
+    if n == 0:
+        return z
+
+    completas = ~np.isnan(referencias).any(axis=1)
+    abaixo = completas & (valores < referencias[:, 0])
+    acima = completas & (valores > referencias[:, -1])
+    dentro = completas & ~abaixo & ~acima
+    z[abaixo] = -3.1
+    z[acima] = 3.1
+
+    refs = referencias[dentro]
+    v = valores[dentro]
+    if len(v):
+        posicoes = (refs < v[:, None]).sum(axis=1)
+        faixa = np.clip(posicoes - 1, 0, refs.shape[1] - 2)
+
+        linhas = np.arange(len(v))
+        inferior = refs[linhas, faixa]
+        superior = refs[linhas, faixa + 1]
+        intervalo = superior - inferior
+        with np.errstate(divide='ignore', invalid='ignore'):
+            proporcao = np.where(intervalo == 0, 0.0, (v - inferior) / intervalo)
+        z[dentro] = Z_SCORES[faixa] + proporcao * (Z_SCORES[faixa + 1] - Z_SCORES[faixa])
+
+    return z
+
+
+def interpolar_z_score(valor: float, referencias: Sequence[Optional[float]]) -> Optional[float]:
+    """
+    Versão em float de AnthropometryService._interpolate_z_score (modo
+    numérico "float"): mesma busca da primeira faixa que contém o valor,
+    sem converter as referências para Decimal.
+    """
+    for i in range(len(referencias) - 1):
+        inferior, superior = referencias[i], referencias[i + 1]
+        if inferior is not None and superior is not None and inferior <= valor <= superior:
+            intervalo = superior - inferior
+            if intervalo == 0:
+                return float(Z_SCORES[i])
+            return float(Z_SCORES[i]) + (valor - inferior) / intervalo * float(Z_SCORES[i + 1] - Z_SCORES[i])
+
+    if referencias[0] is not None and valor < referencias[0]:
+        return -3.1
+    if referencias[-1] is not None and valor > referencias[-1]:
+        return 3.1
+    return None
+
+
+def classificar_z_scores(indice: ClassificationIndex, idades: np.ndarray, z: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+    """
+    Classifica um array de escores z de uma vez.
+
+    Retorna códigos inteiros (índices em `rotulos`, -1 quando nenhuma regra
+    se aplica) e a lista de rótulos do índice.
+    """
+    codigos = np.full(len(z), -1, dtype=np.int64)
+    rotulos: List[str] = []
+    for faixa in indice.faixas:
+        deslocamento = len(rotulos)
+        rotulos.extend(faixa.rotulos)
+        # A primeira faixa etária que classifica a medida prevalece
+        candidatos = np.flatnonzero((codigos == -1) & (idades >= faixa.idade_min) & (idades <= faixa.idade_max))
+        if not len(candidatos) or not faixa.cortes_max:
+            continue
+        z_faixa = z[candidatos]
+        cortes_max = np.asarray(faixa.cortes_max)
+        cortes_min = np.asarray(faixa.cortes_min)
+        posicoes = np.searchsorted(cortes_max, z_faixa, side='left')
+        posicoes_limitadas = np.minimum(posicoes, len(cortes_max) - 1)
+        validos = (posicoes < len(cortes_max)) & (cortes_min[posicoes_limitadas] < z_faixa)
+        codigos[candidatos[validos]] = posicoes[validos] + deslocamento
+    return codigos, rotulos
+
+
+class LoteCalculado:
+    """Resultado colunar de calcular_lote: um array por grandeza, alinhado às linhas de entrada."""
+
+    def __init__(self, idade_meses: np.ndarray, imc: np.ndarray):
+        self.idade_meses = idade_meses
+        self.imc = imc
+        self.escores_z: Dict[str, np.ndarray] = {}
+        self.codigos_classificacao: Dict[str, np.ndarray] = {}
+        self.rotulos: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.idade_meses)
+
+    def classificacao(self, indicador: str, i: int) -> str:
+        codigo = self.codigos_classificacao[indicador][i]
+        return self.rotulos[indicador][codigo] if codigo >= 0 else CLASSIFICACAO_NAO_ENCONTRADA
+
+
+def calcular_lote(snapshot: ReferenceSnapshot, sexo: np.ndarray, idade_meses: np.ndarray,
+                  peso_kg: np.ndarray, altura_cm: np.ndarray, metodo: str = 'interpolacao') -> LoteCalculado:
+    """
+    Calcula IMC, escores z e classificações para colunas inteiras.
+
+    `sexo` contém índices em SEXOS (0 = M, 1 = F). Os valores de
+    referência de cada linha são obtidos por indexação avançada no array
+    denso do snapshot. Com metodo='lms' o escore vem da fórmula LMS onde
+    houver parâmetros, e da interpolação nas demais linhas. Indicadores
+    não aplicáveis à idade ficam com NaN.
+    """
+    sexo = np.asarray(sexo, dtype=np.int64)
+    idade_meses = np.asarray(idade_meses, dtype=np.int64)
+    peso_kg = np.asarray(peso_kg, dtype=np.float64)
+    altura_cm = np.asarray(altura_cm, dtype=np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        altura_m = altura_cm / 100
+        imc = np.where(altura_cm > 0, peso_kg / (altura_m * altura_m), np.nan)
+
+    lote = LoteCalculado(idade_meses, imc)
+    medidas = {'peso_idade': peso_kg, 'estatura_idade': altura_cm, 'imc_idade': imc}
+    idade_indice = np.clip(idade_meses, 0, snapshot.valores.shape[2] - 1)
+
+    for i_ind, indicador in enumerate(INDICADORES):
+        aplicavel = (idade_meses >= 0) & (idade_meses <= IDADE_LIMITE_INDICADOR[indicador])
+        aplicavel &= idade_meses < snapshot.valores.shape[2]
+        referencias = snapshot.valores[i_ind, sexo, idade_indice]
+        referencias = np.where(aplicavel[:, None], referencias, np.nan)
+
+        z = interpolar_z_scores(medidas[indicador], referencias)
+        if metodo == 'lms':
+            parametros = snapshot.lms[i_ind, sexo, idade_indice]
+            z_lms = z_scores_lms(medidas[indicador], parametros[:, 0], parametros[:, 1], parametros[:, 2],
+                                 restrito=indicador in INDICADORES_LMS_RESTRITO)
+            z = np.where(aplicavel & ~np.isnan(z_lms), z_lms, z)
+        z = fixar_escores_z(z)
+        lote.escores_z[indicador] = z
+
+        indice = snapshot.indices_classificacao.get(indicador)
+        if indice is not None:
+            codigos, rotulos = classificar_z_scores(indice, idade_meses, z)
+        else:
+            codigos, rotulos = np.full(len(z), -1, dtype=np.int64), []
+        lote.codigos_classificacao[indicador] = codigos
+        lote.rotulos[indicador] = rotulos
+
+    return lote
@@ -0,0 +1,154 @@
+# app/services/batch_jobs.py
+
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.models import ErroLinha
+from app.services.records import ResultadosLote
+from app.services.anthropometry_service import AnthropometryService
+from app.services.reference_snapshot import ReferenceSnapshot
+from app.services.result_store import result_store
+
+STATUS_NA_FILA = "na_fila"
+STATUS_PROCESSANDO = "processando"
+STATUS_CONCLUIDO = "concluido"
+STATUS_FALHOU = "falhou"
+STATUS_CANCELADO = "cancelado"
+
+
+class BatchJob:
+    """Estado de um processamento em lote executado em segundo plano."""
+
+    def __init__(self, filename: str):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.status = STATUS_NA_FILA
+        self.criado_em = time.time()
+        self.iniciado_em: Optional[float] = None
+        self.finalizado_em: Optional[float] = None
+        self.erro: Optional[str] = None
+        self.resultados = ResultadosLote()
+        self.erros: List[ErroLinha] = []
+        # Handle dos resultados no result_store, guardados uma vez ao concluir
+        self.results_handle: Optional[str] = None
+
+    @property
+    def linhas_processadas(self) -> int:
+        return len(self.resultados) + len(self.erros)
+
+    @property
+    def finalizado(self) -> bool:
+        return self.status in (STATUS_CONCLUIDO, STATUS_FALHOU, STATUS_CANCELADO)
+
+    def resumo(self) -> Dict[str, Any]:
+        return {
+            "total_processed": self.linhas_processadas,
+            "success_count": len(self.resultados),
+            "error_count": len(self.erros)
+        }
+
+    def progresso(self) -> Dict[str, Any]:
+        """Resumo do andamento, com a vazão em linhas por segundo."""
+        duracao = None
+        if self.iniciado_em is not None:
+            duracao = (self.finalizado_em or time.time()) - self.iniciado_em
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "rows_processed": self.linhas_processadas,
+            "success_count": len(self.resultados),
+            "error_count": len(self.erros),
+            "elapsed_seconds": round(duracao, 3) if duracao is not None else None,
+            "rows_per_second": round(self.linhas_processadas / duracao, 1) if duracao else None,
+            "error": self.erro
+        }
+
+
+class BatchJobManager:
+    """
+    Fila de lotes processados em threads do próprio servidor, sem broker.
+
+    O arquivo enviado é mantido num arquivo temporário até o worker lê-lo;
+    os resultados ficam em memória até expirarem (`ttl_segundos` após o fim).
+    Com BATCH_WORKERS > 1 o cálculo em si ainda é distribuído pelo pool de
+    processos de app.services.parallel_batch.
+    """
+
+    def __init__(self, max_workers: int, ttl_segundos: int):
+        self.max_workers = max_workers
+        self.ttl_segundos = ttl_segundos
+        self._jobs: Dict[str, BatchJob] = {}
+        # Jobs ainda na fila do executor, com o arquivo enviado e o future
+        self._na_fila: Dict[str, Tuple[BatchJob, BinaryIO, Future]] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def submeter(self, arquivo: BinaryIO, filename: str, snapshot: ReferenceSnapshot, metodo: str) -> BatchJob:
+        """Registra o job e agenda o processamento; `arquivo` passa a ser do job."""
+        job = BatchJob(filename)
+        with self._lock:
+            self._remover_expirados()
+            self._jobs[job.id] = job
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="lote")
+            # _executar retira o job da fila sob o mesmo lock, então só depois deste registro
+            futuro = self._executor.submit(self._executar, job, arquivo, snapshot, metodo)
+            self._na_fila[job.id] = (job, arquivo, futuro)
+        return job
+
+    def obter(self, job_id: str) -> Optional[BatchJob]:
+        with self._lock:
+            self._remover_expirados()
+            return self._jobs.get(job_id)
+
+    def encerrar(self) -> None:
+        """Encerra o executor; os jobs que ainda não começaram ficam cancelados e seus arquivos são fechados."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            for job, arquivo, futuro in self._na_fila.values():
+                if futuro.cancelled():
+                    arquivo.close()
+                    job.erro = "O servidor foi encerrado antes de o job começar."
+                    job.finalizado_em = time.time()
+                    job.status = STATUS_CANCELADO
+            self._na_fila.clear()
+
+    def _remover_expirados(self) -> None:
+        limite = time.time() - self.ttl_segundos
+        for job_id in [j.id for j in self._jobs.values() if j.finalizado and j.finalizado_em < limite]:
+            del self._jobs[job_id]
+
+    def _executar(self, job: BatchJob, arquivo: BinaryIO, snapshot: ReferenceSnapshot, metodo: str) -> None:
+        with self._lock:
+            self._na_fila.pop(job.id, None)
+        job.status = STATUS_PROCESSANDO
+        job.iniciado_em = time.time()
+        status = STATUS_FALHOU
+        try:
+            service = AnthropometryService(db=None, snapshot=snapshot)
+            service.z_score_metodo = metodo
+            for resultados, erros in service.iter_batch_stream(arquivo, job.filename):
+                job.resultados.acrescentar(resultados)
+                job.erros.extend(erros)
+            job.results_handle = result_store.guardar(job.resultados, job.erros, job.resumo())
+            status = STATUS_CONCLUIDO
+        except ValueError as ve:
+            job.erro = str(ve)
+        except Exception as e:
+            print(f"Erro inesperado no job de lote {job.id}: {e}")
+            job.erro = f"Erro interno no servidor ao processar o lote: {e}"
+        finally:
+            arquivo.close()
+            job.finalizado_em = time.time()
+            job.status = status
+
+
+# Gerenciador único do servidor, usado pelos endpoints /api/jobs
+batch_jobs = BatchJobManager(settings.BATCH_JOB_WORKERS, settings.BATCH_JOB_TTL_SECONDS)
@@ -0,0 +1,61 @@
+# app/services/batch_streaming.py
+
+import itertools
+from typing import Any, Iterator, List, Optional, Tuple
+
+from app.models import ErroLinha
+from app.services.json_serialization import dumps, erro_json, resultado_json
+from app.services.records import ResultadoRegistro
+
+MEDIA_TYPE_NDJSON = "application/x-ndjson"
+
+BlocoLote = Tuple[List[ResultadoRegistro], List[ErroLinha]]
+
+
+def iniciar_blocos(blocos: Iterator[BlocoLote]) -> Iterator[BlocoLote]:
+    """
+    Processa o primeiro bloco antes de a resposta começar.
+
+    Erros de validação do arquivo (cabeçalhos, arquivo vazio) acontecem na
+    leitura do primeiro bloco e ainda podem virar um HTTP 400 normal; depois
+    que o stream começa, só é possível reportá-los como uma linha de erro.
+    """
+    primeiro: Optional[BlocoLote] = next(blocos, None)
+    if primeiro is None:
+        return iter(())
+    return itertools.chain([primeiro], blocos)
+
+
+def _linha(tipo: str, **conteudo: Any) -> bytes:
+    return dumps({"tipo": tipo, **conteudo}) + b"\n"
+
+
+def iter_ndjson_lote(blocos: Iterator[BlocoLote]) -> Iterator[bytes]:
+    """
+    Serializa um lote como NDJSON: uma linha por resultado ou erro, na ordem
+    em que os blocos ficam prontos, seguida de uma linha final de resumo.
+    """
+    success_count = error_count = 0
+    try:
+        for resultados, erros in blocos:
+            for resultado in resultados:
+                yield _linha("resultado", dados=resultado_json(resultado))
+            for erro in erros:
+                yield _linha("erro", dados=erro_json(erro))
+            success_count += len(resultados)
+            error_count += len(erros)
+    except ValueError as ve:
+        yield _linha("erro_fatal", erro=str(ve))
+        success = False
+    else:
+        success = True
+
+    yield _linha(
+        "resumo",
+        success=success,
+        summary={
+            "total_processed": success_count + error_count,
+            "success_count": success_count,
+            "error_count": error_count
+        }
+    )
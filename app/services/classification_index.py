@@ -0,0 +1,71 @@
+# app/services/classification_index.py
+
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+# (idade_min_meses, idade_max_meses, z_score_min, z_score_max, classificacao)
+RegraClassificacao = Tuple[int, int, float, float, str]
+
+
+class FaixaEtaria:
+    """Regras de uma faixa etária compiladas em cortes ordenados por z_score_max."""
+
+    __slots__ = ('idade_min', 'idade_max', 'cortes_min', 'cortes_max', 'rotulos')
+
+    def __init__(self, idade_min: int, idade_max: int, regras: List[RegraClassificacao]):
+        self.idade_min = idade_min
+        self.idade_max = idade_max
+        self.cortes_min: List[float] = []
+        self.cortes_max: List[float] = []
+        self.rotulos: List[str] = []
+        for _, _, z_min, z_max, classificacao in sorted(regras, key=lambda r: r[3]):
+            # Regras duplicadas: prevalece a primeira, como no .first() da consulta SQL
+            if self.cortes_max and self.cortes_max[-1] == z_max:
+                continue
+            self.cortes_min.append(z_min)
+            self.cortes_max.append(z_max)
+            self.rotulos.append(classificacao)
+
+    def classificar(self, z_score: float) -> Optional[str]:
+        # Intervalos semiabertos (z_score_min, z_score_max]: o primeiro corte >= z decide
+        i = bisect_left(self.cortes_max, z_score)
+        if i < len(self.cortes_max) and self.cortes_min[i] < z_score:
+            return self.rotulos[i]
+        return None
+
+
+class ClassificationIndex:
+    """
+    Índice de classificação de um indicador, compilado uma única vez.
+
+    As regras são agrupadas por faixa etária e, dentro de cada faixa,
+    ordenadas pelos cortes de escore z, de modo que a classificação é
+    uma busca binária O(log k) sem nenhum acesso ao banco. Supõe que as
+    faixas de escore z de uma mesma faixa etária não se sobrepõem, como
+    em regras_classificacao_sisvan.csv.
+    """
+
+    def __init__(self, regras: List[RegraClassificacao]):
+        regras_por_faixa: Dict[Tuple[int, int], List[RegraClassificacao]] = {}
+        for regra in regras:
+            regras_por_faixa.setdefault((regra[0], regra[1]), []).append(regra)
+        self.faixas = [FaixaEtaria(idade_min, idade_max, regras_faixa)
+                       for (idade_min, idade_max), regras_faixa in regras_por_faixa.items()]
+
+        idade_limite = max((faixa.idade_max for faixa in self.faixas), default=-1)
+        self._faixas_por_idade: List[Tuple[FaixaEtaria, ...]] = [
+            tuple(faixa for faixa in self.faixas if faixa.idade_min <= idade <= faixa.idade_max)
+            for idade in range(idade_limite + 1)
+        ]
+
+    def faixas_da_idade(self, idade_meses: int) -> Tuple[FaixaEtaria, ...]:
+        if 0 <= idade_meses < len(self._faixas_por_idade):
+            return self._faixas_por_idade[idade_meses]
+        return ()
+
+    def classificar(self, idade_meses: int, z_score: float) -> Optional[str]:
+        for faixa in self.faixas_da_idade(idade_meses):
+            classificacao = faixa.classificar(z_score)
+            if classificacao is not None:
+                return classificacao
+        return None
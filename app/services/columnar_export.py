@@ -0,0 +1,167 @@
+# app/services/columnar_export.py
+
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.batch_engine import CLASSIFICACAO_NAO_ENCONTRADA, NOMES_INDICADORES
+from app.services.export_service import indicadores_por_coluna
+from app.services.pyarrow_support import importar_pyarrow
+from app.services.records import ColunasResultados, Resultado, ResultadosLote
+from app.services.reference_snapshot import SEXOS
+
+MEDIA_TYPE_ARROW = "application/vnd.apache.arrow.file"
+MEDIA_TYPE_PARQUET = "application/vnd.apache.parquet"
+
+# Linhas por record batch (IPC) e por row group (Parquet)
+LINHAS_POR_GRUPO = 65536
+
+# Indicadores na ordem das colunas de classificação da exportação (P/I, A/I, IMC/I)
+INDICADORES_EXPORTACAO = tuple(NOMES_INDICADORES)
+
+
+class _Categorias:
+    """Códigos de uma coluna categórica, com o dicionário montado na ordem em que os rótulos aparecem."""
+
+    def __init__(self, total: int):
+        self.codigos = np.full(total, -1, dtype=np.int32)
+        self.rotulos: List[str] = []
+        self._codigo_por_rotulo: Dict[str, int] = {}
+
+    def definir(self, i: int, rotulo: str) -> None:
+        codigo = self._codigo_por_rotulo.get(rotulo)
+        if codigo is None:
+            codigo = self._codigo_por_rotulo[rotulo] = len(self.rotulos)
+            self.rotulos.append(rotulo)
+        self.codigos[i] = codigo
+
+    def para_arrow(self, pa):
+        return pa.DictionaryArray.from_arrays(
+            pa.array(self.codigos, mask=self.codigos < 0),
+            pa.array(self.rotulos, type=pa.string())
+        )
+
+
+def tabela_resultados(resultados: Sequence[Resultado], escola: Optional[str] = None, turma: Optional[str] = None):
+    """
+    Monta uma pyarrow.Table com os resultados, uma coluna tipada por grandeza:
+    datas como date32, idade em meses inteira, IMC e escores z em float64 e
+    sexo e classificações como colunas categóricas (dictionary). Indicadores
+    não avaliados ficam nulos.
+
+    Resultados do motor vetorizado (ResultadosLote) viram colunas direto dos
+    arrays calculados no lote; só os resultados reenviados pelo cliente são
+    percorridos registro a registro.
+    """
+    pa = importar_pyarrow()
+    total = len(resultados)
+    colunas_lote = resultados.colunas() if isinstance(resultados, ResultadosLote) else None
+
+    colunas = {}
+    if escola:
+        colunas['escola'] = pa.DictionaryArray.from_arrays(pa.array(np.zeros(total, dtype=np.int32)), pa.array([escola]))
+    if turma:
+        colunas['turma'] = pa.DictionaryArray.from_arrays(pa.array(np.zeros(total, dtype=np.int32)), pa.array([turma]))
+    if colunas_lote is not None:
+        colunas.update(_colunas_do_lote(pa, colunas_lote))
+    else:
+        colunas.update(_colunas_dos_registros(pa, resultados))
+    return pa.table(colunas)
+
+
+def _colunas_do_lote(pa, lote: ColunasResultados) -> Dict[str, Any]:
+    # O sexo dos registros é o nome do SexoEnum, igual aos valores de SEXOS
+    colunas = {
+        'id_paciente': pa.array(lote.id_paciente, type=pa.string()),
+        'nome': pa.array(lote.nome, type=pa.string()),
+        'sexo': pa.DictionaryArray.from_arrays(pa.array(lote.sexo.astype(np.int32)), pa.array(list(SEXOS))),
+        'data_nascimento': pa.array(lote.data_nascimento, type=pa.date32()),
+        'data_avaliacao': pa.array(lote.data_avaliacao, type=pa.date32()),
+        'idade_meses': pa.array(lote.idade_meses.astype(np.int32)),
+        'peso_kg': pa.array(lote.peso_kg),
+        'altura_cm': pa.array(lote.altura_cm),
+        'imc': pa.array(lote.imc, mask=np.isnan(lote.imc)),
+    }
+    for indicador in INDICADORES_EXPORTACAO:
+        escores = lote.escores_z[indicador]
+        ausentes = np.isnan(escores)
+        codigos = lote.codigos_classificacao[indicador]
+        rotulos = lote.rotulos[indicador] + [CLASSIFICACAO_NAO_ENCONTRADA]
+        # Escore sem regra de classificação: o mesmo rótulo dos registros
+        codigos = np.where(codigos < 0, len(rotulos) - 1, codigos).astype(np.int32)
+        colunas[f'escore_z_{indicador}'] = pa.array(escores, mask=ausentes)
+        colunas[f'classificacao_{indicador}'] = pa.DictionaryArray.from_arrays(
+            pa.array(codigos, mask=ausentes), pa.array(rotulos, type=pa.string()))
+    return colunas
+
+
+def _colunas_dos_registros(pa, resultados: Sequence[Resultado]) -> Dict[str, Any]:
+    total = len(resultados)
+    ids: List[Optional[str]] = [None] * total
+    nomes: List[str] = [''] * total
+    nascimentos: List[Any] = [None] * total
+    avaliacoes: List[Any] = [None] * total
+    sexos = _Categorias(total)
+    idades = np.zeros(total, dtype=np.int32)
+    sem_idade = np.zeros(total, dtype=bool)
+    pesos = np.empty(total, dtype=np.float64)
+    alturas = np.empty(total, dtype=np.float64)
+    imcs = np.full(total, np.nan)
+    escores = np.full((len(INDICADORES_EXPORTACAO), total), np.nan)
+    classificacoes = [_Categorias(total) for _ in INDICADORES_EXPORTACAO]
+
+    for i, resultado in enumerate(resultados):
+        ids[i] = resultado.id_paciente
+        nomes[i] = resultado.nome
+        nascimentos[i] = resultado.data_nascimento
+        avaliacoes[i] = resultado.data_avaliacao
+        sexos.definir(i, resultado.sexo)
+        # Resultados reenviados pelo cliente não trazem a idade em meses
+        if resultado.idade_meses is None:
+            sem_idade[i] = True
+        else:
+            idades[i] = resultado.idade_meses
+        pesos[i] = resultado.peso_kg
+        alturas[i] = resultado.altura_cm
+        if resultado.imc is not None:
+            imcs[i] = resultado.imc
+
+        # Como na exportação CSV, o primeiro indicador de cada tipo vale
+        for coluna, indicador in enumerate(indicadores_por_coluna(resultado.indicadores)):
+            if indicador is not None:
+                escores[coluna, i] = indicador.escore_z
+                classificacoes[coluna].definir(i, indicador.classificacao)
+
+    colunas = {
+        'id_paciente': pa.array(ids, type=pa.string()),
+        'nome': pa.array(nomes, type=pa.string()),
+        'sexo': sexos.para_arrow(pa),
+        'data_nascimento': pa.array(nascimentos, type=pa.date32()),
+        'data_avaliacao': pa.array(avaliacoes, type=pa.date32()),
+        'idade_meses': pa.array(idades, mask=sem_idade),
+        'peso_kg': pa.array(pesos),
+        'altura_cm': pa.array(alturas),
+        'imc': pa.array(imcs, mask=np.isnan(imcs)),
+    }
+    for coluna, indicador in enumerate(INDICADORES_EXPORTACAO):
+        colunas[f'escore_z_{indicador}'] = pa.array(escores[coluna], mask=np.isnan(escores[coluna]))
+        colunas[f'classificacao_{indicador}'] = classificacoes[coluna].para_arrow(pa)
+    return colunas
+
+
+def escrever_arrow_exportacao(resultados: Sequence[Resultado], escola: Optional[str],
+                              turma: Optional[str], destino: BinaryIO) -> None:
+    """Grava os resultados em `destino` no formato de arquivo Arrow IPC (Feather v2), comprimido com zstd."""
+    pa = importar_pyarrow()
+    tabela = tabela_resultados(resultados, escola, turma)
+    opcoes = pa.ipc.IpcWriteOptions(compression='zstd')
+    with pa.ipc.new_file(destino, tabela.schema, options=opcoes) as writer:
+        writer.write_table(tabela, max_chunksize=LINHAS_POR_GRUPO)
+
+
+def escrever_parquet_exportacao(resultados: Sequence[Resultado], escola: Optional[str],
+                                turma: Optional[str], destino: BinaryIO) -> None:
+    """Grava os resultados em `destino` como Parquet, comprimido com zstd."""
+    pa = importar_pyarrow()
+    tabela = tabela_resultados(resultados, escola, turma)
+    pa.parquet.write_table(tabela, destino, compression='zstd', row_group_size=LINHAS_POR_GRUPO)
@@ -0,0 +1,173 @@
+# app/services/columnar_ingestion.py
+
+from typing import Any, BinaryIO, Iterator, List, Tuple
+
+import numpy as np
+
+from app.services.age import datas_para_array
+from app.services.date_parsing import TAMANHO_AMOSTRA
+from app.services.ingestion_plan import DATE_COLUMNS, NUMBER_COLUMNS, TypedIngestionPlan, colunas_usadas, normalizar_cabecalho
+from app.services.pyarrow_support import importar_pyarrow
+from app.services.records import EntradaLote
+from app.services.reference_snapshot import SEXOS
+
+EXTENSOES_PARQUET = ('.parquet',)
+EXTENSOES_ARROW = ('.arrow', '.feather', '.ipc')
+EXTENSOES_COLUNARES = EXTENSOES_PARQUET + EXTENSOES_ARROW
+
+
+class BlocoColunar:
+    """
+    Bloco de um arquivo Parquet/Arrow: a fatia do record batch só com as
+    colunas usadas, na ordem do plano de leitura, e o número da sua
+    primeira linha. Chega assim, sem virar linhas, ao serviço e aos
+    processos do pool.
+    """
+
+    __slots__ = ('lote', 'primeira_linha')
+
+    def __init__(self, lote: Any, primeira_linha: int):
+        self.lote = lote
+        self.primeira_linha = primeira_linha
+
+    def __len__(self) -> int:
+        return self.lote.num_rows
+
+    def linha(self, i: int) -> Tuple[Any, ...]:
+        """Valores da i-ésima linha do bloco, como a leitura linha a linha os recebe."""
+        return tuple(coluna[i].as_py() for coluna in self.lote.columns)
+
+
+def _valores_distintos(coluna: Any) -> Tuple[List[Any], np.ndarray]:
+    """Valores distintos da coluna (com None no fim, para os nulos) e a posição do valor de cada linha nessa lista."""
+    pa = importar_pyarrow()
+    try:
+        codificada = coluna if pa.types.is_dictionary(coluna.type) else coluna.dictionary_encode()
+    except pa.ArrowNotImplementedError:
+        # Tipos sem dictionary_encode: cada linha é um valor
+        return coluna.to_pylist() + [None], np.arange(len(coluna))
+    distintos = codificada.dictionary.to_pylist() + [None]
+    posicoes = codificada.indices.fill_null(len(distintos) - 1).to_numpy(zero_copy_only=False)
+    return distintos, posicoes.astype(np.int64)
+
+
+def entrada_do_bloco(plano: TypedIngestionPlan, bloco: BlocoColunar) -> Tuple[EntradaLote, List[int]]:
+    """
+    Valida e converte um bloco coluna a coluna, para o motor vetorizado:
+    cada valor distinto é convertido uma vez (datas e números tipados sem
+    passar por texto) e espalhado pelas linhas com os índices do
+    dicionário. Devolve a entrada das linhas válidas e as posições das
+    demais (valor ausente ou inválido, avaliação antes do nascimento), que
+    seguem por plano.parse para ter as mesmas mensagens de erro.
+    """
+    colunas = bloco.lote.columns
+    validas = np.ones(len(bloco), dtype=bool)
+    por_linha = {}
+    for campo, indice in plano.obrigatorios:
+        distintos, posicoes = _valores_distintos(colunas[indice])
+        convertidos = plano.converter_valores(campo, distintos)
+        validas &= np.array([valor is not None for valor in convertidos])[posicoes]
+        por_linha[campo] = (convertidos, posicoes)
+
+    def datas(campo: str) -> np.ndarray:
+        convertidos, posicoes = por_linha[campo]
+        return datas_para_array(convertidos)[posicoes]
+
+    def medidas(campo: str) -> Tuple[np.ndarray, np.ndarray]:
+        convertidos, posicoes = por_linha[campo]
+        reais = np.array([float(valor) if valor is not None else np.nan for valor in convertidos])
+        return reais[posicoes], np.array(convertidos, dtype=object)[posicoes]
+
+    convertidos, posicoes = por_linha['sexo']
+    sexo = np.array([SEXOS.index(valor.value) if valor is not None else -1 for valor in convertidos], dtype=np.int64)[posicoes]
+    nascimentos, avaliacoes = datas('data_nascimento'), datas('data_avaliacao')
+    peso_kg, peso_decimal = medidas('peso_kg')
+    altura_cm, altura_decimal = medidas('altura_cm')
+    # Datas ausentes são NaT, que nunca compara como menor
+    validas &= ~(avaliacoes < nascimentos)
+
+    linhas = bloco.primeira_linha + np.flatnonzero(validas)
+
+    def textos(indice: int) -> List[str]:
+        distintos, posicoes = _valores_distintos(colunas[indice])
+        return np.array(plano.converter_textos(distintos), dtype=object)[posicoes][validas].tolist()
+
+    entrada = EntradaLote(
+        linhas=linhas,
+        id_paciente=[texto or None for texto in textos(plano.indice_id)] if plano.indice_id is not None else [None] * len(linhas),
+        # Nome padrão se a coluna não existir
+        nome=textos(plano.indice_nome) if plano.indice_nome is not None else [f'Pessoa {linha - 1}' for linha in linhas.tolist()],
+        sexo=sexo[validas],
+        data_nascimento=nascimentos[validas],
+        data_avaliacao=avaliacoes[validas],
+        peso_kg=peso_kg[validas],
+        altura_cm=altura_cm[validas],
+        peso_decimal=peso_decimal[validas].tolist(),
+        altura_decimal=altura_decimal[validas].tolist()
+    )
+    return entrada, np.flatnonzero(~validas).tolist()
+
+
+def _colunas_tipadas(schema, nomes: List[str]) -> List[str]:
+    """Campos (normalizados) cujas colunas já têm tipo de data ou numérico no arquivo."""
+    pa = importar_pyarrow()
+    tipadas = []
+    for nome in nomes:
+        campo = normalizar_cabecalho(nome)
+        tipo = schema.field(nome).type
+        if pa.types.is_dictionary(tipo):
+            tipo = tipo.value_type
+        if campo in DATE_COLUMNS and (pa.types.is_date(tipo) or pa.types.is_timestamp(tipo)):
+            tipadas.append(campo)
+        elif campo in NUMBER_COLUMNS and (pa.types.is_integer(tipo) or pa.types.is_floating(tipo) or pa.types.is_decimal(tipo)):
+            tipadas.append(campo)
+    return tipadas
+
+
+def _abrir(stream: BinaryIO, filename: str) -> Tuple[Any, Iterator[Any]]:
+    """Schema do arquivo e um iterador de record batches (ainda com todas as colunas)."""
+    pa = importar_pyarrow()
+    if filename.endswith(EXTENSOES_PARQUET):
+        arquivo = pa.parquet.ParquetFile(stream)
+        return arquivo.schema_arrow, arquivo
+    try:
+        leitor = pa.ipc.open_file(stream)
+        return leitor.schema, (leitor.get_batch(i) for i in range(leitor.num_record_batches))
+    except pa.ArrowInvalid:
+        # Formato de stream do Arrow (sem o rodapé do formato de arquivo)
+        stream.seek(0)
+        leitor = pa.ipc.open_stream(stream)
+        return leitor.schema, iter(leitor)
+
+
+def iter_blocos_colunares(stream: BinaryIO, filename: str, linhas_por_bloco: int) -> Iterator[Tuple[TypedIngestionPlan, BlocoColunar]]:
+    """
+    Lê um arquivo Parquet ou Arrow IPC em blocos de até `linhas_por_bloco`
+    linhas, só com as colunas usadas no cálculo. Os blocos seguem como
+    colunas (ver entrada_do_bloco); datas e números tipados não passam por
+    texto e colunas de texto seguem as regras do CSV. As linhas são
+    numeradas como no CSV (a primeira linha de dados é a 2).
+    """
+    pa = importar_pyarrow()
+    try:
+        schema, origem = _abrir(stream, filename)
+        nomes = [schema.names[i] for i in colunas_usadas(schema.names)]
+        plano = TypedIngestionPlan(nomes, _colunas_tipadas(schema, nomes))  # Valida os headers obrigatórios
+
+        if isinstance(origem, pa.parquet.ParquetFile):
+            lotes = origem.iter_batches(batch_size=linhas_por_bloco, columns=nomes)
+        else:
+            lotes = (lote.select(nomes) for lote in origem)
+
+        line_number = 2
+        for lote in lotes:
+            for inicio in range(0, lote.num_rows, linhas_por_bloco):
+                bloco = BlocoColunar(lote.slice(inicio, linhas_por_bloco), line_number)
+                line_number += len(bloco)
+                if not len(bloco):
+                    continue
+                if not plano.preparado:
+                    plano.preparar([bloco.linha(i) for i in range(min(len(bloco), TAMANHO_AMOSTRA))])
+                yield plano, bloco
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, OSError) as e:
+        raise ValueError(f"Não foi possível ler o arquivo {filename}: {e}")
@@ -0,0 +1,113 @@
+# app/services/date_parsing.py
+
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, Optional
+
+# Formatos aceitos nos arquivos de lote, na ordem em que são tentados
+FORMATOS_DATA = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y')
+
+# Valores usados para detectar o formato de uma coluna
+TAMANHO_AMOSTRA = 20
+
+# Limite de textos de data distintos memorizados por coluna
+MAX_DATAS_MEMORIZADAS = 4096
+
+
+def parse_data_flexivel(texto: str) -> date:
+    for fmt in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto, fmt).date()
+        except (ValueError, TypeError):
+            continue
+    raise ValueError(f"Formato de data inválido: '{texto}'. Use AAAA-MM-DD ou DD/MM/AAAA.")
+
+
+def _digitos_ascii(*partes: str) -> bool:
+    # str.isdigit aceita dígitos de outros alfabetos ('０', '٢'), que o strptime recusa
+    return all(parte.isascii() and parte.isdigit() for parte in partes)
+
+
+def _ano_mes_dia(texto: str) -> Optional[date]:
+    if len(texto) != 10 or texto[4] != '-' or texto[7] != '-':
+        return None
+    ano, mes, dia = texto[:4], texto[5:7], texto[8:]
+    if not _digitos_ascii(ano, mes, dia):
+        return None
+    return date(int(ano), int(mes), int(dia))
+
+
+def _dia_mes_ano(separador: str) -> Callable[[str], Optional[date]]:
+    def parse(texto: str) -> Optional[date]:
+        if len(texto) != 10 or texto[2] != separador or texto[5] != separador:
+            return None
+        dia, mes, ano = texto[:2], texto[3:5], texto[6:]
+        if not _digitos_ascii(ano, mes, dia):
+            return None
+        return date(int(ano), int(mes), int(dia))
+    return parse
+
+
+# Parser de formato fixo de cada formato: fatia o texto em posições conhecidas.
+# Devolve None quando o texto não tem o formato (ex: '1/2/2020', sem zeros),
+# caso em que vale o caminho flexível
+PARSERS_FORMATO_FIXO: Dict[str, Callable[[str], Optional[date]]] = {
+    '%Y-%m-%d': _ano_mes_dia,
+    '%d/%m/%Y': _dia_mes_ano('/'),
+    '%d-%m-%Y': _dia_mes_ano('-'),
+}
+
+
+def detectar_formato(amostra: Iterable[str]) -> Optional[str]:
+    """Formato que reconhece mais valores da amostra (em empate, o primeiro de FORMATOS_DATA); None se nenhum."""
+    valores = [valor for valor in amostra if valor]
+    melhor, acertos_melhor = None, 0
+    for formato in FORMATOS_DATA:
+        parser = PARSERS_FORMATO_FIXO[formato]
+        acertos = 0
+        for valor in valores:
+            try:
+                acertos += parser(valor) is not None
+            except ValueError:
+                continue
+        if acertos > acertos_melhor:
+            melhor, acertos_melhor = formato, acertos
+    return melhor
+
+
+class DateColumnParser:
+    """
+    Converte os textos de uma coluna de datas do lote.
+
+    Usa o parser de formato fixo do formato detectado para a coluna e só
+    recorre ao caminho flexível (strptime em cada formato) para os valores
+    fora do padrão. Datas repetidas (ex: a mesma data de avaliação da turma
+    inteira) são memorizadas. Os resultados são os mesmos de
+    parse_data_flexivel: os formatos não se sobrepõem.
+    """
+
+    def __init__(self, formato: Optional[str] = None, max_memorizadas: int = MAX_DATAS_MEMORIZADAS):
+        self.formato = formato
+        self._formato_fixo = PARSERS_FORMATO_FIXO.get(formato) if formato else None
+        self._memo: Dict[str, date] = {}
+        self._max_memorizadas = max_memorizadas
+
+    @classmethod
+    def da_amostra(cls, amostra: Iterable[str]) -> "DateColumnParser":
+        return cls(detectar_formato(amostra))
+
+    def __call__(self, texto: str) -> date:
+        data = self._memo.get(texto)
+        if data is not None:
+            return data
+
+        if self._formato_fixo is not None:
+            try:
+                data = self._formato_fixo(texto)
+            except ValueError:
+                data = None  # Ex: 31/02/2020; o caminho flexível gera a mensagem de erro
+        if data is None:
+            data = parse_data_flexivel(texto)
+
+        if len(self._memo) < self._max_memorizadas:
+            self._memo[texto] = data
+        return data
@@ -0,0 +1,151 @@
+# app/services/export_service.py
+
+import csv
+import io
+from functools import lru_cache
+from typing import Any, BinaryIO, Iterable, Iterator, List, Optional, Union
+
+from app.models import Indicador
+from app.services.records import IndicadorRegistro, Resultado
+from app.services.batch_engine import NOMES_INDICADORES
+
+CABECALHO_EXPORTACAO = [
+    'ID', 'Nome', 'Sexo', 'Data Nascimento', 'Data Avaliação', 'Idade',
+    'Peso (kg)', 'Altura (cm)', 'IMC', 'Peso/Idade', 'Altura/Idade', 'IMC/Idade'
+]
+
+# Prefixo do `tipo` de cada coluna de classificação, na ordem do cabeçalho
+PREFIXOS_INDICADORES = ('Peso-para-Idade', 'Altura-para-Idade', 'IMC-para-Idade')
+
+# Coluna de cada nome de indicador gerado pelo serviço
+COLUNA_POR_TIPO = {
+    nome: next(i for i, prefixo in enumerate(PREFIXOS_INDICADORES) if prefixo in nome)
+    for nome in NOMES_INDICADORES.values()
+}
+
+LINHAS_POR_BLOCO = 1000
+
+IndicadorExportado = Union[Indicador, IndicadorRegistro]
+
+MEDIA_TYPE_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+@lru_cache(maxsize=64)
+def _coluna_do_tipo(tipo: str) -> Optional[int]:
+    """Coluna de um `tipo` fora do mapa (resultados enviados pelo cliente); calculada uma vez por texto."""
+    return next((i for i, prefixo in enumerate(PREFIXOS_INDICADORES) if prefixo in tipo), None)
+
+
+def indicadores_por_coluna(indicadores: List[IndicadorExportado]) -> List[Optional[IndicadorExportado]]:
+    """Indicadores de P/I, A/I e IMC/I, nessa ordem (o primeiro de cada tipo vale), None se ausentes."""
+    por_coluna: List[Optional[IndicadorExportado]] = [None, None, None]
+    for indicador in indicadores:
+        coluna = COLUNA_POR_TIPO.get(indicador.tipo)
+        if coluna is None:
+            coluna = _coluna_do_tipo(indicador.tipo)
+        if coluna is not None and por_coluna[coluna] is None:
+            por_coluna[coluna] = indicador
+    return por_coluna
+
+
+def classificacoes_por_coluna(indicadores: List[IndicadorExportado]) -> List[str]:
+    """Classificações de P/I, A/I e IMC/I, 'N/A' se ausentes."""
+    return [i.classificacao if i is not None else 'N/A' for i in indicadores_por_coluna(indicadores)]
+
+
+def cabecalho_exportacao(escola: Optional[str], turma: Optional[str]) -> List[str]:
+    prefixo = (['Escola'] if escola else []) + (['Turma'] if turma else [])
+    return prefixo + CABECALHO_EXPORTACAO
+
+
+def linhas_exportacao(resultados: Iterable[Resultado],
+                      escola: Optional[str], turma: Optional[str]) -> Iterator[List[Any]]:
+    """Valores de cada linha exportada (CSV e Excel), na ordem de cabeçalho_exportacao."""
+    prefixo = ([escola] if escola else []) + ([turma] if turma else [])
+    for resultado in resultados:
+        yield prefixo + [
+            resultado.id_paciente or '',  # ID do paciente
+            resultado.nome,
+            resultado.sexo,
+            resultado.data_nascimento.strftime('%d/%m/%Y'),
+            resultado.data_avaliacao.strftime('%d/%m/%Y'),
+            resultado.idade_formatada,
+            float(resultado.peso_kg),
+            float(resultado.altura_cm),
+            resultado.imc or 'N/A',
+        ] + classificacoes_por_coluna(resultado.indicadores)
+
+
+def iter_csv_exportacao(resultados: Iterable[Resultado], escola: Optional[str],
+                        turma: Optional[str], linhas_por_bloco: int = LINHAS_POR_BLOCO) -> Iterator[bytes]:
+    """
+    Gera o CSV de exportação em blocos já codificados em UTF-8, para uma
+    StreamingResponse: só `linhas_por_bloco` linhas ficam no buffer por vez.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(cabecalho_exportacao(escola, turma))
+    for i, linha in enumerate(linhas_exportacao(resultados, escola, turma), start=1):
+        writer.writerow(linha)
+        if i % linhas_por_bloco == 0:
+            yield _esvaziar(buffer)
+    yield _esvaziar(buffer)
+
+
+def _esvaziar(buffer: io.StringIO) -> bytes:
+    conteudo = buffer.getvalue().encode('utf-8')
+    buffer.seek(0)
+    buffer.truncate()
+    return conteudo
+
+
+def escrever_xlsx_exportacao(resultados: Iterable[Resultado], escola: Optional[str],
+                             turma: Optional[str], destino: BinaryIO) -> None:
+    """
+    Grava a planilha de exportação em `destino` com uma workbook write-only
+    do openpyxl: as linhas vão direto para o XML da planilha, sem montar o
+    modelo de células em memória.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Alignment
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Resultados Antropometria")
+    headers = cabecalho_exportacao(escola, turma)
+
+    # No modo write-only as larguras precisam ser definidas antes das linhas
+    for col in range(1, len(headers) + 1):
+        ws.column_dimensions[get_column_letter(col)].width = 15
+
+    # Estilo do cabeçalho
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header_font = Font(color="FFFFFF", bold=True)
+    header_alignment = Alignment(horizontal="center")
+    cabecalho = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = header_alignment
+        cabecalho.append(cell)
+    ws.append(cabecalho)
+
+    for linha in linhas_exportacao(resultados, escola, turma):
+        ws.append(linha)
+
+    wb.save(destino)
+
+
+def iter_arquivo(arquivo: BinaryIO, tamanho_bloco: int) -> Iterator[bytes]:
+    """Lê o arquivo do início em blocos e o fecha ao terminar (ou se o cliente desconectar)."""
+    try:
+        arquivo.seek(0)
+        while True:
+            bloco = arquivo.read(tamanho_bloco)
+            if not bloco:
+                break
+            yield bloco
+    finally:
+        arquivo.close()
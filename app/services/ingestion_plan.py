@@ -0,0 +1,306 @@
+# app/services/ingestion_plan.py
+
+from collections.abc import Mapping
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.models import SexoEnum
+from app.services.date_parsing import TAMANHO_AMOSTRA, DateColumnParser
+from app.services.records import IndividuoRegistro
+
+# Colunas obrigatórias (já normalizadas) nos arquivos de lote, na ordem das mensagens de erro
+REQUIRED_HEADERS = ('data_nascimento', 'data_avaliacao', 'sexo', 'peso_kg', 'altura_cm')
+
+# Colunas de data, cada uma com o formato detectado uma vez por arquivo
+DATE_COLUMNS = ('data_nascimento', 'data_avaliacao')
+
+NUMBER_COLUMNS = ('peso_kg', 'altura_cm')
+
+# Colunas opcionais lidas quando presentes
+OPTIONAL_COLUMNS = ('id_paciente', 'nome')
+
+# Nomes alternativos de colunas (após a normalização básica)
+HEADER_MAPPINGS = {
+    'id': 'id_paciente',
+    'identificacao': 'id_paciente',
+    'id_paciente': 'id_paciente',
+    'sus': 'id_paciente',
+    'cpf': 'id_paciente',
+    'cartao_sus': 'id_paciente',
+    'numero_sus': 'id_paciente',
+    'nome_completo': 'nome',
+    'data_de_nascimento': 'data_nascimento',
+    'data_da_avaliacao': 'data_avaliacao',
+    'data_avaliacao': 'data_avaliacao',
+    'gender': 'sexo',
+    'peso_kg': 'peso_kg',
+    'peso__kg_': 'peso_kg',
+    'altura_cm': 'altura_cm',
+    'altura__cm_': 'altura_cm'
+}
+
+SEXOS_ACEITOS = {
+    **dict.fromkeys(('M', 'MASCULINO', 'MALE', 'HOMEM', 'MACHO'), SexoEnum.M),
+    **dict.fromkeys(('F', 'FEMININO', 'FEMALE', 'MULHER', 'FEMEA'), SexoEnum.F),
+}
+
+
+def normalizar_cabecalho(header: Optional[str]) -> str:
+    """Normaliza headers para matching flexível"""
+    if not header:
+        return ""
+
+    # Remove espaços, converte para minúsculas e remove caracteres especiais
+    normalized = header.strip().lower()
+    normalized = normalized.replace(' ', '_').replace('-', '_').replace('(', '').replace(')', '')
+    return HEADER_MAPPINGS.get(normalized, normalized)
+
+
+def colunas_usadas(cabecalho: Sequence[str]) -> List[int]:
+    """Índices, em ordem, das colunas que o plano de leitura usa (formatos que permitem ler só essas colunas)."""
+    indices = {normalizar_cabecalho(header): i for i, header in enumerate(cabecalho)}
+    return sorted(indices[campo] for campo in REQUIRED_HEADERS + OPTIONAL_COLUMNS if campo in indices)
+
+
+def parse_decimal_flexivel(texto: str) -> Decimal:
+    try:
+        # Remove espaços e normaliza separadores decimais
+        normalized = str(texto).strip().replace(',', '.')
+        # Remove aspas se existirem
+        normalized = normalized.strip('"').strip("'")
+        return Decimal(normalized)
+    except (InvalidOperation, TypeError):
+        raise ValueError(f"Valor numérico inválido: '{texto}'.")
+
+
+def _parse_decimal_direto(texto: str) -> Decimal:
+    # Para colunas com ponto decimal; vírgulas e aspas isoladas caem no caminho flexível
+    try:
+        return Decimal(texto)
+    except InvalidOperation:
+        return parse_decimal_flexivel(texto)
+
+
+def parse_sexo_flexivel(texto: str) -> SexoEnum:
+    """Converte valores flexíveis de sexo para SexoEnum"""
+    if not texto:
+        raise ValueError("Sexo é obrigatório")
+    sexo = SEXOS_ACEITOS.get(str(texto).strip().upper())
+    if sexo is None:
+        raise ValueError(f"Valor de sexo inválido: '{texto}'. Use M/F, Masculino/Feminino, etc.")
+    return sexo
+
+
+class LinhaBruta(Mapping):
+    """
+    Linha do arquivo como lida pelo csv.reader. Só vira o dicionário
+    {cabeçalho original: valor} (os dados_originais de ErroLinha) se a
+    linha tiver erro; colunas ausentes valem None, como no DictReader.
+    """
+    __slots__ = ('cabecalho', 'valores')
+
+    def __init__(self, cabecalho: Sequence[str], valores: Sequence[str]):
+        self.cabecalho = cabecalho
+        self.valores = valores
+
+    def _como_dict(self) -> Dict[str, Any]:
+        valores = self.valores
+        return {header: valores[i] if i < len(valores) else None for i, header in enumerate(self.cabecalho)}
+
+    def __getitem__(self, chave: str) -> Any:
+        return self._como_dict()[chave]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._como_dict())
+
+    def __len__(self) -> int:
+        return len(self._como_dict())
+
+
+class IngestionPlan:
+    """
+    Plano de leitura de um arquivo de lote, montado uma vez a partir do
+    cabeçalho: índice de cada coluna usada, parser de data e de número de
+    cada coluna e a ordem das validações de campos obrigatórios. Cada linha
+    é então só indexada nas cinco a sete colunas que importam.
+
+    O plano viaja junto com os blocos para os processos do pool.
+    """
+
+    def __init__(self, cabecalho: Sequence[str]):
+        self.cabecalho = list(cabecalho)
+        # Em colunas repetidas após a normalização prevalece a última
+        indices = {normalizar_cabecalho(header): i for i, header in enumerate(self.cabecalho)}
+        faltando = [campo for campo in REQUIRED_HEADERS if campo not in indices]
+        if faltando:
+            raise ValueError(f"Headers obrigatórios não encontrados: {', '.join(faltando)}")
+
+        self.obrigatorios: List[Tuple[str, int]] = [(campo, indices[campo]) for campo in REQUIRED_HEADERS]
+        self.indice_id = indices.get('id_paciente')
+        self.indice_nome = indices.get('nome')
+        self.parsers_data: Dict[str, Callable[[Any], date]] = {campo: DateColumnParser() for campo in DATE_COLUMNS}
+        self.parsers_numero: Dict[str, Callable[[Any], Decimal]] = {campo: parse_decimal_flexivel for campo in NUMBER_COLUMNS}
+        self.preparado = False
+
+    def preparar(self, amostra: Sequence[Sequence[str]]) -> None:
+        """Escolhe os parsers de cada coluna pelas primeiras linhas do arquivo."""
+        indices = dict(self.obrigatorios)
+        for campo in DATE_COLUMNS:
+            self.parsers_data[campo] = DateColumnParser.da_amostra(_valor(linha, indices[campo]) for linha in amostra[:TAMANHO_AMOSTRA])
+        for campo in NUMBER_COLUMNS:
+            com_virgula = any(',' in _valor(linha, indices[campo]) for linha in amostra[:TAMANHO_AMOSTRA])
+            self.parsers_numero[campo] = parse_decimal_flexivel if com_virgula else _parse_decimal_direto
+        self.preparado = True
+
+    def linha_bruta(self, valores: Sequence[str]) -> LinhaBruta:
+        return LinhaBruta(self.cabecalho, valores)
+
+    def parse(self, line_number: int, valores: Sequence[str]) -> IndividuoRegistro:
+        campos: Dict[str, str] = {}
+        # Validar campos obrigatórios (exceto nome que é opcional)
+        for campo, indice in self.obrigatorios:
+            valor = _valor(valores, indice)
+            if not valor:
+                raise ValueError(f"{campo} é obrigatório")
+            campos[campo] = valor
+
+        return IndividuoRegistro(
+            id_paciente=_valor(valores, self.indice_id) or None,  # Opcional
+            # Nome padrão se a coluna não existir
+            nome=_valor(valores, self.indice_nome) if self.indice_nome is not None else f'Pessoa {line_number-1}',
+            data_nascimento=self.parsers_data['data_nascimento'](campos['data_nascimento']),
+            data_avaliacao=self.parsers_data['data_avaliacao'](campos['data_avaliacao']),
+            sexo=parse_sexo_flexivel(campos['sexo']),
+            peso_kg=self.parsers_numero['peso_kg'](campos['peso_kg']),
+            altura_cm=self.parsers_numero['altura_cm'](campos['altura_cm'])
+        )
+
+
+class _DataTipada:
+    """Conversor de uma coluna de datas tipada; textos isolados caem no parser de texto da coluna."""
+    __slots__ = ('parser_texto',)
+
+    def __init__(self, parser_texto: DateColumnParser):
+        self.parser_texto = parser_texto
+
+    def __call__(self, valor: Any) -> date:
+        if isinstance(valor, datetime):
+            return valor.date()
+        if isinstance(valor, date):
+            return valor
+        return self.parser_texto(str(valor))
+
+
+class _NumeroTipado:
+    """Conversor de uma coluna numérica tipada; textos isolados caem no parser de texto da coluna."""
+    __slots__ = ('parser_texto',)
+
+    def __init__(self, parser_texto: Callable[[str], Decimal]):
+        self.parser_texto = parser_texto
+
+    def __call__(self, valor: Any) -> Decimal:
+        if isinstance(valor, Decimal):
+            return valor
+        if isinstance(valor, float):
+            # A menor representação do float (14.2, não 14.1999...), como o Decimal exposto na API
+            return Decimal(repr(valor))
+        if isinstance(valor, int) and not isinstance(valor, bool):
+            return Decimal(valor)
+        return self.parser_texto(str(valor))
+
+
+def _texto(valor: Any) -> str:
+    if valor is None:
+        return ''
+    # IDs numéricos (CPF, cartão SUS) chegam como números em colunas tipadas
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor).strip()
+
+
+class TypedIngestionPlan(IngestionPlan):
+    """
+    Plano de leitura de arquivos com colunas tipadas (Parquet, Arrow): as
+    linhas trazem date, datetime e números em vez de texto, e as colunas em
+    `colunas_tipadas` (nomes normalizados) são convertidas sem nenhum parse
+    de texto. As demais colunas seguem as regras do CSV.
+    """
+
+    def __init__(self, cabecalho: Sequence[str], colunas_tipadas: Iterable[str]):
+        super().__init__(cabecalho)
+        self.colunas_tipadas = frozenset(colunas_tipadas)
+
+    def preparar(self, amostra: Sequence[Sequence[Any]]) -> None:
+        indices = dict(self.obrigatorios)
+        textos = {campo: [valor.strip() for valor in (linha[indices[campo]] for linha in amostra[:TAMANHO_AMOSTRA])
+                          if isinstance(valor, str)]
+                  for campo in DATE_COLUMNS + NUMBER_COLUMNS}
+        for campo in DATE_COLUMNS:
+            parser_texto = DateColumnParser.da_amostra(textos[campo])
+            self.parsers_data[campo] = _DataTipada(parser_texto) if campo in self.colunas_tipadas else parser_texto
+        for campo in NUMBER_COLUMNS:
+            parser_texto = parse_decimal_flexivel if any(',' in texto for texto in textos[campo]) else _parse_decimal_direto
+            self.parsers_numero[campo] = _NumeroTipado(parser_texto) if campo in self.colunas_tipadas else parser_texto
+        self.preparado = True
+
+    def parse(self, line_number: int, valores: Sequence[Any]) -> IndividuoRegistro:
+        campos: Dict[str, Any] = {}
+        for campo, indice in self.obrigatorios:
+            valor = valores[indice]
+            if isinstance(valor, str):
+                valor = valor.strip()
+            if valor is None or valor == '':
+                raise ValueError(f"{campo} é obrigatório")
+            campos[campo] = valor
+
+        id_paciente = _texto(valores[self.indice_id]) if self.indice_id is not None else ''
+        return IndividuoRegistro(
+            id_paciente=id_paciente or None,  # Opcional
+            nome=_texto(valores[self.indice_nome]) if self.indice_nome is not None else f'Pessoa {line_number-1}',
+            data_nascimento=self.parsers_data['data_nascimento'](campos['data_nascimento']),
+            data_avaliacao=self.parsers_data['data_avaliacao'](campos['data_avaliacao']),
+            sexo=parse_sexo_flexivel(_texto(campos['sexo'])),
+            peso_kg=self.parsers_numero['peso_kg'](campos['peso_kg']),
+            altura_cm=self.parsers_numero['altura_cm'](campos['altura_cm'])
+        )
+
+    def converter_textos(self, valores: Sequence[Any]) -> List[str]:
+        """Valores distintos de uma coluna de texto opcional (id, nome), como `parse` os lê."""
+        return [_texto(valor) for valor in valores]
+
+    def converter_valores(self, campo: str, valores: Sequence[Any]) -> List[Any]:
+        """
+        Converte valores distintos de uma coluna obrigatória como `parse`
+        faria, com None onde a linha não passaria na validação (vazio,
+        inválido, número que não é finito e maior que zero). A leitura
+        colunar converte cada valor distinto uma vez assim; as linhas com
+        None passam por `parse`, que produz a mensagem de erro.
+        """
+        convertidos: List[Any] = []
+        for valor in valores:
+            if isinstance(valor, str):
+                valor = valor.strip()
+            convertido = None
+            if valor is not None and valor != '':
+                try:
+                    if campo in DATE_COLUMNS:
+                        convertido = self.parsers_data[campo](valor)
+                    elif campo in NUMBER_COLUMNS:
+                        convertido = self.parsers_numero[campo](valor)
+                        if not (convertido.is_finite() and convertido > 0):
+                            convertido = None
+                    else:
+                        convertido = parse_sexo_flexivel(_texto(valor))
+                except Exception:
+                    # Qualquer falha aqui se repete em parse, que dá o erro da linha
+                    convertido = None
+            convertidos.append(convertido)
+        return convertidos
+
+
+def _valor(valores: Sequence[str], indice: Optional[int]) -> str:
+    if indice is None or indice >= len(valores):
+        return ''
+    valor = valores[indice]
+    return valor.strip() if valor else ''
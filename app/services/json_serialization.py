@@ -0,0 +1,64 @@
+# app/services/json_serialization.py
+
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+from app.models import ErroLinha
+from app.services.records import ResultadoRegistro
+
+MEDIA_TYPE_JSON = "application/json"
+
+
+def _padrao(valor: Any) -> Any:
+    # Decimal sai como texto, igual ao Pydantic, para não perder casas decimais
+    if isinstance(valor, Decimal):
+        return str(valor)
+    raise TypeError(f"Tipo não serializável em JSON: {type(valor).__name__}")
+
+
+def dumps(conteudo: Any) -> bytes:
+    """JSON em UTF-8 com orjson (datas e enums nativos, Decimal como texto)."""
+    return orjson.dumps(conteudo, default=_padrao)
+
+
+def resultado_json(resultado: ResultadoRegistro) -> Dict[str, Any]:
+    """Mesmo conteúdo de ResultadoProcessamentoIndividual.model_dump_json, montado direto do registro."""
+    return {
+        "id_paciente": resultado.id_paciente,
+        "nome": resultado.nome,
+        "sexo": resultado.sexo,
+        "data_nascimento": resultado.data_nascimento,
+        "data_avaliacao": resultado.data_avaliacao,
+        "idade": resultado.idade_formatada,
+        "peso_kg": str(resultado.peso_kg),
+        "altura_cm": str(resultado.altura_cm),
+        "imc": resultado.imc,
+        "indicadores": [
+            {
+                "tipo": indicador.tipo,
+                # Decimal na API; no modo numérico "float" o IMC vem como float
+                "valor_observado": str(indicador.valor_observado),
+                "escore_z": indicador.escore_z,
+                "classificacao": indicador.classificacao
+            }
+            for indicador in resultado.indicadores
+        ]
+    }
+
+
+def erro_json(erro: ErroLinha) -> Dict[str, Any]:
+    return {"linha": erro.linha, "erro": erro.erro, "dados_originais": erro.dados_originais}
+
+
+def resposta_lote_json(resultados: List[ResultadoRegistro], erros: List[ErroLinha],
+                       summary: Dict[str, Any], results_handle: Optional[str]) -> bytes:
+    """Corpo de BatchProcessingResponse serializado de uma vez, sem passar pelos modelos."""
+    return dumps({
+        "success": True,
+        "summary": summary,
+        "results": [resultado_json(resultado) for resultado in resultados],
+        "errors": [erro_json(erro) for erro in erros],
+        "results_handle": results_handle
+    })
@@ -0,0 +1,112 @@
+# app/services/lms.py
+
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Escores z das colunas de referência (-3 a +3)
+Z_COLUNAS = np.array([-3.0, -2.0, -1.0, 0.0, 1.0, 2.0, 3.0])
+
+# Indicadores em que a OMS restringe o LMS além de ±3 DP (distribuições assimétricas)
+INDICADORES_LMS_RESTRITO = ('peso_idade', 'imc_idade')
+
+# Abaixo disto L é tratado como zero (forma logarítmica da fórmula)
+L_ZERO = 1e-7
+
+
+def _valor_no_z(l: np.ndarray, m: np.ndarray, s: np.ndarray, z: float) -> np.ndarray:
+    """Inverso da fórmula LMS: valor da medida correspondente ao escore z."""
+    l_seguro = np.where(np.abs(l) < L_ZERO, 1.0, l)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        potencia = m * np.power(1 + l_seguro * s * z, 1 / l_seguro)
+    return np.where(np.abs(l) < L_ZERO, m * np.exp(s * z), potencia)
+
+
+def z_scores_lms(valores: np.ndarray, l: np.ndarray, m: np.ndarray, s: np.ndarray, restrito: bool = False) -> np.ndarray:
+    """
+    Escore z pela fórmula LMS da OMS, para arrays inteiros:
+
+        z = ((y / M) ** L - 1) / (L * S)   (L != 0)
+        z = ln(y / M) / S                  (L == 0)
+
+    Com `restrito`, valores além de ±3 DP seguem a extrapolação linear da
+    OMS, usando a distância entre os pontos de 2 e 3 DP. Parâmetros
+    ausentes (NaN) resultam em NaN.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    l_seguro = np.where(np.abs(l) < L_ZERO, 1.0, l)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        razao = valores / m
+        z = np.where(np.abs(l) < L_ZERO, np.log(razao) / s, (np.power(razao, l_seguro) - 1) / (l_seguro * s))
+
+    if restrito:
+        sd3_pos = _valor_no_z(l, m, s, 3.0)
+        sd3_neg = _valor_no_z(l, m, s, -3.0)
+        sd23_pos = sd3_pos - _valor_no_z(l, m, s, 2.0)
+        sd23_neg = _valor_no_z(l, m, s, -2.0) - sd3_neg
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z = np.where(z > 3, 3 + (valores - sd3_pos) / sd23_pos, z)
+            z = np.where(z < -3, -3 + (valores - sd3_neg) / sd23_neg, z)
+    return z
+
+
+def z_score_lms(valor: float, l: float, m: float, s: float, restrito: bool = False) -> Optional[float]:
+    """Versão escalar de z_scores_lms, usada no processamento individual."""
+    z = float(z_scores_lms(np.array([valor]), np.array([l]), np.array([m]), np.array([s]), restrito)[0])
+    return None if math.isnan(z) else z
+
+
+def _erro_ajuste(valores_sd: np.ndarray, m: np.ndarray, mais_1: np.ndarray, menos_1: np.ndarray,
+                 l: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """S obtido dos pontos de ±1 DP para cada L e o erro quadrático relativo nas demais curvas."""
+    l_zero = np.abs(l) < L_ZERO
+    l_seguro = np.where(l_zero, 1.0, l)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        s = np.where(l_zero, (np.log(mais_1) - np.log(menos_1)) / 2,
+                     (np.power(mais_1, l_seguro) - np.power(menos_1, l_seguro)) / (2 * l_seguro))
+        erro = np.zeros(len(m))
+        for coluna, z in enumerate(Z_COLUNAS):
+            if z == 0:
+                continue
+            erro += ((_valor_no_z(l, m, s, z) - valores_sd[:, coluna]) / m) ** 2
+    return s, np.where(np.isnan(erro), np.inf, erro)
+
+
+def ajustar_lms(valores_sd: np.ndarray, passo_l: float = 0.001) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Estima os parâmetros L, M e S a partir das curvas de desvio padrão.
+
+    As tabelas de data/sisvan_tables trazem apenas os valores em -3..+3 DP
+    (uma linha por idade). M é a mediana; para cada L candidato, S é
+    obtido dos pontos de ±1 DP e o par que melhor reproduz as demais
+    curvas (erro quadrático relativo) é escolhido. A busca percorre L em
+    [-3, 3] numa grade 10x mais grossa que `passo_l` e depois refina cada
+    linha com `passo_l` em torno do melhor ponto.
+    """
+    valores_sd = np.atleast_2d(np.asarray(valores_sd, dtype=np.float64))
+    m = valores_sd[:, 3]
+    mais_1 = valores_sd[:, 4] / m
+    menos_1 = valores_sd[:, 2] / m
+
+    melhor_erro = np.full(len(m), np.inf)
+    melhor_l = np.zeros(len(m))
+    melhor_s = np.full(len(m), np.nan)
+
+    def avaliar(l_candidato: np.ndarray) -> None:
+        l_candidato = np.where(np.abs(l_candidato) < L_ZERO, 0.0, l_candidato)
+        s, erro = _erro_ajuste(valores_sd, m, mais_1, menos_1, l_candidato)
+        melhora = erro < melhor_erro
+        melhor_erro[melhora] = erro[melhora]
+        melhor_l[melhora] = l_candidato[melhora]
+        melhor_s[melhora] = s[melhora]
+
+    passo_grosso = passo_l * 10
+    for l_candidato in np.arange(-3.0, 3.0 + passo_grosso / 2, passo_grosso):
+        avaliar(np.full(len(m), l_candidato))
+
+    centro = melhor_l.copy()
+    for k in range(-10, 11):
+        avaliar(np.clip(centro + k * passo_l, -3.0, 3.0))
+
+    return melhor_l, m, melhor_s
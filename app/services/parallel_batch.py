@@ -0,0 +1,119 @@
+# app/services/parallel_batch.py
+
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from app.models import ErroLinha
+from app.services.columnar_ingestion import BlocoColunar
+from app.services.ingestion_plan import IngestionPlan
+from app.services.records import ResultadosLote
+from app.services.reference_snapshot import ReferenceSnapshot
+
+# Plano de leitura do arquivo e as linhas lidas com seus números (textos do
+# csv.reader ou valores tipados do .xlsx) ou, em Parquet/Arrow, as colunas do bloco
+BlocoBruto = Tuple[IngestionPlan, Union[List[Tuple[int, Sequence[Any]]], BlocoColunar]]
+BlocoLote = Tuple[ResultadosLote, List[ErroLinha]]
+
+# Estado de cada processo do pool: uma cópia própria das tabelas de referência
+_snapshot_worker: Optional[ReferenceSnapshot] = None
+_metodo_worker: str = 'interpolacao'
+_modo_numerico_worker: str = 'decimal'
+
+
+def _inicializar_worker(snapshot: ReferenceSnapshot, metodo: str, modo_numerico: str) -> None:
+    global _snapshot_worker, _metodo_worker, _modo_numerico_worker
+    _snapshot_worker = snapshot
+    _metodo_worker = metodo
+    _modo_numerico_worker = modo_numerico
+
+
+def _processar_bloco_worker(bloco: BlocoBruto) -> BlocoLote:
+    from app.services.anthropometry_service import AnthropometryService
+
+    service = AnthropometryService(db=None, snapshot=_snapshot_worker)
+    service.z_score_metodo = _metodo_worker
+    service.numeric_mode = _modo_numerico_worker
+    return service.process_raw_block(bloco)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_config: Optional[Tuple[ReferenceSnapshot, str, str, int]] = None
+# Lotes em andamento em cada pool (o atual e os substituídos que ainda têm blocos em voo)
+_pool_usos: Dict[ProcessPoolExecutor, int] = {}
+_pool_lock = threading.Lock()
+
+
+def obter_pool(snapshot: ReferenceSnapshot, metodo: str, modo_numerico: str, workers: int) -> ProcessPoolExecutor:
+    """
+    Reserva o pool de processos do servidor para um lote, recriando-o se o
+    snapshot, o método de escore z, o modo numérico ou o número de workers
+    mudarem. Usa 'spawn' para se comportar igual no Linux e no Windows e
+    não herdar threads do uvicorn. Cada reserva deve ser devolvida com
+    liberar_pool.
+
+    Um pool substituído não é cancelado: os lotes que ainda o usam terminam
+    normalmente e ele é encerrado quando o último for liberado.
+    """
+    global _pool, _pool_config
+    with _pool_lock:
+        if _pool is None or _pool_config is None or _pool_config[0] is not snapshot or _pool_config[1:] != (metodo, modo_numerico, workers):
+            antigo = _pool
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_inicializar_worker,
+                initargs=(snapshot, metodo, modo_numerico)
+            )
+            _pool_config = (snapshot, metodo, modo_numerico, workers)
+            if antigo is not None and antigo not in _pool_usos:
+                antigo.shutdown(wait=False)
+        _pool_usos[_pool] = _pool_usos.get(_pool, 0) + 1
+        return _pool
+
+
+def liberar_pool(pool: ProcessPoolExecutor) -> None:
+    """Devolve uma reserva de obter_pool; um pool já substituído é encerrado ao ficar ocioso."""
+    with _pool_lock:
+        restantes = _pool_usos.get(pool, 0) - 1
+        if restantes > 0:
+            _pool_usos[pool] = restantes
+            return
+        _pool_usos.pop(pool, None)
+        if pool is not _pool:
+            pool.shutdown(wait=False)
+
+
+def encerrar_pool() -> None:
+    """Encerra o pool de processos e os substituídos ainda em uso (chamado no desligamento da aplicação)."""
+    global _pool, _pool_config
+    with _pool_lock:
+        pools = set(_pool_usos)
+        if _pool is not None:
+            pools.add(_pool)
+        for pool in pools:
+            pool.shutdown(wait=True, cancel_futures=True)
+        _pool, _pool_config = None, None
+        _pool_usos.clear()
+
+
+def processar_blocos_em_paralelo(blocos: Iterator[BlocoBruto], snapshot: ReferenceSnapshot,
+                                 metodo: str, modo_numerico: str, workers: int) -> Iterator[BlocoLote]:
+    """
+    Distribui os blocos de linhas brutas entre os processos do pool e devolve
+    os resultados na ordem original. No máximo 2 blocos por worker ficam em
+    voo, para que a leitura do arquivo não se adiante sem limite.
+    """
+    pool = obter_pool(snapshot, metodo, modo_numerico, workers)
+    try:
+        pendentes: Deque[Future] = deque()
+        for bloco in blocos:
+            pendentes.append(pool.submit(_processar_bloco_worker, bloco))
+            if len(pendentes) >= workers * 2:
+                yield pendentes.popleft().result()
+        while pendentes:
+            yield pendentes.popleft().result()
+    finally:
+        liberar_pool(pool)
@@ -0,0 +1,205 @@
+# app/services/pdf_report.py
+
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fpdf import FPDF
+from fpdf.enums import Align
+
+from app.core.config import settings
+from app.models import ErroLinha
+from app.services.records import Resultado
+
+
+class PDF(FPDF):
+    """Classe customizada para criar o PDF com cabeçalho e rodapé."""
+    def __init__(self, identifier: str = '', sub_identifier: str = ''):
+        super().__init__(orientation='L', unit='mm', format='A4')
+        self.identifier = identifier
+        self.sub_identifier = sub_identifier
+        self.set_auto_page_break(auto=True, margin=15)
+
+    def header(self):
+        self.set_font('Helvetica', 'B', 16)
+        self.cell(0, 10, self.identifier, 0, 1, 'L')
+        if self.sub_identifier:
+            self.set_font('Helvetica', '', 12)
+            self.cell(0, 8, self.sub_identifier, 0, 1, 'L')
+        self.ln(5)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('Helvetica', 'I', 8)
+        now = datetime.now().strftime('%d/%m/%Y %H:%M:%S')
+        self.cell(0, 10, f'Página {self.page_no()}/{{nb}}', 0, 0, 'C')
+        self.cell(0, 10, f'Gerado em: {now}', 0, 0, 'R')
+
+def get_fpdf_color(classification_text: Optional[str]):
+    """Retorna uma tupla de cor RGB para o fpdf2 com base no texto da classificação."""
+    if not classification_text:
+        return None
+    lower_class = classification_text.lower().replace(' ', '_')
+    if any(s in lower_class for s in ['magreza_acentuada', 'muito_baixo_peso', 'obesidade_grave', 'erro']): return (254, 226, 226)
+    if any(s in lower_class for s in ['magreza', 'baixo_peso', 'baixa_estatura', 'obesidade']): return (254, 242, 242)
+    if any(s in lower_class for s in ['eutrofia', 'peso_adequado', 'estatura_adequada']): return (236, 253, 245)
+    if any(s in lower_class for s in ['risco_de_sobrepeso', 'sobrepeso']): return (254, 252, 232)
+    return None
+
+def encode_for_latin1(text: str) -> str:
+    """Codifica o texto para o formato latin-1, substituindo caracteres incompatíveis."""
+    return text.encode('latin-1', 'replace').decode('latin-1')
+
+
+def gerar_pdf_relatorio(identifier: str, sub_identifier: Optional[str],
+                        results: List[Resultado], errors: List[ErroLinha]) -> bytes:
+    """Monta o relatório PDF do lote (trabalho só de CPU, executado no pool de renderização)."""
+    pdf = PDF(identifier=identifier, sub_identifier=sub_identifier or '')
+    pdf.alias_nb_pages()
+    pdf.add_page()
+
+    pdf.set_font('Helvetica', 'B', 8)
+    pdf.set_fill_color(22, 78, 99)
+    pdf.set_text_color(255, 255, 255)
+    col_widths = (25, 35, 25, 20, 20, 17, 35, 17, 38, 10, 30)
+    header = ['ID', 'Nome', 'Idade', 'Data Nasc.', 'Data Aval.', 'Peso(kg)', 'P/I', 'Altura(cm)', 'A/I', 'IMC', 'IMC/I']
+    for i, header_text in enumerate(header):
+        pdf.cell(col_widths[i], 8, header_text, border=1, align='C', fill=True)
+    pdf.ln()
+
+    pdf.set_font('Helvetica', '', 7)
+    pdf.set_text_color(0, 0, 0)
+
+    def get_classification_from_indicators(indicators, prefix):
+        return next((i.classificacao for i in indicators if i.tipo.startswith(prefix)), "N/A")
+
+    for res in results or []:
+        imc_i_class = get_classification_from_indicators(res.indicadores, "IMC-para-Idade")
+        color = get_fpdf_color(imc_i_class)
+        fill = bool(color)
+        if color:
+            pdf.set_fill_color(*color)
+
+        pdf.cell(col_widths[0], 6, encode_for_latin1(res.id_paciente or ''), border=1, align='L', fill=fill)
+        pdf.cell(col_widths[1], 6, encode_for_latin1(res.nome or 'N/A'), border=1, align='L', fill=fill)
+        pdf.cell(col_widths[2], 6, res.idade_formatada or "N/A", border=1, align='L', fill=fill)
+        pdf.cell(col_widths[3], 6, res.data_nascimento.strftime('%d/%m/%Y'), border=1, align='C', fill=fill)
+        pdf.cell(col_widths[4], 6, res.data_avaliacao.strftime('%d/%m/%Y'), border=1, align='C', fill=fill)
+        pdf.cell(col_widths[5], 6, f"{res.peso_kg:.1f}", border=1, align='C', fill=fill)
+        pdf.cell(col_widths[6], 6, encode_for_latin1(get_classification_from_indicators(res.indicadores, "Peso-para-Idade")), border=1, align='L', fill=fill)
+        pdf.cell(col_widths[7], 6, f"{res.altura_cm:.1f}", border=1, align='C', fill=fill)
+        pdf.cell(col_widths[8], 6, encode_for_latin1(get_classification_from_indicators(res.indicadores, "Altura-para-Idade")), border=1, align='L', fill=fill)
+        pdf.cell(col_widths[9], 6, f"{res.imc:.2f}" if res.imc else "N/A", border=1, align='C', fill=fill)
+        pdf.cell(col_widths[10], 6, encode_for_latin1(imc_i_class), border=1, align='L', fill=fill)
+        pdf.ln()
+
+    if errors:
+        pdf.set_font('Helvetica', 'B', 8)
+        pdf.set_fill_color(254, 226, 226)
+        pdf.set_text_color(0, 0, 0)
+        pdf.cell(sum(col_widths), 8, 'Registros com Erro no Processamento', border=1, align='C', fill=True)
+        pdf.ln()
+        pdf.set_font('Helvetica', '', 7)
+        for err in errors:
+            nome = err.dados_originais.get('nome', 'N/A')
+            erro_msg = f"Linha {err.linha}: {nome} - Erro: {err.erro}"
+            pdf.multi_cell(sum(col_widths), 6, encode_for_latin1(erro_msg), border=1, align=Align.L, fill=True)
+
+    # Correção: pdf.output() retorna bytearray, converter para bytes
+    pdf_output = pdf.output()
+    if isinstance(pdf_output, bytearray):
+        pdf_bytes = bytes(pdf_output)
+    else:
+        pdf_bytes = pdf_output
+    return pdf_bytes
+
+
+class FilaPdfCheia(Exception):
+    """A fila de renderização de PDFs atingiu o limite configurado."""
+
+
+class PdfRenderPool:
+    """
+    Executa gerar_pdf_relatorio fora do event loop, num pool de threads ou
+    de processos ('thread' | 'process'), com no máximo `max_workers`
+    relatórios em execução e `max_fila` aguardando. Acima disso, a
+    requisição é recusada com FilaPdfCheia.
+    """
+
+    def __init__(self, tipo: str, max_workers: int, max_fila: int):
+        if tipo not in ('thread', 'process'):
+            raise ValueError(f"Executor de PDF desconhecido: {tipo}")
+        self.tipo = tipo
+        self.max_workers = max_workers
+        self.max_fila = max_fila
+        self._pendentes = 0
+        self._concluidos = 0
+        self._falhas = 0
+        self._recusados = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[Executor] = None
+
+    def _obter_executor(self) -> Executor:
+        if self._executor is None:
+            if self.tipo == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pdf")
+        return self._executor
+
+    async def renderizar(self, identifier: str, sub_identifier: Optional[str],
+                         results: List[Resultado], errors: List[ErroLinha]) -> bytes:
+        with self._lock:
+            if self._pendentes >= self.max_workers + self.max_fila:
+                self._recusados += 1
+                raise FilaPdfCheia("Muitos relatórios em geração. Tente novamente em instantes.")
+            self._pendentes += 1
+            executor = self._obter_executor()
+        try:
+            futuro = executor.submit(gerar_pdf_relatorio, identifier, sub_identifier, results, errors)
+        except BaseException:
+            with self._lock:
+                self._pendentes -= 1
+            raise
+        # A vaga só é liberada quando o executor termina: se a requisição for
+        # cancelada com o relatório já em execução, ele continua ocupando o pool
+        futuro.add_done_callback(self._finalizar)
+        return await asyncio.wrap_future(futuro)
+
+    def _finalizar(self, futuro: Future) -> None:
+        with self._lock:
+            self._pendentes -= 1
+            if futuro.cancelled():
+                return
+            if futuro.exception() is None:
+                self._concluidos += 1
+            else:
+                self._falhas += 1
+
+    def metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "executor": self.tipo,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_fila,
+                "running": min(self._pendentes, self.max_workers),
+                "queue_depth": max(self._pendentes - self.max_workers, 0),
+                "completed": self._concluidos,
+                "failed": self._falhas,
+                "rejected": self._recusados
+            }
+
+    def encerrar(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        # Fora do lock: os futures cancelados chamam _finalizar nesta thread
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Pool único do servidor, usado por /api/export/pdf
+pdf_render_pool = PdfRenderPool(settings.PDF_EXECUTOR, settings.PDF_MAX_WORKERS, settings.PDF_MAX_QUEUE)
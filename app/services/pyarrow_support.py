@@ -0,0 +1,16 @@
+# app/services/pyarrow_support.py
+
+
+class PyarrowIndisponivel(RuntimeError):
+    """O pyarrow (dependência opcional) não está instalado no servidor."""
+
+
+def importar_pyarrow():
+    """Importa o pyarrow sob demanda: só as exportações e uploads Arrow/Parquet dependem dele."""
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise PyarrowIndisponivel("Formatos Arrow/Parquet indisponíveis: instale o pacote pyarrow no servidor.")
+    return pyarrow
@@ -0,0 +1,314 @@
+# app/services/records.py
+
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+from app.models import IndividuoCreate, Indicador, ResultadoProcessamentoIndividual, SexoEnum
+from app.services.age import datas_para_array, descrever_idade
+from app.services.reference_snapshot import SEXOS
+
+# Registros internos do caminho de lote. Validar um IndividuoCreate, três
+# Indicador e um ResultadoProcessamentoIndividual por linha custava mais que o
+# próprio cálculo; o serviço trabalha com estes registros (dados já
+# validados) e só os converte para os modelos Pydantic na borda da API.
+
+Numero = Union[Decimal, float]
+
+
+class IndividuoRegistro:
+    """Dados de entrada de uma linha, com os mesmos atributos de IndividuoCreate."""
+
+    __slots__ = ('id_paciente', 'nome', 'data_nascimento', 'data_avaliacao', 'sexo', 'peso_kg', 'altura_cm')
+
+    def __init__(self, id_paciente: Optional[str], nome: str, data_nascimento: date, data_avaliacao: date,
+                 sexo: SexoEnum, peso_kg: Decimal, altura_cm: Decimal):
+        # As mesmas restrições de IndividuoCreate (números finitos, gt=0). Só as
+        # linhas inválidas passam pelo modelo, para o erro manter o texto do
+        # ValidationError que sempre foi mostrado em ErroLinha.erro
+        if not (peso_kg.is_finite() and peso_kg > 0 and altura_cm.is_finite() and altura_cm > 0):
+            IndividuoCreate(id_paciente=id_paciente, nome=nome, data_nascimento=data_nascimento,
+                            data_avaliacao=data_avaliacao, sexo=sexo, peso_kg=peso_kg, altura_cm=altura_cm)
+        self.id_paciente = id_paciente
+        self.nome = nome
+        self.data_nascimento = data_nascimento
+        self.data_avaliacao = data_avaliacao
+        self.sexo = sexo
+        self.peso_kg = peso_kg
+        self.altura_cm = altura_cm
+
+
+# Entrada aceita pelo serviço: o modelo da API ou o registro lido do arquivo
+Individuo = Union[IndividuoCreate, IndividuoRegistro]
+
+
+class EntradaLote:
+    """
+    Dados de entrada já validados de várias linhas, em colunas, como o motor
+    vetorizado os consome: `sexo` com índices em SEXOS, datas datetime64[D],
+    peso e altura em float64 para o cálculo e como Decimal (os valores
+    expostos nos resultados). `linhas` são os números das linhas no arquivo.
+    """
+
+    __slots__ = ('linhas', 'id_paciente', 'nome', 'sexo', 'data_nascimento', 'data_avaliacao',
+                 'peso_kg', 'altura_cm', 'peso_decimal', 'altura_decimal')
+
+    def __init__(self, linhas: np.ndarray, id_paciente: List[Optional[str]], nome: List[str], sexo: np.ndarray,
+                 data_nascimento: np.ndarray, data_avaliacao: np.ndarray, peso_kg: np.ndarray, altura_cm: np.ndarray,
+                 peso_decimal: Sequence[Decimal], altura_decimal: Sequence[Decimal]):
+        self.linhas = linhas
+        self.id_paciente = id_paciente
+        self.nome = nome
+        self.sexo = sexo
+        self.data_nascimento = data_nascimento
+        self.data_avaliacao = data_avaliacao
+        self.peso_kg = peso_kg
+        self.altura_cm = altura_cm
+        self.peso_decimal = peso_decimal
+        self.altura_decimal = altura_decimal
+
+    def __len__(self) -> int:
+        return len(self.linhas)
+
+    @staticmethod
+    def de_individuos(linhas: Sequence[int], individuos: Sequence[Individuo]) -> "EntradaLote":
+        """Colunas montadas a partir de registros ou modelos já validados."""
+        return EntradaLote(
+            linhas=np.array(linhas, dtype=np.int64),
+            id_paciente=[individuo.id_paciente for individuo in individuos],
+            nome=[individuo.nome for individuo in individuos],
+            sexo=np.array([SEXOS.index(individuo.sexo.value) for individuo in individuos], dtype=np.int64),
+            data_nascimento=datas_para_array([individuo.data_nascimento for individuo in individuos]),
+            data_avaliacao=datas_para_array([individuo.data_avaliacao for individuo in individuos]),
+            peso_kg=np.array([float(individuo.peso_kg) for individuo in individuos], dtype=np.float64),
+            altura_cm=np.array([float(individuo.altura_cm) for individuo in individuos], dtype=np.float64),
+            peso_decimal=[individuo.peso_kg for individuo in individuos],
+            altura_decimal=[individuo.altura_cm for individuo in individuos]
+        )
+
+    def filtrar(self, manter: np.ndarray) -> "EntradaLote":
+        """Só as linhas com `manter` verdadeiro."""
+        posicoes = np.flatnonzero(manter).tolist()
+        return EntradaLote(
+            linhas=self.linhas[manter],
+            id_paciente=[self.id_paciente[i] for i in posicoes],
+            nome=[self.nome[i] for i in posicoes],
+            sexo=self.sexo[manter],
+            data_nascimento=self.data_nascimento[manter],
+            data_avaliacao=self.data_avaliacao[manter],
+            peso_kg=self.peso_kg[manter],
+            altura_cm=self.altura_cm[manter],
+            peso_decimal=[self.peso_decimal[i] for i in posicoes],
+            altura_decimal=[self.altura_decimal[i] for i in posicoes]
+        )
+
+    @staticmethod
+    def juntar(a: "EntradaLote", b: "EntradaLote") -> "EntradaLote":
+        """Junta as linhas das duas entradas, em ordem de número de linha."""
+        if not len(b):
+            return a
+        if not len(a):
+            return b
+        linhas = np.concatenate([a.linhas, b.linhas])
+        ordem = np.argsort(linhas, kind='stable')
+        posicoes = ordem.tolist()
+
+        def listas(x: Sequence[Any], y: Sequence[Any]) -> List[Any]:
+            valores = list(x) + list(y)
+            return [valores[i] for i in posicoes]
+
+        return EntradaLote(
+            linhas=linhas[ordem],
+            id_paciente=listas(a.id_paciente, b.id_paciente),
+            nome=listas(a.nome, b.nome),
+            sexo=np.concatenate([a.sexo, b.sexo])[ordem],
+            data_nascimento=np.concatenate([a.data_nascimento, b.data_nascimento])[ordem],
+            data_avaliacao=np.concatenate([a.data_avaliacao, b.data_avaliacao])[ordem],
+            peso_kg=np.concatenate([a.peso_kg, b.peso_kg])[ordem],
+            altura_cm=np.concatenate([a.altura_cm, b.altura_cm])[ordem],
+            peso_decimal=listas(a.peso_decimal, b.peso_decimal),
+            altura_decimal=listas(a.altura_decimal, b.altura_decimal)
+        )
+
+
+class IndicadorRegistro(NamedTuple):
+    tipo: str
+    valor_observado: Numero
+    escore_z: float
+    classificacao: str
+
+    def para_modelo(self) -> Indicador:
+        valor = self.valor_observado
+        return Indicador.model_construct(
+            tipo=self.tipo,
+            # No modo numérico "float" o IMC chega como float; a API expõe Decimal
+            valor_observado=valor if isinstance(valor, Decimal) else Decimal(str(valor)),
+            escore_z=self.escore_z,
+            classificacao=self.classificacao
+        )
+
+
+class ResultadoRegistro:
+    """
+    Resultado de uma pessoa, com os mesmos atributos de
+    ResultadoProcessamentoIndividual (as exportações e o PDF aceitam os
+    dois). O texto da idade só é montado quando pedido.
+    """
+
+    __slots__ = ('id_paciente', 'nome', 'sexo', 'data_nascimento', 'data_avaliacao', 'idade', 'idade_meses',
+                 'peso_kg', 'altura_cm', 'imc', 'indicadores')
+
+    def __init__(self, id_paciente: Optional[str], nome: str, sexo: str, data_nascimento: date,
+                 data_avaliacao: date, idade: Optional[str], idade_meses: Optional[int], peso_kg: Decimal,
+                 altura_cm: Decimal, imc: Optional[float], indicadores: List[IndicadorRegistro]):
+        self.id_paciente = id_paciente
+        self.nome = nome
+        self.sexo = sexo
+        self.data_nascimento = data_nascimento
+        self.data_avaliacao = data_avaliacao
+        self.idade = idade
+        self.idade_meses = idade_meses
+        self.peso_kg = peso_kg
+        self.altura_cm = altura_cm
+        self.imc = imc
+        self.indicadores = indicadores
+
+    @property
+    def idade_formatada(self) -> str:
+        if self.idade is not None:
+            return self.idade
+        return descrever_idade(self.idade_meses) if self.idade_meses is not None else ""
+
+    def _valores(self) -> tuple:
+        return tuple(getattr(self, campo) for campo in self.__slots__)
+
+    def __eq__(self, outro: object) -> bool:
+        if not isinstance(outro, ResultadoRegistro):
+            return NotImplemented
+        return self._valores() == outro._valores()
+
+    def __repr__(self) -> str:
+        return f"ResultadoRegistro(nome={self.nome!r}, idade_meses={self.idade_meses!r}, imc={self.imc!r})"
+
+    def para_modelo(self) -> ResultadoProcessamentoIndividual:
+        """Modelo da resposta, sem revalidar: os valores já saíram validados do serviço."""
+        return ResultadoProcessamentoIndividual.model_construct(
+            id_paciente=self.id_paciente,
+            nome=self.nome,
+            sexo=self.sexo,
+            data_nascimento=self.data_nascimento,
+            data_avaliacao=self.data_avaliacao,
+            idade=self.idade,
+            idade_meses=self.idade_meses,
+            peso_kg=self.peso_kg,
+            altura_cm=self.altura_cm,
+            imc=self.imc,
+            indicadores=[indicador.para_modelo() for indicador in self.indicadores]
+        )
+
+
+# Resultados aceitos pelas exportações e pelo PDF: os do serviço ou os reenviados pelo cliente
+Resultado = Union[ResultadoRegistro, ResultadoProcessamentoIndividual]
+
+
+class ColunasResultados:
+    """
+    Colunas calculadas pelo motor vetorizado para os resultados de um bloco,
+    alinhadas aos registros; as exportações Arrow/Parquet são montadas
+    direto destes arrays. `sexo` tem índices em SEXOS, as datas são
+    datetime64[D], escores z ausentes são NaN e os códigos de classificação
+    indexam `rotulos` (-1 quando nenhuma regra se aplica), como em
+    LoteCalculado. IMC e escores z já estão arredondados como nos registros.
+    """
+
+    __slots__ = ('id_paciente', 'nome', 'sexo', 'data_nascimento', 'data_avaliacao', 'idade_meses',
+                 'peso_kg', 'altura_cm', 'imc', 'escores_z', 'codigos_classificacao', 'rotulos')
+
+    def __init__(self, id_paciente: List[Optional[str]], nome: List[str], sexo: np.ndarray,
+                 data_nascimento: np.ndarray, data_avaliacao: np.ndarray, idade_meses: np.ndarray,
+                 peso_kg: np.ndarray, altura_cm: np.ndarray, imc: np.ndarray, escores_z: Dict[str, np.ndarray],
+                 codigos_classificacao: Dict[str, np.ndarray], rotulos: Dict[str, List[str]]):
+        self.id_paciente = id_paciente
+        self.nome = nome
+        self.sexo = sexo
+        self.data_nascimento = data_nascimento
+        self.data_avaliacao = data_avaliacao
+        self.idade_meses = idade_meses
+        self.peso_kg = peso_kg
+        self.altura_cm = altura_cm
+        self.imc = imc
+        self.escores_z = escores_z
+        self.codigos_classificacao = codigos_classificacao
+        self.rotulos = rotulos
+
+    def __len__(self) -> int:
+        return len(self.idade_meses)
+
+    @staticmethod
+    def concatenar(blocos: Sequence["ColunasResultados"]) -> "ColunasResultados":
+        """Junta as colunas de vários blocos, unificando os rótulos de classificação de cada indicador."""
+        primeiro = blocos[0]
+        codigos: Dict[str, np.ndarray] = {}
+        rotulos: Dict[str, List[str]] = {}
+        for indicador in primeiro.rotulos:
+            indice: Dict[str, int] = {}
+            partes = []
+            for bloco in blocos:
+                # Código de cada rótulo do bloco na lista unificada; -1 continua -1
+                mapa = np.array([indice.setdefault(r, len(indice)) for r in bloco.rotulos[indicador]] + [-1], dtype=np.int64)
+                partes.append(mapa[bloco.codigos_classificacao[indicador]])
+            rotulos[indicador] = list(indice)
+            codigos[indicador] = np.concatenate(partes)
+        return ColunasResultados(
+            id_paciente=[valor for bloco in blocos for valor in bloco.id_paciente],
+            nome=[valor for bloco in blocos for valor in bloco.nome],
+            sexo=np.concatenate([bloco.sexo for bloco in blocos]),
+            data_nascimento=np.concatenate([bloco.data_nascimento for bloco in blocos]),
+            data_avaliacao=np.concatenate([bloco.data_avaliacao for bloco in blocos]),
+            idade_meses=np.concatenate([bloco.idade_meses for bloco in blocos]),
+            peso_kg=np.concatenate([bloco.peso_kg for bloco in blocos]),
+            altura_cm=np.concatenate([bloco.altura_cm for bloco in blocos]),
+            imc=np.concatenate([bloco.imc for bloco in blocos]),
+            escores_z={indicador: np.concatenate([bloco.escores_z[indicador] for bloco in blocos])
+                       for indicador in primeiro.escores_z},
+            codigos_classificacao=codigos,
+            rotulos=rotulos
+        )
+
+
+class ResultadosLote(list):
+    """
+    Lista de ResultadoRegistro de um lote que também guarda as colunas do
+    motor (ColunasResultados) de cada bloco. As colunas só acompanham a
+    lista montada por `acrescentar`; se algum bloco vier sem elas (caminho
+    linha a linha), `colunas()` devolve None e as exportações usam os
+    registros.
+    """
+
+    __slots__ = ('_blocos',)
+
+    def __init__(self, registros: Iterable[ResultadoRegistro] = (), colunas: Optional[ColunasResultados] = None):
+        super().__init__(registros)
+        if colunas is not None:
+            self._blocos: Optional[List[ColunasResultados]] = [colunas]
+        else:
+            self._blocos = None if self else []
+
+    def acrescentar(self, registros: Sequence[ResultadoRegistro]) -> None:
+        self.extend(registros)
+        if self._blocos is None:
+            return
+        if isinstance(registros, ResultadosLote) and registros._blocos is not None:
+            self._blocos.extend(registros._blocos)
+        elif registros:
+            self._blocos = None
+
+    def colunas(self) -> Optional[ColunasResultados]:
+        if not self._blocos:
+            return None
+        if len(self._blocos) > 1:
+            # Concatena uma vez; as próximas exportações do mesmo lote reaproveitam
+            self._blocos = [ColunasResultados.concatenar(self._blocos)]
+        return self._blocos[0]
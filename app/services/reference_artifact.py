@@ -0,0 +1,100 @@
+# app/services/reference_artifact.py
+
+import json
+import mmap
+import os
+import struct
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.services.reference_snapshot import INDICADORES, SEXOS, ReferenceSnapshot
+
+# Layout do arquivo (little-endian):
+#   MAGICO (8 bytes) | versão (uint32) | tamanho do JSON (uint32) | JSON de metadados
+#   | preenchimento até múltiplo de ALINHAMENTO | arrays float64 nos offsets do JSON
+MAGICO = b"SISVREF\0"
+VERSAO_ARTEFATO = 1
+ALINHAMENTO = 64
+_CABECALHO = struct.Struct("<8sII")
+DTYPE = np.dtype("<f8")
+
+
+def _alinhar(posicao: int) -> int:
+    return -(-posicao // ALINHAMENTO) * ALINHAMENTO
+
+
+def escrever_artefato(caminho: str, snapshot: ReferenceSnapshot, origem: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Grava o snapshot (valores z, LMS e regras de classificação) no formato
+    binário do artefato. A gravação é feita num arquivo temporário e trocada
+    de uma vez, para que processos lendo o artefato antigo não vejam um
+    arquivo pela metade.
+    """
+    arrays = {"valores": snapshot.valores, "lms": snapshot.lms}
+    metadados: Dict[str, Any] = {
+        "versao": VERSAO_ARTEFATO,
+        "criado_em": datetime.now().isoformat(timespec="seconds"),
+        "indicadores": list(INDICADORES),
+        "sexos": list(SEXOS),
+        "origem": origem or {},
+        "regras": snapshot.regras,
+        "arrays": {}
+    }
+
+    # Os offsets dependem do tamanho do JSON, que depende dos offsets: calcula
+    # com uma reserva folgada para os números e repete até estabilizar
+    inicio_dados = 0
+    while True:
+        posicao = inicio_dados
+        for nome, array in arrays.items():
+            metadados["arrays"][nome] = {"offset": posicao, "shape": list(array.shape)}
+            posicao = _alinhar(posicao + array.size * DTYPE.itemsize)
+        json_bytes = json.dumps(metadados, ensure_ascii=False).encode("utf-8")
+        necessario = _alinhar(_CABECALHO.size + len(json_bytes))
+        if necessario == inicio_dados:
+            break
+        inicio_dados = necessario
+
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "wb") as f:
+        f.write(_CABECALHO.pack(MAGICO, VERSAO_ARTEFATO, len(json_bytes)))
+        f.write(json_bytes)
+        for nome, array in arrays.items():
+            f.seek(metadados["arrays"][nome]["offset"])
+            f.write(np.ascontiguousarray(array, dtype=DTYPE).tobytes())
+        f.truncate(posicao)
+    os.replace(temporario, caminho)
+
+
+def carregar_artefato(caminho: str) -> ReferenceSnapshot:
+    """
+    Mapeia o artefato em memória (somente leitura) e monta o snapshot sobre
+    ele: os arrays apontam direto para as páginas do arquivo, compartilhadas
+    pelo cache do sistema operacional entre todos os workers, sem parse.
+    """
+    with open(caminho, "rb") as f:
+        mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(mapa) < _CABECALHO.size:
+        raise ValueError(f"Artefato de referência inválido: {caminho}")
+    magico, versao, tamanho_json = _CABECALHO.unpack_from(mapa, 0)
+    if magico != MAGICO:
+        raise ValueError(f"Artefato de referência inválido: {caminho}")
+    if versao != VERSAO_ARTEFATO:
+        raise ValueError(f"Versão do artefato de referência não suportada ({versao}); gere-o novamente.")
+    metadados = json.loads(mapa[_CABECALHO.size:_CABECALHO.size + tamanho_json].decode("utf-8"))
+    if metadados["indicadores"] != list(INDICADORES) or metadados["sexos"] != list(SEXOS):
+        raise ValueError("Artefato de referência gerado com outra ordem de indicadores/sexos; gere-o novamente.")
+
+    arrays = {}
+    for nome, info in metadados["arrays"].items():
+        shape = tuple(info["shape"])
+        arrays[nome] = np.frombuffer(mapa, dtype=DTYPE, count=int(np.prod(shape)), offset=info["offset"]).reshape(shape)
+
+    regras = {indicador: [tuple(regra) for regra in regras_indicador]
+              for indicador, regras_indicador in metadados["regras"].items()}
+    snapshot = ReferenceSnapshot(arrays["valores"], regras, arrays["lms"])
+    snapshot.caminho_artefato = caminho
+    return snapshot
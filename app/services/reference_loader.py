@@ -0,0 +1,202 @@
+# app/services/reference_loader.py
+
+import csv
+import hashlib
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, delete, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.models import CargaReferencia, TabelaReferenciaSISVAN, TabelaClassificacao
+from app.services.lms import ajustar_lms
+from app.services.reference_snapshot import COLUNAS_LMS, COLUNAS_Z, SEXOS, ReferenceSnapshot, montar_snapshot
+
+DADOS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'sisvan_tables'))
+
+# Arquivos de valores de referência: (arquivo, indicador, sexo, idade inicial em meses).
+# Dentro de um mesmo indicador/sexo, a primeira linha de cada idade prevalece
+# (ex: a idade de 60 meses aparece nos dois arquivos)
+ARQUIVOS_REFERENCIA: List[Tuple[str, str, str, int]] = [
+    (padrao.format(sexo.lower()), indicador, sexo, idade_inicial)
+    for padrao, indicador, idade_inicial in (
+        ("pi_{}_0a59m.csv", "peso_idade", 0), ("pi_{}_60a119m.csv", "peso_idade", 60),
+        ("ei_{}_0a59m.csv", "estatura_idade", 0), ("ei_{}_60a228m.csv", "estatura_idade", 60),
+        ("imci_{}_0a59m.csv", "imc_idade", 0), ("imci_{}_60a228m.csv", "imc_idade", 60),
+    )
+    for sexo in SEXOS
+]
+
+ARQUIVO_REGRAS = "regras_classificacao_sisvan.csv"
+
+COLUNAS_REGRAS = ('indicador', 'idade_min_meses', 'idade_max_meses', 'z_score_min', 'z_score_max', 'classificacao')
+
+
+def checksum_arquivo(caminho: str) -> str:
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def _float_ou_none(valor: str) -> Optional[float]:
+    valor = valor.strip().replace(',', '.')  # Aceita vírgula decimal
+    return float(valor) if valor else None
+
+
+def ler_tabela_referencia(caminho: str, indicador: str, sexo: str, idade_inicial: int) -> List[Dict[str, Any]]:
+    """
+    Lê um CSV de valores de referência (cabeçalho -3..3, uma linha por mês a
+    partir de `idade_inicial`). Linhas malformadas são puladas, mas ainda
+    contam uma idade.
+    """
+    linhas: List[Dict[str, Any]] = []
+    with open(caminho, mode='r', encoding='utf-8-sig') as csvfile:
+        reader = csv.reader(csvfile)
+        next(reader, None)  # Cabeçalho
+        for deslocamento, valores in enumerate(reader):
+            if len(valores) != len(COLUNAS_Z):
+                continue
+            try:
+                linha = {coluna: _float_ou_none(valor) for coluna, valor in zip(COLUNAS_Z, valores)}
+            except ValueError:
+                continue
+            # m/l/s sempre presentes para que todas as linhas usem o mesmo INSERT
+            linha.update(indicador=indicador, sexo=sexo, idade_meses=idade_inicial + deslocamento, m=None, l=None, s=None)
+            linhas.append(linha)
+    return linhas
+
+
+def ler_regras_classificacao(caminho: str) -> List[Dict[str, Any]]:
+    """Lê o CSV de regras de classificação; linhas com valores inválidos são puladas."""
+    regras: List[Dict[str, Any]] = []
+    with open(caminho, mode='r', encoding='utf-8-sig') as csvfile:
+        reader = csv.DictReader(csvfile)
+        if not reader.fieldnames or not all(c in reader.fieldnames for c in COLUNAS_REGRAS):
+            raise ValueError(f"Cabeçalho inválido no arquivo de classificação '{caminho}'.")
+        for row in reader:
+            try:
+                sexo = (row.get('sexo_aplicavel') or '').strip().upper()
+                regras.append({
+                    'indicador': row['indicador'].strip(),
+                    'idade_min_meses': int(row['idade_min_meses'].strip()),
+                    'idade_max_meses': int(row['idade_max_meses'].strip()),
+                    'sexo_aplicavel': sexo if sexo in SEXOS else None,
+                    'z_score_min': float(row['z_score_min'].strip().replace(',', '.')),
+                    'z_score_max': float(row['z_score_max'].strip().replace(',', '.')),
+                    'classificacao': row['classificacao'].strip()
+                })
+            except (AttributeError, ValueError):
+                continue
+    return regras
+
+
+def ler_linhas_referencia(diretorio: str = DADOS_DIR, grupos: Optional[Set[Tuple[str, str]]] = None,
+                          linhas_por_arquivo: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+    """
+    Lê os arquivos de valores de referência (todos ou só os dos grupos
+    indicador/sexo informados). Em idades repetidas entre arquivos do mesmo
+    grupo prevalece o primeiro arquivo. Arquivos ausentes são ignorados.
+    """
+    linhas_referencia: List[Dict[str, Any]] = []
+    vistos: Set[Tuple[str, str, int]] = set()
+    for arquivo, indicador, sexo, idade_inicial in ARQUIVOS_REFERENCIA:
+        caminho = os.path.join(diretorio, arquivo)
+        if (grupos is not None and (indicador, sexo) not in grupos) or not os.path.exists(caminho):
+            continue
+        linhas = [linha for linha in ler_tabela_referencia(caminho, indicador, sexo, idade_inicial)
+                  if (indicador, sexo, linha['idade_meses']) not in vistos]
+        vistos.update((indicador, sexo, linha['idade_meses']) for linha in linhas)
+        if linhas_por_arquivo is not None:
+            linhas_por_arquivo[arquivo] = len(linhas)
+        linhas_referencia.extend(linhas)
+    return linhas_referencia
+
+
+def _ajustar_parametros_lms(linhas: List[Dict[str, Any]]) -> None:
+    """Estima m/l/s das linhas completas de uma só vez (ver app.services.lms.ajustar_lms)."""
+    completas = [linha for linha in linhas if all(linha[c] is not None for c in COLUNAS_Z)]
+    if not completas:
+        return
+    l_valores, m_valores, s_valores = ajustar_lms([[linha[c] for c in COLUNAS_Z] for linha in completas])
+    for linha, l, m, s in zip(completas, l_valores, m_valores, s_valores):
+        linha.update(l=float(l), m=float(m), s=float(s))
+
+
+def carregar_referencias(db: Session, diretorio: str = DADOS_DIR, forcar: bool = False) -> Dict[str, str]:
+    """
+    Carrega os CSVs de `diretorio` no banco de forma idempotente.
+
+    O checksum de cada arquivo fica em CargaReferencia; só os arquivos
+    alterados (ou todos, com `forcar`) são relidos. Para os valores de
+    referência, o indicador/sexo de um arquivo alterado é substituído por
+    inteiro, e as linhas de todos eles entram num único INSERT em lote
+    (executemany); as regras são substituídas da mesma forma. Tudo numa
+    única transação. Retorna o status de cada arquivo ("carregado",
+    "inalterado" ou "ausente").
+    """
+    try:
+        carregados = dict(db.execute(select(CargaReferencia.arquivo, CargaReferencia.checksum)).all())
+        status: Dict[str, str] = {}
+        checksums: Dict[str, str] = {}
+        for arquivo in [a[0] for a in ARQUIVOS_REFERENCIA] + [ARQUIVO_REGRAS]:
+            caminho = os.path.join(diretorio, arquivo)
+            if not os.path.exists(caminho):
+                status[arquivo] = "ausente"
+                continue
+            checksums[arquivo] = checksum_arquivo(caminho)
+            alterado = forcar or carregados.get(arquivo) != checksums[arquivo]
+            status[arquivo] = "carregado" if alterado else "inalterado"
+
+        linhas_por_arquivo: Dict[str, int] = {}
+
+        # Valores de referência: grupos indicador/sexo com algum arquivo alterado
+        grupos = {(indicador, sexo) for arquivo, indicador, sexo, _ in ARQUIVOS_REFERENCIA if status[arquivo] == "carregado"}
+        if grupos:
+            linhas_referencia = ler_linhas_referencia(diretorio, grupos, linhas_por_arquivo)
+            for arquivo in linhas_por_arquivo:
+                # Inclui os arquivos não alterados dos grupos recarregados
+                status[arquivo] = "carregado"
+
+            _ajustar_parametros_lms(linhas_referencia)
+            db.execute(delete(TabelaReferenciaSISVAN).where(or_(*(
+                and_(TabelaReferenciaSISVAN.indicador == indicador, TabelaReferenciaSISVAN.sexo == sexo)
+                for indicador, sexo in grupos
+            ))))
+            if linhas_referencia:
+                db.execute(insert(TabelaReferenciaSISVAN), linhas_referencia)
+
+        if status.get(ARQUIVO_REGRAS) == "carregado":
+            regras = ler_regras_classificacao(os.path.join(diretorio, ARQUIVO_REGRAS))
+            db.execute(delete(TabelaClassificacao))
+            if regras:
+                db.execute(insert(TabelaClassificacao), regras)
+            linhas_por_arquivo[ARQUIVO_REGRAS] = len(regras)
+
+        if linhas_por_arquivo:
+            db.execute(delete(CargaReferencia).where(CargaReferencia.arquivo.in_(list(linhas_por_arquivo))))
+            agora = datetime.now()
+            db.execute(insert(CargaReferencia), [
+                {'arquivo': arquivo, 'checksum': checksums[arquivo], 'linhas': linhas, 'carregado_em': agora}
+                for arquivo, linhas in linhas_por_arquivo.items()
+            ])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return status
+
+
+def snapshot_dos_csvs(diretorio: str = DADOS_DIR) -> ReferenceSnapshot:
+    """Monta o snapshot direto dos CSVs, com os mesmos dados que carregar_referencias grava no banco."""
+    linhas = ler_linhas_referencia(diretorio)
+    _ajustar_parametros_lms(linhas)
+    regras = ler_regras_classificacao(os.path.join(diretorio, ARQUIVO_REGRAS))
+    return montar_snapshot(
+        [(linha['indicador'], linha['sexo'], linha['idade_meses'], *(linha[c] for c in COLUNAS_Z + COLUNAS_LMS))
+         for linha in linhas],
+        [(regra['indicador'], regra['idade_min_meses'], regra['idade_max_meses'],
+          regra['z_score_min'], regra['z_score_max'], regra['classificacao']) for regra in regras]
+    )
@@ -0,0 +1,229 @@
+# app/services/reference_snapshot.py
+
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import TabelaReferenciaSISVAN, TabelaClassificacao
+from app.services.classification_index import ClassificationIndex, RegraClassificacao
+
+# Ordem fixa dos eixos dos arrays densos do snapshot
+INDICADORES = ('peso_idade', 'estatura_idade', 'imc_idade')
+SEXOS = ('M', 'F')
+IDADE_MAXIMA_MESES = 228
+
+# Colunas de valores de referência, na ordem dos escores z (-3 a +3)
+COLUNAS_Z = (
+    'valor_z_neg_3', 'valor_z_neg_2', 'valor_z_neg_1', 'valor_z_0',
+    'valor_z_pos_1', 'valor_z_pos_2', 'valor_z_pos_3'
+)
+
+# Parâmetros LMS, na ordem do último eixo de ReferenceSnapshot.lms
+COLUNAS_LMS = ('l', 'm', 's')
+
+# Mapeia os nomes de tabela usados pelo serviço (ex: 'pi_m') para o indicador do banco
+INDICADOR_MAP = {
+    'pi_m': 'peso_idade', 'pi_f': 'peso_idade',
+    'ei_m': 'estatura_idade', 'ei_f': 'estatura_idade',
+    'imci_m': 'imc_idade', 'imci_f': 'imc_idade'
+}
+
+
+class ReferenceSnapshot:
+    """
+    Cópia em memória das tabelas de referência do SISVAN.
+
+    Os valores de referência ficam num array denso indexado por
+    (indicador, sexo, idade em meses, coluna z), de modo que a consulta
+    no caminho quente é apenas indexação, sem acesso ao banco. Os
+    parâmetros LMS, quando presentes, seguem o mesmo layout em `lms`.
+    """
+
+    def __init__(self, valores: np.ndarray, regras: Dict[str, List[RegraClassificacao]], lms: Optional[np.ndarray] = None):
+        self.valores = valores
+        self.disponivel = ~np.isnan(valores).all(axis=-1)
+        self.lms = lms if lms is not None else np.full(valores.shape[:-1] + (len(COLUNAS_LMS),), np.nan)
+        self.regras = regras
+        self.indices_classificacao = {indicador: ClassificationIndex(regras_indicador)
+                                      for indicador, regras_indicador in regras.items()}
+        # Preenchido quando os arrays vêm de um artefato mapeado em memória
+        self.caminho_artefato: Optional[str] = None
+
+    def __reduce__(self):
+        # Ao ser enviado a outro processo (pool do lote), um snapshot de artefato
+        # é reaberto por mmap no destino em vez de ter os arrays copiados
+        if self.caminho_artefato is not None:
+            from app.services.reference_artifact import carregar_artefato
+            return (carregar_artefato, (self.caminho_artefato,))
+        return (ReferenceSnapshot, (self.valores, self.regras, self.lms))
+
+    @staticmethod
+    def indice_indicador(indicador: str) -> Optional[int]:
+        try:
+            return INDICADORES.index(indicador)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def indice_sexo(sexo: str) -> Optional[int]:
+        try:
+            return SEXOS.index(sexo.upper())
+        except ValueError:
+            return None
+
+    def valores_referencia(self, indicador: str, sexo: str, idade_meses: int) -> Optional[Tuple[Optional[float], ...]]:
+        """Retorna os 7 valores de referência (z -3 a +3) ou None se não houver linha."""
+        i_ind = self.indice_indicador(indicador)
+        i_sexo = self.indice_sexo(sexo)
+        if i_ind is None or i_sexo is None or not 0 <= idade_meses <= IDADE_MAXIMA_MESES:
+            return None
+        if not self.disponivel[i_ind, i_sexo, idade_meses]:
+            return None
+        return tuple(None if np.isnan(v) else float(v) for v in self.valores[i_ind, i_sexo, idade_meses])
+
+    def parametros_lms(self, indicador: str, sexo: str, idade_meses: int) -> Optional[Tuple[float, float, float]]:
+        """Retorna (L, M, S) da idade ou None se os parâmetros não foram carregados."""
+        i_ind = self.indice_indicador(indicador)
+        i_sexo = self.indice_sexo(sexo)
+        if i_ind is None or i_sexo is None or not 0 <= idade_meses <= IDADE_MAXIMA_MESES:
+            return None
+        parametros = self.lms[i_ind, i_sexo, idade_meses]
+        if np.isnan(parametros).any():
+            return None
+        return float(parametros[0]), float(parametros[1]), float(parametros[2])
+
+    def classificar(self, indicador: str, idade_meses: int, z_score: float) -> Optional[str]:
+        """Aplica as regras de classificação (z_score_min < z <= z_score_max) pelo índice compilado."""
+        indice = self.indices_classificacao.get(indicador)
+        return indice.classificar(idade_meses, z_score) if indice else None
+
+
+def _consultas_snapshot() -> Tuple[Select, Select]:
+    """Consultas usadas para montar o snapshot (compartilhadas pelas versões síncrona e assíncrona)."""
+    colunas = [getattr(TabelaReferenciaSISVAN, c) for c in COLUNAS_Z + COLUNAS_LMS]
+    # Ordem decrescente de id: em caso de duplicatas prevalece a primeira linha,
+    # como no .first() das consultas originais
+    consulta_valores = select(
+        TabelaReferenciaSISVAN.indicador,
+        TabelaReferenciaSISVAN.sexo,
+        TabelaReferenciaSISVAN.idade_meses,
+        *colunas
+    ).order_by(TabelaReferenciaSISVAN.id.desc())
+    consulta_regras = select(
+        TabelaClassificacao.indicador,
+        TabelaClassificacao.idade_min_meses,
+        TabelaClassificacao.idade_max_meses,
+        TabelaClassificacao.z_score_min,
+        TabelaClassificacao.z_score_max,
+        TabelaClassificacao.classificacao
+    ).order_by(TabelaClassificacao.id)
+    return consulta_valores, consulta_regras
+
+
+def montar_snapshot(linhas: Sequence[Sequence[Any]], linhas_regras: Sequence[Sequence[Any]]) -> ReferenceSnapshot:
+    """
+    Monta o snapshot a partir de linhas (indicador, sexo, idade, 7 valores z, l, m, s)
+    e regras (indicador, idade mín., idade máx., z mín., z máx., classificação).
+    Em idades repetidas prevalece a última linha.
+    """
+    valores = np.full((len(INDICADORES), len(SEXOS), IDADE_MAXIMA_MESES + 1, len(COLUNAS_Z)), np.nan)
+    lms = np.full((len(INDICADORES), len(SEXOS), IDADE_MAXIMA_MESES + 1, len(COLUNAS_LMS)), np.nan)
+
+    for indicador, sexo, idade_meses, *valores_linha in linhas:
+        i_ind = ReferenceSnapshot.indice_indicador(indicador)
+        i_sexo = ReferenceSnapshot.indice_sexo(str(sexo))
+        if i_ind is None or i_sexo is None or not 0 <= idade_meses <= IDADE_MAXIMA_MESES:
+            continue
+        valores_linha = [np.nan if v is None else v for v in valores_linha]
+        valores[i_ind, i_sexo, idade_meses] = valores_linha[:len(COLUNAS_Z)]
+        lms[i_ind, i_sexo, idade_meses] = valores_linha[len(COLUNAS_Z):]
+
+    regras: Dict[str, List[RegraClassificacao]] = {}
+    for indicador, idade_min, idade_max, z_min, z_max, classificacao in linhas_regras:
+        regras.setdefault(indicador, []).append((idade_min, idade_max, z_min, z_max, str(classificacao)))
+
+    return ReferenceSnapshot(valores, regras, lms)
+
+
+def load_reference_snapshot(db: Session) -> ReferenceSnapshot:
+    """Lê TabelaReferenciaSISVAN e TabelaClassificacao uma única vez e monta o snapshot."""
+    consulta_valores, consulta_regras = _consultas_snapshot()
+    return montar_snapshot(db.execute(consulta_valores).all(), db.execute(consulta_regras).all())
+
+
+async def load_reference_snapshot_async(db: AsyncSession) -> ReferenceSnapshot:
+    """Versão assíncrona de load_reference_snapshot, sem bloquear o event loop durante as consultas."""
+    consulta_valores, consulta_regras = _consultas_snapshot()
+    linhas = (await db.execute(consulta_valores)).all()
+    linhas_regras = (await db.execute(consulta_regras)).all()
+    return montar_snapshot(linhas, linhas_regras)
+
+
+def _snapshot_do_artefato() -> Optional[ReferenceSnapshot]:
+    """Snapshot do artefato de REFERENCE_ARTIFACT_PATH, se configurado (dispensa o banco)."""
+    if not settings.REFERENCE_ARTIFACT_PATH:
+        return None
+    from app.services.reference_artifact import carregar_artefato
+    return carregar_artefato(settings.REFERENCE_ARTIFACT_PATH)
+
+
+_snapshot_atual: Optional[ReferenceSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def get_reference_snapshot(db: Session) -> ReferenceSnapshot:
+    """Retorna o snapshot do processo, carregando-o do banco apenas na primeira chamada."""
+    global _snapshot_atual
+    if _snapshot_atual is None:
+        with _snapshot_lock:
+            if _snapshot_atual is None:
+                _snapshot_atual = _snapshot_do_artefato() or load_reference_snapshot(db)
+    return _snapshot_atual
+
+
+def refresh_reference_snapshot(db: Session) -> ReferenceSnapshot:
+    """Recarrega o snapshot a partir do banco ou do artefato (ex: após popular as tabelas novamente)."""
+    global _snapshot_atual
+    novo_snapshot = _snapshot_do_artefato() or load_reference_snapshot(db)
+    with _snapshot_lock:
+        _snapshot_atual = novo_snapshot
+    return novo_snapshot
+
+
+async def get_reference_snapshot_async(db: AsyncSession) -> ReferenceSnapshot:
+    """
+    Versão assíncrona de get_reference_snapshot. A carga não segura o lock
+    durante as consultas; se duas requisições carregarem ao mesmo tempo,
+    fica o primeiro snapshot publicado.
+    """
+    global _snapshot_atual
+    if _snapshot_atual is None:
+        novo_snapshot = _snapshot_do_artefato() or await load_reference_snapshot_async(db)
+        with _snapshot_lock:
+            if _snapshot_atual is None:
+                _snapshot_atual = novo_snapshot
+    return _snapshot_atual
+
+
+async def refresh_reference_snapshot_async(db: AsyncSession) -> ReferenceSnapshot:
+    """Versão assíncrona de refresh_reference_snapshot."""
+    global _snapshot_atual
+    novo_snapshot = _snapshot_do_artefato() or await load_reference_snapshot_async(db)
+    with _snapshot_lock:
+        _snapshot_atual = novo_snapshot
+    return novo_snapshot
+
+
+def preload_reference_snapshot() -> Optional[ReferenceSnapshot]:
+    """Carrega o artefato na inicialização do processo, se configurado."""
+    global _snapshot_atual
+    snapshot = _snapshot_do_artefato()
+    if snapshot is not None:
+        with _snapshot_lock:
+            _snapshot_atual = snapshot
+    return snapshot
@@ -0,0 +1,69 @@
+# app/services/result_store.py
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.models import ErroLinha
+from app.services.records import ResultadoRegistro
+
+
+class ResultadoArmazenado:
+    """Resultados de um lote guardados no servidor para as exportações."""
+
+    __slots__ = ('handle', 'resultados', 'erros', 'summary', 'expira_em')
+
+    def __init__(self, handle: str, resultados: List[ResultadoRegistro],
+                 erros: List[ErroLinha], summary: Dict[str, Any], expira_em: float):
+        self.handle = handle
+        self.resultados = resultados
+        self.erros = erros
+        self.summary = summary
+        self.expira_em = expira_em
+
+
+class ResultStore:
+    """
+    Guarda em memória os resultados dos lotes sob um identificador (handle),
+    para que as exportações não precisem reenviar o lote inteiro.
+
+    Cada entrada expira `ttl_segundos` após ser guardada; acima de
+    `max_entradas` as mais antigas são descartadas primeiro.
+    """
+
+    def __init__(self, ttl_segundos: int, max_entradas: int):
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[str, ResultadoArmazenado]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def guardar(self, resultados: List[ResultadoRegistro], erros: List[ErroLinha],
+                summary: Dict[str, Any]) -> str:
+        handle = uuid.uuid4().hex
+        agora = time.monotonic()
+        with self._lock:
+            self._remover_expirados(agora)
+            self._entradas[handle] = ResultadoArmazenado(handle, resultados, erros, summary, agora + self.ttl_segundos)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return handle
+
+    def obter(self, handle: str) -> Optional[ResultadoArmazenado]:
+        with self._lock:
+            self._remover_expirados(time.monotonic())
+            return self._entradas.get(handle)
+
+    def _remover_expirados(self, agora: float) -> None:
+        # As entradas estão em ordem de inserção, e portanto de expiração
+        while self._entradas:
+            entrada = next(iter(self._entradas.values()))
+            if entrada.expira_em > agora:
+                break
+            self._entradas.popitem(last=False)
+
+
+# Armazenamento único do servidor
+result_store = ResultStore(settings.RESULT_STORE_TTL_SECONDS, settings.RESULT_STORE_MAX_ENTRIES)
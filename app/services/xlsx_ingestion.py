@@ -0,0 +1,56 @@
+# app/services/xlsx_ingestion.py
+
+import zipfile
+from typing import Any, BinaryIO, Iterator, List, Tuple
+
+from app.services.ingestion_plan import DATE_COLUMNS, NUMBER_COLUMNS, TypedIngestionPlan, colunas_usadas
+
+EXTENSOES_XLSX = ('.xlsx',)
+
+
+def iter_blocos_xlsx(stream: BinaryIO, filename: str, linhas_por_bloco: int) -> Iterator[Tuple[TypedIngestionPlan, List[Tuple[int, Tuple[Any, ...]]]]]:
+    """
+    Lê a planilha ativa de um .xlsx em modo read-only do openpyxl, que
+    percorre o XML da planilha linha a linha sem montar o modelo de células:
+    só o bloco atual fica em memória. A primeira linha não vazia é o
+    cabeçalho; as linhas guardam só as colunas usadas, com as datas e os
+    números já tipados pelo Excel (textos seguem as regras do CSV). O número
+    de cada linha é o da planilha.
+    """
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        wb = load_workbook(stream, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError, OSError) as e:
+        raise ValueError(f"Não foi possível ler o arquivo {filename}: {e}")
+
+    try:
+        linhas = (
+            (line_number, valores)
+            for line_number, valores in enumerate(wb.active.iter_rows(values_only=True), start=1)
+            if any(valor is not None and valor != '' for valor in valores)
+        )
+        primeira = next(linhas, None)
+        if primeira is None:
+            raise ValueError("Arquivo está vazio")
+        cabecalho = [str(valor) if valor is not None else '' for valor in primeira[1]]
+        usadas = colunas_usadas(cabecalho)
+        plano = TypedIngestionPlan([cabecalho[i] for i in usadas], DATE_COLUMNS + NUMBER_COLUMNS)  # Valida os headers obrigatórios
+
+        bloco: List[Tuple[int, Tuple[Any, ...]]] = []
+        for line_number, valores in linhas:
+            bloco.append((line_number, tuple(valores[i] if i < len(valores) else None for i in usadas)))
+            if len(bloco) >= linhas_por_bloco:
+                if not plano.preparado:
+                    plano.preparar([linha for _, linha in bloco])
+                yield plano, bloco
+                bloco = []
+
+        if bloco:
+            if not plano.preparado:
+                plano.preparar([linha for _, linha in bloco])
+            yield plano, bloco
+    finally:
+        # No modo read-only o arquivo fica aberto até a workbook ser fechada
+        wb.close()
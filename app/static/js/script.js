@@ -379,6 +379,8 @@ document.addEventListener('DOMContentLoaded', function () {
                 lastBatchResults.results.push(resultado);
                 lastBatchResults.summary.total_processed += 1;
                 lastBatchResults.summary.success_count += 1;
+                // O handle do servidor não cobre linhas adicionadas aqui
+                lastBatchResults.results_handle = null;
             } else {
                 // Criar nova estrutura de resultados
                 lastBatchResults = {
@@ -414,6 +416,7 @@ document.addEventListener('DOMContentLoaded', function () {
                 lastBatchResults.errors.push(erroLinha);
                 lastBatchResults.summary.total_processed += 1;
                 lastBatchResults.summary.error_count += 1;
+                lastBatchResults.results_handle = null;
                 
                 // Atualizar exibição com os erros
                 displayResults(lastBatchResults);
@@ -625,6 +628,23 @@ document.addEventListener('DOMContentLoaded', function () {
     }
 
 
+    // Envia a exportação pelo handle dos resultados guardados no servidor,
+    // reenviando o lote completo apenas se o handle tiver expirado
+    async function postExport(url, handleBody, fullBody) {
+        const post = body => fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(body),
+        });
+        if (lastBatchResults.results_handle) {
+            const resp = await post({ ...handleBody, results_handle: lastBatchResults.results_handle });
+            if (resp.status !== 404) return resp;
+        }
+        return post(fullBody);
+    }
+
     // Função para baixar os resultados
     function downloadResults(format) {
         if (!lastBatchResults) {
@@ -646,17 +666,14 @@ document.addEventListener('DOMContentLoaded', function () {
             downloadPdfReport(results, summary, escola, turma);
         } else {
             // Para CSV e Excel, usar o endpoint genérico
-            fetch(`/api/export/${format}`, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    results: results,
-                    summary: summary,
-                    escola: escola,
-                    turma: turma
-                }),
+            postExport(`/api/export/${format}`, {
+                escola: escola,
+                turma: turma
+            }, {
+                results: results,
+                summary: summary,
+                escola: escola,
+                turma: turma
             })
             .then(async resp => {
                 if (resp.ok) {
@@ -685,9 +702,12 @@ document.addEventListener('DOMContentLoaded', function () {
 
     // Função para baixar relatório PDF
     function downloadPdfReport(results, summary, escola, turma) {
-        const reportData = {
+        const reportHeader = {
             identifier: escola || 'Relatório Antropométrico',
-            sub_identifier: turma || '',
+            sub_identifier: turma || ''
+        };
+        const reportData = {
+            ...reportHeader,
             batch_results: {
                 success: true,
                 summary: summary,
@@ -696,13 +716,7 @@ document.addEventListener('DOMContentLoaded', function () {
             }
         };
 
-        fetch('/api/export/pdf', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify(reportData),
-        })
+        postExport('/api/export/pdf', reportHeader, reportData)
         .then(async resp => {
             if (resp.ok) {
                 const blob = await resp.blob();
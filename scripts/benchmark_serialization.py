@@ -0,0 +1,94 @@
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+# Adiciona o diretório raiz do projeto ao sys.path para permitir importações de 'app'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.encoders import jsonable_encoder
+
+from app.main import BatchProcessingResponse
+from app.models import SexoEnum
+from app.services.anthropometry_service import AnthropometryService
+from app.services.json_serialization import resposta_lote_json
+from app.services.records import IndividuoRegistro
+from app.services.reference_loader import snapshot_dos_csvs
+
+
+def gerar_resultados(linhas: int, semente: int = 1):
+    """Avalia `linhas` pessoas aleatórias com o motor de lote, como num upload."""
+    rng = random.Random(semente)
+    individuos = []
+    for i in range(linhas):
+        nascimento = date(2005, 1, 1) + timedelta(days=rng.randint(0, 7000))
+        individuos.append((i + 2, IndividuoRegistro(
+            id_paciente=str(i), nome=f"Pessoa {i}", data_nascimento=nascimento,
+            data_avaliacao=nascimento + timedelta(days=rng.randint(0, 228 * 30)),
+            sexo=rng.choice(list(SexoEnum)), peso_kg=Decimal(str(round(rng.uniform(2, 90), 1))),
+            altura_cm=Decimal(str(round(rng.uniform(45, 190), 1)))
+        ), {}))
+    resultados, erros = AnthropometryService(db=None, snapshot=snapshot_dos_csvs()).process_individuals_batch(individuos)
+    summary = {"total_processed": linhas, "success_count": len(resultados), "error_count": len(erros)}
+    return resultados, erros, summary
+
+
+def via_jsonable_encoder(resultados, erros, summary) -> bytes:
+    # Caminho padrão do FastAPI: modelos validados, jsonable_encoder e json.dumps do JSONResponse
+    resposta = BatchProcessingResponse(success=True, summary=summary, results=[r.para_modelo() for r in resultados],
+                                       errors=erros, results_handle="x")
+    return json.dumps(jsonable_encoder(resposta), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def via_model_dump_json(resultados, erros, summary) -> bytes:
+    resposta = BatchProcessingResponse.model_construct(success=True, summary=summary, results=[r.para_modelo() for r in resultados],
+                                                       errors=erros, results_handle="x")
+    return resposta.model_dump_json().encode("utf-8")
+
+
+def via_orjson(resultados, erros, summary) -> bytes:
+    return resposta_lote_json(resultados, erros, summary, "x")
+
+
+CAMINHOS = (
+    ("jsonable_encoder + json.dumps", via_jsonable_encoder),
+    ("model_construct + model_dump_json", via_model_dump_json),
+    ("orjson direto dos registros", via_orjson),
+)
+
+
+def medir(funcao, *args):
+    gc.collect()
+    inicio = time.perf_counter()
+    corpo = funcao(*args)
+    duracao = time.perf_counter() - inicio
+    del corpo
+
+    # Pico de memória numa segunda execução: o tracemalloc deixa tudo mais lento
+    gc.collect()
+    tracemalloc.start()
+    corpo = funcao(*args)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duracao, pico, len(corpo)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara o tempo e o pico de memória da serialização da resposta do lote.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[10_000, 100_000], help="tamanhos de lote a medir")
+    args = parser.parse_args()
+
+    for linhas in args.linhas:
+        resultados, erros, summary = gerar_resultados(linhas)
+        print(f"\n{linhas} linhas")
+        print(f"{'caminho':<36} {'tempo (s)':>10} {'pico (MiB)':>11} {'corpo (MiB)':>12}")
+        for nome, funcao in CAMINHOS:
+            duracao, pico, tamanho = medir(funcao, resultados, erros, summary)
+            print(f"{nome:<36} {duracao:>10.3f} {pico / 2**20:>11.1f} {tamanho / 2**20:>12.1f}")
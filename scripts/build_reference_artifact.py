@@ -0,0 +1,35 @@
+import argparse
+import os
+import sys
+import time
+
+# Adiciona o diretório raiz do projeto ao sys.path para permitir importações de 'app'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.reference_artifact import VERSAO_ARTEFATO, carregar_artefato, escrever_artefato
+from app.services.reference_loader import ARQUIVOS_REFERENCIA, ARQUIVO_REGRAS, DADOS_DIR, checksum_arquivo, snapshot_dos_csvs
+
+# Local padrão do artefato: data/sisvan_reference.bin
+ARTEFATO_PADRAO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'sisvan_reference.bin'))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compila data/sisvan_tables num artefato binário mapeável em memória.")
+    parser.add_argument("--dados", default=DADOS_DIR, help="diretório dos CSVs de referência")
+    parser.add_argument("--saida", default=ARTEFATO_PADRAO, help="caminho do artefato gerado")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    snapshot = snapshot_dos_csvs(args.dados)
+    origem = {
+        arquivo: checksum_arquivo(os.path.join(args.dados, arquivo))
+        for arquivo in [a[0] for a in ARQUIVOS_REFERENCIA] + [ARQUIVO_REGRAS]
+        if os.path.exists(os.path.join(args.dados, arquivo))
+    }
+    escrever_artefato(args.saida, snapshot, origem)
+
+    # Confere o artefato gerado antes de terminar
+    carregado = carregar_artefato(args.saida)
+    print(f"Artefato v{VERSAO_ARTEFATO} gravado em {args.saida} "
+          f"({os.path.getsize(args.saida)} bytes, {int(carregado.disponivel.sum())} linhas de referência) "
+          f"em {time.perf_counter() - inicio:.2f}s.")
+    print(f"Defina REFERENCE_ARTIFACT_PATH={args.saida} para usá-lo na aplicação.")
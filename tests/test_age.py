@@ -0,0 +1,66 @@
+import unittest
+from datetime import date, timedelta
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+from app.models import ResultadoProcessamentoIndividual
+from app.services.age import datas_para_array, descrever_idade, idade_em_meses_e_dias, idades_em_lote
+
+
+def referencia(nascimento: date, avaliacao: date):
+    delta = relativedelta(avaliacao, nascimento)
+    return delta.years * 12 + delta.months, delta.days
+
+
+class TestIdade(unittest.TestCase):
+
+    def setUp(self):
+        # Fins de mês, 29/02 e viradas de ano, em anos bissextos e não bissextos
+        nascimentos = [date(2016, 2, 29), date(2019, 1, 31), date(2020, 1, 30), date(2020, 3, 31),
+                       date(2020, 8, 31), date(2021, 12, 31), date(2000, 2, 29), date(2023, 5, 1)]
+        avaliacoes = [date(2016, 2, 29) + timedelta(days=d) for d in range(0, 3000, 7)]
+        avaliacoes += [date(ano, mes, dia) for ano in (2020, 2023, 2024, 2100)
+                       for mes, dia in ((2, 28), (2, 29) if ano in (2020, 2024) else (3, 1), (3, 30), (3, 31), (4, 30), (12, 31))]
+        self.pares = [(n, a) for n in nascimentos for a in avaliacoes if a >= n]
+
+    def test_escalar_igual_ao_relativedelta(self):
+        for nascimento, avaliacao in self.pares:
+            self.assertEqual(idade_em_meses_e_dias(nascimento, avaliacao), referencia(nascimento, avaliacao),
+                             f"{nascimento} -> {avaliacao}")
+
+    def test_lote_igual_ao_relativedelta(self):
+        meses, dias = idades_em_lote(datas_para_array([n for n, _ in self.pares]),
+                                     datas_para_array([a for _, a in self.pares]))
+        esperado = np.array([referencia(n, a) for n, a in self.pares])
+        np.testing.assert_array_equal(meses, esperado[:, 0])
+        np.testing.assert_array_equal(dias, esperado[:, 1])
+
+    def test_avaliacao_anterior_ao_nascimento(self):
+        with self.assertRaises(ValueError):
+            idade_em_meses_e_dias(date(2020, 1, 2), date(2020, 1, 1))
+
+    def test_descrever_idade(self):
+        self.assertEqual(descrever_idade(0), "0 meses")
+        self.assertEqual(descrever_idade(1), "1 mês")
+        self.assertEqual(descrever_idade(12), "1 ano")
+        self.assertEqual(descrever_idade(27), "2 anos e 3 meses")
+
+    def test_texto_da_idade_gerado_na_serializacao(self):
+        resultado = ResultadoProcessamentoIndividual(
+            nome="Ana", sexo="Feminino", data_nascimento=date(2020, 1, 1), data_avaliacao=date(2022, 2, 1),
+            idade_meses=25, peso_kg=12, altura_cm=88, imc=15.5, indicadores=[]
+        )
+        self.assertIsNone(resultado.idade)
+        dados = resultado.model_dump()
+        self.assertEqual(dados['idade'], "2 anos e 1 mês")
+        self.assertNotIn('idade_meses', dados)
+        self.assertIn('"idade":"2 anos e 1 mês"', resultado.model_dump_json())
+
+        # Resultados reenviados pelo cliente mantêm o texto recebido
+        reenviado = ResultadoProcessamentoIndividual.model_validate(dados)
+        self.assertEqual(reenviado.idade_formatada, "2 anos e 1 mês")
+
+
+if __name__ == '__main__':
+    unittest.main()
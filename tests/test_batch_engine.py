@@ -0,0 +1,148 @@
+import csv
+import os
+import random
+import unittest
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+
+from app.models import IndividuoCreate, SexoEnum
+from app.services.anthropometry_service import AnthropometryService
+from app.services.batch_engine import calcular_lote, fixar_escores_z, interpolar_z_scores
+from app.services.lms import ajustar_lms, z_score_lms
+from app.services.reference_snapshot import ReferenceSnapshot, INDICADORES, SEXOS, IDADE_MAXIMA_MESES
+
+DADOS_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'sisvan_tables')
+
+ARQUIVOS_REFERENCIA = (
+    ("pi_{}_0a59m.csv", "peso_idade", 0), ("pi_{}_60a119m.csv", "peso_idade", 60),
+    ("ei_{}_0a59m.csv", "estatura_idade", 0), ("ei_{}_60a228m.csv", "estatura_idade", 60),
+    ("imci_{}_0a59m.csv", "imc_idade", 0), ("imci_{}_60a228m.csv", "imc_idade", 60),
+)
+
+
+def snapshot_das_tabelas_csv():
+    """Monta um snapshot diretamente dos CSVs de data/sisvan_tables, sem banco."""
+    valores = np.full((len(INDICADORES), len(SEXOS), IDADE_MAXIMA_MESES + 1, 7), np.nan)
+    for padrao, indicador, idade_inicial in ARQUIVOS_REFERENCIA:
+        for i_sexo, sexo in enumerate(SEXOS):
+            with open(os.path.join(DADOS_DIR, padrao.format(sexo.lower())), encoding='utf-8-sig') as f:
+                linhas = list(csv.reader(f))[1:]
+            for deslocamento, linha in enumerate(linhas):
+                valores[INDICADORES.index(indicador), i_sexo, idade_inicial + deslocamento] = [
+                    float(v.replace(',', '.')) for v in linha
+                ]
+    regras = {}
+    with open(os.path.join(DADOS_DIR, 'regras_classificacao_sisvan.csv'), encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            if row['indicador'] == 'indicador':
+                continue
+            regras.setdefault(row['indicador'], []).append((
+                int(row['idade_min_meses']), int(row['idade_max_meses']),
+                float(row['z_score_min']), float(row['z_score_max']), row['classificacao']
+            ))
+    return ReferenceSnapshot(valores, regras)
+
+
+def snapshot_com_lms(snapshot):
+    """Copia o snapshot acrescentando parâmetros LMS ajustados às curvas de DP."""
+    lms = np.full(snapshot.valores.shape[:-1] + (3,), np.nan)
+    completas = ~np.isnan(snapshot.valores).any(axis=-1)
+    l, m, s = ajustar_lms(snapshot.valores[completas], passo_l=0.01)
+    lms[completas] = np.stack([l, m, s], axis=-1)
+    return ReferenceSnapshot(snapshot.valores, snapshot.regras, lms)
+
+
+class TestBatchEngine(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.snapshot = snapshot_das_tabelas_csv()
+        cls.service = AnthropometryService(db=None, snapshot=cls.snapshot)
+
+    def test_interpolacao_igual_a_escalar(self):
+        refs = np.array([[2.0, 2.4, 2.8, 3.2, 3.7, 4.2, 4.8]] * 6)
+        valores = np.array([1.5, 2.0, 2.6, 3.2, 4.8, 5.0])
+        z = interpolar_z_scores(valores, refs)
+        esperado = [self.service._interpolate_z_score(Decimal(str(v)), refs[0]) for v in valores]
+        np.testing.assert_allclose(z, esperado)
+
+    def test_lote_igual_ao_processamento_individual(self):
+        rng = random.Random(42)
+        individuos = []
+        for _ in range(400):
+            nascimento = date(2005, 1, 1) + timedelta(days=rng.randint(0, 7000))
+            avaliacao = nascimento + timedelta(days=rng.randint(0, 7300))
+            individuos.append(IndividuoCreate(
+                nome="Teste", data_nascimento=nascimento, data_avaliacao=avaliacao,
+                sexo=rng.choice([SexoEnum.M, SexoEnum.F]),
+                peso_kg=Decimal(str(round(rng.uniform(2, 90), 1))),
+                altura_cm=Decimal(str(round(rng.uniform(45, 190), 1)))
+            ))
+
+        resultados, erros = self.service.process_individuals_batch([(i, ind, {}) for i, ind in enumerate(individuos)])
+        self.assertEqual(erros, [])
+        for individuo, resultado in zip(individuos, resultados):
+            self.assertEqual(resultado.para_modelo().model_dump(), self.service.process_individual_data(individuo).model_dump())
+
+    def test_empates_no_arredondamento(self):
+        # Erros de float no último bit não podem mudar o arredondamento de um empate
+        self.assertEqual(round(float(fixar_escores_z(-2.9250000000000003)), 2), round(-2.925, 2))
+        self.assertEqual(round(float(fixar_escores_z(2.1250000000000004)), 2), 2.12)
+
+        # P/I exatamente em z = 2.125: o lote dava 2.13 e o individual 2.12
+        individuo = IndividuoCreate(
+            nome="Empate", data_nascimento=date(2023, 1, 1), data_avaliacao=date(2023, 2, 1),
+            sexo=SexoEnum.M, peso_kg=Decimal("5.9"), altura_cm=Decimal("55")
+        )
+        resultados, _ = self.service.process_individuals_batch([(2, individuo, {})])
+        individual = self.service.process_individual_data(individuo)
+        self.assertEqual(individual.indicadores[0].escore_z, 2.12)
+        self.assertEqual(resultados[0].para_modelo().model_dump(), individual.model_dump())
+
+    def test_erro_de_idade_vira_erro_de_linha(self):
+        individuo = IndividuoCreate(
+            nome="Teste", data_nascimento=date(2022, 1, 1), data_avaliacao=date(2021, 1, 1),
+            sexo=SexoEnum.F, peso_kg=Decimal("10"), altura_cm=Decimal("80")
+        )
+        resultados, erros = self.service.process_individuals_batch([(2, individuo, {"nome": "Teste"})])
+        self.assertEqual(resultados, [])
+        self.assertEqual(erros[0].linha, 2)
+
+    def test_formula_lms(self):
+        # Parâmetros OMS de peso para idade, meninos, 0 meses
+        l, m, s = 0.3487, 3.3464, 0.14602
+        self.assertAlmostEqual(z_score_lms(m, l, m, s), 0.0)
+        esperado = ((4.0 / m) ** l - 1) / (l * s)
+        self.assertAlmostEqual(z_score_lms(4.0, l, m, s), esperado)
+        self.assertAlmostEqual(z_score_lms(4.0, 0.0, m, s), np.log(4.0 / m) / s)
+        # Além de +3 DP a versão restrita extrapola linearmente a partir de SD3
+        sd3 = m * (1 + 3 * l * s) ** (1 / l)
+        sd2 = m * (1 + 2 * l * s) ** (1 / l)
+        self.assertAlmostEqual(z_score_lms(sd3 + (sd3 - sd2), l, m, s, restrito=True), 4.0)
+
+    def test_lote_lms_igual_ao_processamento_individual(self):
+        service = AnthropometryService(db=None, snapshot=snapshot_com_lms(self.snapshot))
+        service.z_score_metodo = 'lms'
+        rng = random.Random(7)
+        individuos = [IndividuoCreate(
+            nome="Teste", data_nascimento=date(2015, 1, 1), data_avaliacao=date(2015, 1, 1) + timedelta(days=rng.randint(0, 6900)),
+            sexo=rng.choice([SexoEnum.M, SexoEnum.F]),
+            peso_kg=Decimal(str(round(rng.uniform(2, 90), 1))),
+            altura_cm=Decimal(str(round(rng.uniform(45, 190), 1)))
+        ) for _ in range(200)]
+
+        resultados, _ = service.process_individuals_batch([(i, ind, {}) for i, ind in enumerate(individuos)])
+        for individuo, resultado in zip(individuos, resultados):
+            self.assertEqual(resultado.para_modelo().model_dump(), service.process_individual_data(individuo).model_dump())
+        self.assertTrue(any(abs(ind.escore_z) > 3.1 for r in resultados for ind in r.indicadores))
+
+    def test_colunas_vazias(self):
+        lote = calcular_lote(self.snapshot, np.array([], dtype=np.int64), np.array([], dtype=np.int64),
+                             np.array([]), np.array([]))
+        self.assertEqual(len(lote), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
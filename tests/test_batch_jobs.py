@@ -0,0 +1,96 @@
+import io
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.db.session import get_async_db
+from app.main import app
+from app.services.batch_jobs import STATUS_CANCELADO, BatchJobManager
+from app.services.result_store import result_store
+from tests.test_batch_engine import snapshot_das_tabelas_csv
+from tests.test_batch_stream import CSV_LOTE
+
+
+class TestBatchJobsApi(unittest.TestCase):
+
+    def setUp(self):
+        app.dependency_overrides[get_async_db] = lambda: object()
+        self.patcher = patch('app.services.reference_snapshot._snapshot_atual', snapshot_das_tabelas_csv())
+        self.patcher.start()
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.patcher.stop()
+        app.dependency_overrides.clear()
+
+    def _aguardar(self, job_id):
+        for _ in range(200):
+            status = self.client.get(f"/api/jobs/{job_id}").json()
+            if status["status"] in ("concluido", "falhou"):
+                return status
+            time.sleep(0.05)
+        self.fail("job não terminou")
+
+    def test_job_concluido_igual_ao_lote_sincrono(self):
+        arquivo = {"batchFile": ("lote.csv", CSV_LOTE.encode('utf-8'), "text/csv")}
+        response = self.client.post("/api/jobs/lote", files=arquivo)
+        self.assertEqual(response.status_code, 202)
+
+        status = self._aguardar(response.json()["job_id"])
+        self.assertEqual(status["status"], "concluido")
+        self.assertEqual((status["rows_processed"], status["success_count"], status["error_count"]), (5, 4, 1))
+        self.assertIsNotNone(status["rows_per_second"])
+
+        resultado = self.client.get(f"/api/jobs/{status['job_id']}/resultado").json()
+        sincrono = self.client.post("/api/processar/lote", files=arquivo).json()
+        self.assertNotEqual(resultado.pop("results_handle"), sincrono.pop("results_handle"))
+        self.assertEqual(resultado, sincrono)
+
+    def test_resultado_guardado_uma_vez(self):
+        response = self.client.post("/api/jobs/lote", files={"batchFile": ("lote.csv", CSV_LOTE.encode('utf-8'), "text/csv")})
+        job_id = self._aguardar(response.json()["job_id"])["job_id"]
+        entradas = len(result_store._entradas)
+        handles = {self.client.get(f"/api/jobs/{job_id}/resultado").json()["results_handle"] for _ in range(3)}
+        self.assertEqual(len(handles), 1)
+        self.assertEqual(len(result_store._entradas), entradas)
+
+    def test_job_com_cabecalho_invalido_falha(self):
+        response = self.client.post("/api/jobs/lote", files={"batchFile": ("lote.csv", b"nome,sexo\nAna,F\n", "text/csv")})
+        status = self._aguardar(response.json()["job_id"])
+        self.assertEqual(status["status"], "falhou")
+        self.assertIn("Headers", status["error"])
+        self.assertEqual(self.client.get(f"/api/jobs/{status['job_id']}/resultado").status_code, 400)
+
+    def test_job_inexistente(self):
+        self.assertEqual(self.client.get("/api/jobs/naoexiste").status_code, 404)
+
+
+class TestBatchJobManager(unittest.TestCase):
+
+    def test_encerrar_cancela_jobs_na_fila(self):
+        manager = BatchJobManager(max_workers=1, ttl_segundos=60)
+        liberar = threading.Event()
+        executar = manager._executar
+
+        def executar_bloqueando(job, *args):
+            liberar.wait(5)
+            executar(job, *args)
+
+        with patch.object(manager, '_executar', executar_bloqueando):
+            primeiro = manager.submeter(io.BytesIO(CSV_LOTE.encode('utf-8')), "lote.csv", snapshot_das_tabelas_csv(), 'interpolacao')
+            arquivo = io.BytesIO(CSV_LOTE.encode('utf-8'))
+            segundo = manager.submeter(arquivo, "lote.csv", snapshot_das_tabelas_csv(), 'interpolacao')
+            manager.encerrar()
+            liberar.set()
+
+        self.assertEqual(segundo.status, STATUS_CANCELADO)
+        self.assertTrue(segundo.finalizado)
+        self.assertTrue(arquivo.closed)
+        self.assertNotEqual(primeiro.status, STATUS_CANCELADO)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import io
+import json
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.db.session import get_async_db
+from app.main import app
+from app.services.anthropometry_service import AnthropometryService
+from app.services.parallel_batch import encerrar_pool
+from tests.test_batch_engine import snapshot_das_tabelas_csv
+
+CSV_LOTE = (
+    "nome,data_nascimento,data_avaliacao,sexo,peso_kg,altura_cm\n"
+    "Ana Conceição,2020-01-10,2023-01-10,F,14.2,95.0\n"
+    "João,2019-05-02,2023-05-02,M,16.0,101.3\n"
+    "\"Maria\nda Silva\",2021-03-03,2023-03-03,F,11.5,88.0\n"
+    "Sem Data,,2023-03-03,F,11.5,88.0\n"
+    "Pedro,2018-07-07,2023-07-07,M,\"19,4\",\"110,2\"\n"
+)
+
+
+class TestBatchStream(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.service = AnthropometryService(db=None, snapshot=snapshot_das_tabelas_csv())
+
+    def test_blocos_pequenos_iguais_ao_arquivo_inteiro(self):
+        conteudo = b'\xef\xbb\xbf' + CSV_LOTE.encode('utf-8')
+        esperado = self.service.process_batch_data(conteudo, "lote.csv")
+        # Blocos de 5 bytes quebram caracteres multibyte e linhas ao meio
+        with patch.object(settings, 'UPLOAD_CHUNK_BYTES', 5), patch.object(settings, 'BATCH_CHUNK_ROWS', 2):
+            blocos = list(self.service.iter_batch_stream(io.BytesIO(conteudo), "lote.csv"))
+            resultado = self.service.process_batch_stream(io.BytesIO(conteudo), "lote.csv")
+
+        self.assertEqual(len(blocos), 3)
+        self.assertEqual(resultado, esperado)
+        self.assertEqual(resultado["total_rows_attempted"], 5)
+        self.assertEqual([r.nome for r in resultado["resultados_individuais"]],
+                         ["Ana Conceição", "João", "Maria\nda Silva", "Pedro"])
+        self.assertEqual([e.linha for e in resultado["erros_por_linha"]], [5])
+
+    def test_fins_de_linha_windows_e_mac(self):
+        esperado = self.service.process_batch_stream(io.BytesIO(CSV_LOTE.encode('utf-8')), "lote.csv")
+        for fim in ('\r\n', '\r'):
+            # A quebra dentro do nome entre aspas continua sendo '\n'
+            conteudo = CSV_LOTE.replace('\n', fim).replace('Maria' + fim, 'Maria\n').encode('utf-8')
+            # Com 1 byte por bloco, o '\r\n' sempre chega em dois blocos
+            for tamanho in (1, 7, 1 << 16):
+                with patch.object(settings, 'UPLOAD_CHUNK_BYTES', tamanho):
+                    resultado = self.service.process_batch_stream(io.BytesIO(conteudo), "lote.csv")
+                self.assertEqual(resultado, esperado, (fim, tamanho))
+
+    def test_tsv_sem_bom(self):
+        tsv = CSV_LOTE.replace(',', '\t').replace('"19\t4"', '19.4').replace('"110\t2"', '110.2')
+        resultado = self.service.process_batch_stream(io.BytesIO(tsv.encode('utf-8')), "lote.tsv")
+        self.assertEqual(len(resultado["resultados_individuais"]), 4)
+
+    def test_arquivo_vazio_e_codificacao_invalida(self):
+        with self.assertRaises(ValueError):
+            self.service.process_batch_stream(io.BytesIO(b""), "vazio.csv")
+        with self.assertRaises(ValueError) as contexto:
+            self.service.process_batch_stream(io.BytesIO("nome;sexo\nJos\xe9".encode('latin-1')), "latin1.csv")
+        self.assertIn("UTF-8", str(contexto.exception))
+
+    def test_blocos_em_processos_iguais_ao_sequencial(self):
+        conteudo = CSV_LOTE.encode('utf-8')
+        esperado = self.service.process_batch_stream(io.BytesIO(conteudo), "lote.csv")
+        try:
+            with patch.object(settings, 'BATCH_WORKERS', 2), patch.object(settings, 'BATCH_CHUNK_ROWS', 2):
+                resultado = self.service.process_batch_stream(io.BytesIO(conteudo), "lote.csv")
+        finally:
+            encerrar_pool()
+        self.assertEqual(resultado, esperado)
+        self.assertEqual([e.linha for e in resultado["erros_por_linha"]], [5])
+
+    def test_troca_de_snapshot_nao_cancela_lote_em_andamento(self):
+        conteudo = CSV_LOTE.encode('utf-8')
+        esperado = self.service.process_batch_stream(io.BytesIO(conteudo), "lote.csv")
+        outro = AnthropometryService(db=None, snapshot=snapshot_das_tabelas_csv())
+        try:
+            with patch.object(settings, 'BATCH_WORKERS', 2), patch.object(settings, 'BATCH_CHUNK_ROWS', 1):
+                em_andamento = self.service.iter_batch_stream(io.BytesIO(conteudo), "lote.csv")
+                primeiro = next(em_andamento)
+                # Outro snapshot (como após /api/referencias/recarregar) substitui o pool no meio do lote
+                outro.process_batch_stream(io.BytesIO(conteudo), "lote.csv")
+                blocos = [primeiro] + list(em_andamento)
+        finally:
+            encerrar_pool()
+        self.assertEqual([r for resultados, _ in blocos for r in resultados], esperado["resultados_individuais"])
+
+
+class TestBatchStreamApi(unittest.TestCase):
+
+    def setUp(self):
+        app.dependency_overrides[get_async_db] = lambda: object()
+        self.patcher = patch('app.services.reference_snapshot._snapshot_atual', snapshot_das_tabelas_csv())
+        self.patcher.start()
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.patcher.stop()
+        app.dependency_overrides.clear()
+
+    def test_lote_ndjson(self):
+        with patch.object(settings, 'BATCH_CHUNK_ROWS', 2):
+            response = self.client.post("/api/processar/lote?stream=true",
+                                        files={"batchFile": ("lote.csv", CSV_LOTE.encode('utf-8'), "text/csv")})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("application/x-ndjson"))
+        linhas = [json.loads(linha) for linha in response.text.splitlines()]
+        self.assertEqual([linha["tipo"] for linha in linhas],
+                         ["resultado", "resultado", "resultado", "erro", "resultado", "resumo"])
+        self.assertEqual(linhas[-1]["summary"], {"total_processed": 5, "success_count": 4, "error_count": 1})
+
+        normal = self.client.post("/api/processar/lote",
+                                  files={"batchFile": ("lote.csv", CSV_LOTE.encode('utf-8'), "text/csv")}).json()
+        self.assertEqual([linha["dados"] for linha in linhas if linha["tipo"] == "resultado"], normal["results"])
+
+    def test_lote_ndjson_cabecalho_invalido_ainda_retorna_400(self):
+        response = self.client.post("/api/processar/lote?stream=true",
+                                    files={"batchFile": ("lote.csv", b"nome,sexo\nAna,F\n", "text/csv")})
+        self.assertEqual(response.status_code, 400)
+
+    def test_manual_batch_ndjson(self):
+        pessoa = {"nome": "Ana", "data_nascimento": "2020-01-10", "data_avaliacao": "2023-01-10",
+                  "sexo": "F", "peso_kg": 14.2, "altura_cm": 95.0}
+        response = self.client.post("/api/processar/manual-batch?stream=true", json={"pessoas": [pessoa, pessoa]})
+        linhas = [json.loads(linha) for linha in response.text.splitlines()]
+        self.assertEqual([linha["tipo"] for linha in linhas], ["resultado", "resultado", "resumo"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import csv
+import os
+import unittest
+
+from app.services.classification_index import ClassificationIndex
+
+REGRAS_CSV = os.path.join(os.path.dirname(__file__), '..', 'data', 'sisvan_tables', 'regras_classificacao_sisvan.csv')
+
+
+def ler_regras(indicador):
+    regras = []
+    with open(REGRAS_CSV, encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            if row['indicador'] != indicador:
+                continue
+            regras.append((int(row['idade_min_meses']), int(row['idade_max_meses']),
+                           float(row['z_score_min']), float(row['z_score_max']), row['classificacao']))
+    return regras
+
+
+def classificar_linear(regras, idade, z):
+    """Mesma semântica do filtro SQL original de get_classification_rule."""
+    for idade_min, idade_max, z_min, z_max, classificacao in regras:
+        if idade_min <= idade <= idade_max and z_min < z <= z_max:
+            return classificacao
+    return None
+
+
+class TestClassificationIndex(unittest.TestCase):
+
+    def test_equivalente_ao_filtro_sql(self):
+        zs = [-1000, -3.1, -3.0, -2.999, -2.0, -1.5, 0.0, 1.0, 1.001, 2.0, 2.5, 3.0, 3.1, 999, 1000]
+        for indicador in ('peso_idade', 'estatura_idade', 'imc_idade'):
+            regras = ler_regras(indicador)
+            indice = ClassificationIndex(regras)
+            for idade in (0, 30, 59, 60, 120, 121, 228, 229):
+                for z in zs:
+                    with self.subTest(indicador=indicador, idade=idade, z=z):
+                        self.assertEqual(indice.classificar(idade, z), classificar_linear(regras, idade, z))
+
+    def test_limites_semiabertos(self):
+        indice = ClassificationIndex(ler_regras('imc_idade'))
+        self.assertEqual(indice.classificar(30, -2.0), "Magreza")
+        self.assertEqual(indice.classificar(30, -1.99), "Eutrofia")
+        self.assertEqual(indice.classificar(100, 3.0), "Obesidade")
+        self.assertEqual(indice.classificar(100, 3.01), "Obesidade grave")
+
+
+if __name__ == '__main__':
+    unittest.main()
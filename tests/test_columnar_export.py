@@ -0,0 +1,111 @@
+import io
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.db.session import get_async_db
+from app.main import app
+from app.services.anthropometry_service import AnthropometryService
+from app.services.columnar_export import escrever_arrow_exportacao, escrever_parquet_exportacao, tabela_resultados
+from app.services.parallel_batch import encerrar_pool
+from tests.test_batch_engine import snapshot_das_tabelas_csv
+from tests.test_batch_stream import CSV_LOTE
+from tests.test_export_service import resultado_exemplo
+from tests.test_numeric_mode import individuos_de_teste
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow não instalado")
+class TestColumnarExport(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.snapshot = snapshot_das_tabelas_csv()
+        service = AnthropometryService(db=None, snapshot=cls.snapshot)
+        cls.resultados, _ = service.process_individuals_batch(
+            [(i + 2, individuo, {}) for i, individuo in enumerate(individuos_de_teste(cls.snapshot, 300, semente=5))])
+
+    def test_colunas_tipadas(self):
+        tabela = tabela_resultados(self.resultados, "Escola", None)
+        self.assertEqual(tabela.num_rows, len(self.resultados))
+        self.assertEqual(tabela.column_names[:3], ['escola', 'id_paciente', 'nome'])
+        self.assertEqual(tabela.schema.field('data_nascimento').type, pyarrow.date32())
+        self.assertEqual(tabela.schema.field('idade_meses').type, pyarrow.int32())
+        self.assertTrue(pyarrow.types.is_dictionary(tabela.schema.field('classificacao_imc_idade').type))
+
+        colunas = tabela.to_pydict()
+        for i, resultado in enumerate(self.resultados):
+            self.assertEqual(colunas['idade_meses'][i], resultado.idade_meses)
+            self.assertEqual(colunas['data_avaliacao'][i], resultado.data_avaliacao)
+            self.assertEqual(colunas['imc'][i], resultado.imc)
+            por_tipo = {indicador.tipo[:3]: indicador for indicador in resultado.indicadores}
+            peso_idade = por_tipo.get("Pes")
+            self.assertEqual(colunas['escore_z_peso_idade'][i], peso_idade.escore_z if peso_idade else None)
+            self.assertEqual(colunas['classificacao_peso_idade'][i], peso_idade.classificacao if peso_idade else None)
+
+    def test_colunas_do_motor_iguais_aos_registros(self):
+        # Uma lista comum passa pelos registros; o lote do serviço, pelas colunas do motor
+        esperado = tabela_resultados(list(self.resultados), "Escola", "3A").to_pydict()
+        with patch('app.services.columnar_export.indicadores_por_coluna', side_effect=AssertionError):
+            self.assertEqual(tabela_resultados(self.resultados, "Escola", "3A").to_pydict(), esperado)
+
+    def test_colunas_de_varios_blocos(self):
+        service = AnthropometryService(db=None, snapshot=self.snapshot)
+        conteudo = CSV_LOTE.encode('utf-8')
+        esperado = tabela_resultados(list(service.process_batch_stream(io.BytesIO(conteudo), "lote.csv")["resultados_individuais"]))
+        for workers in (1, 2):
+            with patch.object(settings, 'BATCH_CHUNK_ROWS', 2), patch.object(settings, 'BATCH_WORKERS', workers):
+                try:
+                    resultados = service.process_batch_stream(io.BytesIO(conteudo), "lote.csv")["resultados_individuais"]
+                finally:
+                    encerrar_pool()
+            self.assertIsNotNone(resultados.colunas())
+            self.assertEqual(tabela_resultados(resultados).to_pydict(), esperado.to_pydict())
+
+    def test_resultados_do_cliente(self):
+        # Sem idade em meses e sem A/I: as colunas ficam nulas
+        colunas = tabela_resultados([resultado_exemplo()]).to_pydict()
+        self.assertEqual(colunas['idade_meses'], [None])
+        self.assertEqual(colunas['data_nascimento'], [date(2020, 1, 10)])
+        self.assertEqual(colunas['escore_z_estatura_idade'], [None])
+        self.assertEqual(colunas['classificacao_imc_idade'], ["Eutrofia"])
+
+    def test_arquivos_arrow_e_parquet(self):
+        esperado = tabela_resultados(self.resultados, None, "3A")
+
+        destino = io.BytesIO()
+        escrever_arrow_exportacao(self.resultados, None, "3A", destino)
+        self.assertTrue(pyarrow.ipc.open_file(destino.getvalue()).read_all().equals(esperado))
+
+        destino = io.BytesIO()
+        escrever_parquet_exportacao(self.resultados, None, "3A", destino)
+        lida = pyarrow.parquet.read_table(io.BytesIO(destino.getvalue()))
+        self.assertEqual(lida.to_pydict(), esperado.to_pydict())
+
+    def test_endpoint_por_handle(self):
+        app.dependency_overrides[get_async_db] = lambda: object()
+        try:
+            with patch('app.services.reference_snapshot._snapshot_atual', self.snapshot):
+                client = TestClient(app)
+                lote = client.post("/api/processar/lote",
+                                   files={"batchFile": ("lote.csv", CSV_LOTE.encode('utf-8'), "text/csv")}).json()
+                response = client.post("/api/export/parquet", json={"results_handle": lote["results_handle"]})
+        finally:
+            app.dependency_overrides.clear()
+
+        self.assertEqual(response.status_code, 200)
+        tabela = pyarrow.parquet.read_table(io.BytesIO(response.content))
+        self.assertEqual(tabela.column('nome').to_pylist(), [r["nome"] for r in lote["results"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
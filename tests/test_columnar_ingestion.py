@@ -0,0 +1,162 @@
+import io
+import unittest
+from datetime import date, datetime, time
+from decimal import Decimal
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.db.session import get_async_db
+from app.main import app
+from app.services.anthropometry_service import AnthropometryService
+from app.services.columnar_export import tabela_resultados
+from app.services.ingestion_plan import TypedIngestionPlan
+from app.services.records import EntradaLote
+from tests.test_batch_engine import snapshot_das_tabelas_csv
+from tests.test_batch_stream import CSV_LOTE
+from tests.test_numeric_mode import individuos_de_teste
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class TestTypedIngestionPlan(unittest.TestCase):
+
+    def test_valores_tipados_e_texto(self):
+        plano = TypedIngestionPlan(['CPF', 'Data de Nascimento', 'data_avaliacao', 'sexo', 'Peso (kg)', 'altura_cm'],
+                                   ['data_nascimento', 'peso_kg'])
+        linhas = [(12345678901.0, datetime(2020, 1, 10), '10/01/2023', ' f ', 14.2, '95,5')]
+        plano.preparar(linhas)
+        individuo = plano.parse(2, linhas[0])
+        self.assertEqual(individuo.id_paciente, '12345678901')
+        self.assertEqual(individuo.nome, 'Pessoa 1')
+        self.assertEqual(individuo.data_nascimento, date(2020, 1, 10))
+        self.assertEqual(individuo.data_avaliacao, date(2023, 1, 10))
+        self.assertEqual(individuo.peso_kg, Decimal('14.2'))
+        self.assertEqual(individuo.altura_cm, Decimal('95.5'))
+
+        with self.assertRaisesRegex(ValueError, "peso_kg é obrigatório"):
+            plano.parse(3, (None, date(2020, 1, 10), '10/01/2023', 'F', None, '95'))
+        with self.assertRaisesRegex(ValueError, "peso_kg\n  Input should be a finite number"):
+            plano.parse(3, (None, date(2020, 1, 10), '10/01/2023', 'F', float('nan'), '95'))
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow não instalado")
+class TestColumnarIngestion(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.service = AnthropometryService(db=None, snapshot=snapshot_das_tabelas_csv())
+        cls.esperado = cls.service.process_batch_data(CSV_LOTE.encode('utf-8'), "lote.csv")
+
+    def tabela_lote(self):
+        # O mesmo lote de CSV_LOTE, com datas e medidas tipadas e uma coluna a mais que não é lida
+        return pyarrow.table({
+            'Nome': ["Ana Conceição", "João", "Maria\nda Silva", "Sem Data", "Pedro"],
+            'Data de Nascimento': pyarrow.array([date(2020, 1, 10), date(2019, 5, 2), date(2021, 3, 3), None,
+                                                 date(2018, 7, 7)], type=pyarrow.date32()),
+            'data_avaliacao': pyarrow.array([datetime(2023, 1, 10), datetime(2023, 5, 2), datetime(2023, 3, 3),
+                                             datetime(2023, 3, 3), datetime(2023, 7, 7)], type=pyarrow.timestamp('ms')),
+            'sexo': pyarrow.array(["F", "M", "F", "F", "M"]).dictionary_encode(),
+            'Peso (kg)': [14.2, 16.0, 11.5, 11.5, 19.4],
+            'altura_cm': pyarrow.array([Decimal("95.0"), Decimal("101.3"), Decimal("88.0"), Decimal("88.0"),
+                                        Decimal("110.2")], type=pyarrow.decimal128(5, 1)),
+            'observacao': ["a", "b", "c", "d", "e"],
+        })
+
+    def test_parquet_igual_ao_csv(self):
+        destino = io.BytesIO()
+        pyarrow.parquet.write_table(self.tabela_lote(), destino, row_group_size=2)
+        destino.seek(0)
+        with patch.object(settings, 'BATCH_CHUNK_ROWS', 2):
+            blocos = list(self.service.iter_batch_stream(destino, "lote.parquet"))
+            destino.seek(0)
+            resultado = self.service.process_batch_stream(destino, "lote.parquet")
+
+        self.assertEqual(len(blocos), 3)
+        self.assertEqual(resultado["resultados_individuais"], self.esperado["resultados_individuais"])
+        self.assertEqual([(e.linha, e.erro) for e in resultado["erros_por_linha"]],
+                         [(e.linha, e.erro) for e in self.esperado["erros_por_linha"]])
+        self.assertNotIn('observacao', resultado["erros_por_linha"][0].dados_originais)
+
+    def test_colunas_iguais_a_leitura_linha_a_linha(self):
+        individuos = individuos_de_teste(self.service.snapshot, 400, semente=11)
+        nascimentos = [i.data_nascimento for i in individuos]
+        avaliacoes = [datetime.combine(i.data_avaliacao, time(15, 30)) for i in individuos]
+        sexos = [i.sexo.value for i in individuos]
+        pesos = [float(i.peso_kg) for i in individuos]
+        alturas = [i.altura_cm for i in individuos]
+        # Linhas que a leitura colunar deixa para o parse: ausentes, inválidas e datas invertidas
+        nascimentos[3] = None
+        avaliacoes[5] = datetime(1990, 1, 1)
+        sexos[7], sexos[8] = "X", " masculino "
+        pesos[11], pesos[12], pesos[13] = None, float('nan'), -2.0
+        alturas[17] = Decimal("0.0")
+        tabela = pyarrow.table({
+            'CPF': pyarrow.array([12345678900.0 + i if i % 3 else None for i in range(len(individuos))]),
+            'data_nascimento': pyarrow.array(nascimentos, type=pyarrow.date32()),
+            'data_avaliacao': pyarrow.array(avaliacoes, type=pyarrow.timestamp('us')),
+            'sexo': pyarrow.array(sexos).dictionary_encode(),
+            'peso_kg': pyarrow.array(pesos, type=pyarrow.float64()),
+            'altura_cm': pyarrow.array(alturas, type=pyarrow.decimal128(6, 2)),
+        })
+        destino = io.BytesIO()
+        pyarrow.parquet.write_table(tabela, destino, row_group_size=150)
+
+        def processar():
+            with patch.object(settings, 'BATCH_CHUNK_ROWS', 64):
+                return self.service.process_batch_stream(io.BytesIO(destino.getvalue()), "lote.parquet")
+
+        def linha_a_linha(plano, bloco):
+            return EntradaLote.de_individuos([], []), list(range(len(bloco)))
+
+        resultado = processar()
+        with patch('app.services.anthropometry_service.entrada_do_bloco', linha_a_linha):
+            esperado = processar()
+        self.assertEqual(resultado["resultados_individuais"], esperado["resultados_individuais"])
+        self.assertEqual([(e.linha, e.erro, repr(dict(e.dados_originais))) for e in resultado["erros_por_linha"]],
+                         [(e.linha, e.erro, repr(dict(e.dados_originais))) for e in esperado["erros_por_linha"]])
+        self.assertEqual([e.linha for e in resultado["erros_por_linha"]], [5, 7, 9, 13, 14, 15, 19])
+        self.assertEqual(tabela_resultados(resultado["resultados_individuais"]).to_pydict(),
+                         tabela_resultados(list(esperado["resultados_individuais"])).to_pydict())
+
+    def test_arrow_arquivo_e_stream(self):
+        tabela = self.tabela_lote()
+        for abrir in (pyarrow.ipc.new_file, pyarrow.ipc.new_stream):
+            destino = io.BytesIO()
+            with abrir(destino, tabela.schema) as writer:
+                writer.write_table(tabela)
+            destino.seek(0)
+            resultado = self.service.process_batch_stream(destino, "lote.arrow")
+            self.assertEqual(resultado["resultados_individuais"], self.esperado["resultados_individuais"])
+
+    def test_headers_e_arquivo_invalido(self):
+        destino = io.BytesIO()
+        pyarrow.parquet.write_table(self.tabela_lote().drop_columns(['sexo']), destino)
+        destino.seek(0)
+        with self.assertRaisesRegex(ValueError, "Headers obrigatórios não encontrados: sexo"):
+            self.service.process_batch_stream(destino, "lote.parquet")
+        with self.assertRaisesRegex(ValueError, "Não foi possível ler o arquivo lote.parquet"):
+            self.service.process_batch_stream(io.BytesIO(b"nao e parquet"), "lote.parquet")
+
+    def test_endpoint_aceita_parquet(self):
+        destino = io.BytesIO()
+        pyarrow.parquet.write_table(self.tabela_lote(), destino)
+        app.dependency_overrides[get_async_db] = lambda: object()
+        try:
+            with patch('app.services.reference_snapshot._snapshot_atual', self.service.snapshot):
+                response = TestClient(app).post("/api/processar/lote", files={
+                    "batchFile": ("lote.parquet", destino.getvalue(), "application/vnd.apache.parquet")})
+        finally:
+            app.dependency_overrides.clear()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["summary"]["success_count"], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
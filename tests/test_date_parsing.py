@@ -0,0 +1,40 @@
+import unittest
+from datetime import date, timedelta
+
+from app.services.date_parsing import DateColumnParser, detectar_formato, parse_data_flexivel
+
+
+class TestDateParsing(unittest.TestCase):
+
+    def test_detecta_formato_predominante(self):
+        self.assertEqual(detectar_formato(['15/03/2020', '01/12/2019', '2020-01-01']), '%d/%m/%Y')
+        self.assertEqual(detectar_formato(['2020-03-15', '']), '%Y-%m-%d')
+        self.assertEqual(detectar_formato(['15-03-2020']), '%d-%m-%Y')
+        self.assertIsNone(detectar_formato(['15.03.2020', '']))
+
+    def test_resultado_igual_ao_caminho_flexivel(self):
+        datas = [date(2019, 12, 31) + timedelta(days=d) for d in range(0, 800, 13)]
+        textos = [d.strftime(fmt) for d in datas for fmt in ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y')]
+        textos += ['1/2/2020', '2020-2-1', '29/02/2020']
+        # Dígitos de outros alfabetos passam em str.isdigit; ficam com o caminho flexível
+        textos += ['12/01/202０']
+        for formato in (None, '%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y'):
+            parser = DateColumnParser(formato)
+            for texto in textos:
+                self.assertEqual(parser(texto), parse_data_flexivel(texto), f"{formato}: {texto}")
+
+    def test_datas_invalidas_mantem_mensagem(self):
+        parser = DateColumnParser('%d/%m/%Y')
+        for texto in ('31/02/2020', '15.03.2020', '', '2020-01-0５', '١٢/٠١/٢٠٢٠'):
+            with self.assertRaisesRegex(ValueError, "Formato de data inválido"):
+                parser(texto)
+
+    def test_memoriza_datas_repetidas(self):
+        parser = DateColumnParser('%d/%m/%Y', max_memorizadas=2)
+        for texto in ('10/03/2024', '10/03/2024', '11/03/2024', '12/03/2024'):
+            parser(texto)
+        self.assertEqual(list(parser._memo), ['10/03/2024', '11/03/2024'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+from sqlalchemy import create_engine, exc, text
+
+from app.core.config import settings
+from app.db.pool import AsyncQueuePoolMedido, MetricasPool, QueuePoolMedido, estado_pool, opcoes_engine
+
+
+class TestPoolConexoes(unittest.TestCase):
+
+    def test_opcoes_por_backend(self):
+        opcoes = opcoes_engine("mysql+pymysql://root:@localhost:3306/antropometria_db")
+        self.assertIs(opcoes["poolclass"], QueuePoolMedido)
+        self.assertEqual(opcoes["pool_size"], settings.DB_POOL_SIZE)
+        self.assertEqual(opcoes["pool_recycle"], settings.DB_POOL_RECYCLE)
+        self.assertIs(opcoes_engine("mysql+aiomysql://localhost/db", assincrono=True)["poolclass"], AsyncQueuePoolMedido)
+        self.assertEqual(opcoes_engine("sqlite://"), {"query_cache_size": settings.DB_STATEMENT_CACHE_SIZE})
+
+    def test_metricas_de_checkout(self):
+        metricas = MetricasPool()
+
+        class PoolTeste(QueuePoolMedido):
+            pass
+        PoolTeste.metricas = metricas
+
+        engine = create_engine("sqlite://", poolclass=PoolTeste, pool_size=1, max_overflow=0, pool_timeout=0.05)
+        try:
+            with engine.connect() as conexao:
+                conexao.execute(text("select 1"))
+                estado = estado_pool(engine.pool)
+                with self.assertRaises(exc.TimeoutError):
+                    engine.connect()
+        finally:
+            engine.dispose()
+
+        self.assertEqual((estado["size"], estado["checked_out"]), (1, 1))
+        resumo = metricas.resumo()
+        self.assertEqual((resumo["checkouts"], resumo["timeouts"]), (1, 1))
+        self.assertGreaterEqual(resumo["max_wait_ms"], 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
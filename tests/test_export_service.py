@@ -0,0 +1,62 @@
+import csv
+import io
+import unittest
+from datetime import date
+from decimal import Decimal
+
+from app.models import Indicador, ResultadoProcessamentoIndividual
+from app.services.export_service import classificacoes_por_coluna, escrever_xlsx_exportacao, iter_csv_exportacao
+
+
+def resultado_exemplo(nome="Ana", indicadores=None):
+    return ResultadoProcessamentoIndividual(
+        nome=nome, sexo="F", data_nascimento=date(2020, 1, 10), data_avaliacao=date(2023, 1, 10),
+        idade="3 anos", peso_kg=Decimal("14.2"), altura_cm=Decimal("95.0"), imc=15.73,
+        indicadores=indicadores if indicadores is not None else [
+            Indicador(tipo="Peso-para-Idade (P/I)", valor_observado=Decimal("14.2"), escore_z=0.1,
+                      classificacao="Peso adequado para idade"),
+            Indicador(tipo="IMC-para-Idade (IMC/I)", valor_observado=Decimal("15.73"), escore_z=0.2,
+                      classificacao="Eutrofia"),
+        ]
+    )
+
+
+class TestExportService(unittest.TestCase):
+
+    def test_classificacoes_por_coluna(self):
+        self.assertEqual(classificacoes_por_coluna(resultado_exemplo().indicadores),
+                         ["Peso adequado para idade", "N/A", "Eutrofia"])
+        # Nomes fora do padrão do serviço ainda caem na coluna pelo prefixo
+        outro = [Indicador(tipo="Altura-para-Idade", valor_observado=Decimal("95"), escore_z=0, classificacao="Adequada")]
+        self.assertEqual(classificacoes_por_coluna(outro), ["N/A", "Adequada", "N/A"])
+
+    def test_csv_em_blocos(self):
+        resultados = [resultado_exemplo(f"Pessoa {i}") for i in range(5)]
+        blocos = list(iter_csv_exportacao(resultados, "Escola", None, linhas_por_bloco=2))
+        self.assertEqual(len(blocos), 3)
+
+        linhas = list(csv.reader(io.StringIO(b"".join(blocos).decode('utf-8'))))
+        self.assertEqual(linhas[0][:2], ["Escola", "ID"])
+        self.assertEqual(len(linhas), 6)
+        self.assertEqual(linhas[1], ["Escola", "", "Pessoa 0", "F", "10/01/2020", "10/01/2023", "3 anos",
+                                     "14.2", "95.0", "15.73", "Peso adequado para idade", "N/A", "Eutrofia"])
+
+    def test_xlsx_write_only(self):
+        from openpyxl import load_workbook
+
+        destino = io.BytesIO()
+        escrever_xlsx_exportacao([resultado_exemplo(f"Pessoa {i}") for i in range(3)], None, "3A", destino)
+        ws = load_workbook(destino).active
+        linhas = list(ws.iter_rows(values_only=True))
+        self.assertEqual(ws.title, "Resultados Antropometria")
+        self.assertEqual(len(linhas), 4)
+        self.assertEqual(linhas[0][:2], ("Turma", "ID"))
+        self.assertEqual(linhas[1][2], "Pessoa 0")
+        self.assertEqual(linhas[1][7], 14.2)
+        self.assertTrue(ws["A1"].font.bold)
+        self.assertEqual(ws["A1"].fill.start_color.rgb, "00366092")
+        self.assertEqual(ws.column_dimensions["A"].width, 15)
+
+
+if __name__ == '__main__':
+    unittest.main()
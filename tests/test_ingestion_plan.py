@@ -0,0 +1,59 @@
+import unittest
+from datetime import date
+from decimal import Decimal
+
+from app.models import ErroLinha, SexoEnum
+from app.services.ingestion_plan import IngestionPlan, normalizar_cabecalho
+
+
+class TestIngestionPlan(unittest.TestCase):
+
+    def setUp(self):
+        self.plano = IngestionPlan(['Cartao SUS', 'Nome Completo', 'Data de Nascimento', 'Data da Avaliacao',
+                                    'Gender', 'Peso (kg)', 'Altura (cm)', 'Observação'])
+
+    def test_normaliza_cabecalhos(self):
+        self.assertEqual(normalizar_cabecalho(' Data de Nascimento '), 'data_nascimento')
+        self.assertEqual(normalizar_cabecalho('Peso (kg)'), 'peso_kg')
+        self.assertEqual(normalizar_cabecalho(None), '')
+        self.assertEqual(dict(self.plano.obrigatorios),
+                         {'data_nascimento': 2, 'data_avaliacao': 3, 'sexo': 4, 'peso_kg': 5, 'altura_cm': 6})
+
+    def test_headers_obrigatorios_ausentes(self):
+        with self.assertRaisesRegex(ValueError, "Headers obrigatórios não encontrados: sexo, altura_cm"):
+            IngestionPlan(['nome', 'data_nascimento', 'data_avaliacao', 'peso_kg'])
+
+    def test_parse_de_linha(self):
+        linhas = [['123', ' Ana ', '10/01/2020', '10/01/2023', 'feminino', '14,2', '95', 'x']]
+        self.plano.preparar(linhas)
+        individuo = self.plano.parse(2, linhas[0])
+        self.assertEqual(individuo.id_paciente, '123')
+        self.assertEqual(individuo.nome, 'Ana')
+        self.assertEqual(individuo.data_nascimento, date(2020, 1, 10))
+        self.assertEqual(individuo.sexo, SexoEnum.F)
+        self.assertEqual(individuo.peso_kg, Decimal('14.2'))
+        self.assertEqual(self.plano.parsers_data['data_avaliacao'].formato, '%d/%m/%Y')
+
+        # Sem coluna de nome, usa o nome padrão; valores fora do padrão da coluna ainda são aceitos
+        plano = IngestionPlan(['data_nascimento', 'data_avaliacao', 'sexo', 'peso_kg', 'altura_cm'])
+        plano.preparar([['2020-01-10', '2023-01-10', 'M', '14.2', '95']])
+        individuo = plano.parse(5, ['10/01/2020', '2023-01-10', 'M', '"14,5"', '95'])
+        self.assertEqual(individuo.nome, 'Pessoa 4')
+        self.assertEqual(individuo.data_nascimento, date(2020, 1, 10))
+        self.assertEqual(individuo.peso_kg, Decimal('14.5'))
+
+    def test_erros_e_dados_originais(self):
+        curta = ['', 'Ana', '', '10/01/2023']
+        with self.assertRaisesRegex(ValueError, "data_nascimento é obrigatório"):
+            self.plano.parse(2, curta)
+        with self.assertRaisesRegex(ValueError, "Valor de sexo inválido"):
+            self.plano.parse(2, ['', 'Ana', '2020-01-10', '2023-01-10', 'X', '14', '95'])
+
+        erro = ErroLinha(linha=2, erro="x", dados_originais=self.plano.linha_bruta(curta))
+        self.assertEqual(erro.dados_originais['Nome Completo'], 'Ana')
+        self.assertIsNone(erro.dados_originais['Peso (kg)'])
+        self.assertEqual(len(erro.dados_originais), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import json
+import unittest
+from decimal import Decimal
+
+from app.main import BatchProcessingResponse
+from app.models import ErroLinha, SexoEnum
+from app.services.anthropometry_service import AnthropometryService
+from app.services.batch_streaming import iter_ndjson_lote
+from app.services.json_serialization import resposta_lote_json
+from tests.test_batch_engine import snapshot_das_tabelas_csv
+from tests.test_numeric_mode import individuos_de_teste
+
+
+class TestJsonSerialization(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.snapshot = snapshot_das_tabelas_csv()
+        cls.individuos = individuos_de_teste(cls.snapshot, quantidade=300)
+        cls.erros = [ErroLinha(linha=3, erro="Sexo é obrigatório",
+                               dados_originais={"nome": "Ana", "peso_kg": Decimal("14.2"), "sexo": SexoEnum.F, "cpf": None})]
+
+    def resultados(self, modo):
+        service = AnthropometryService(db=None, snapshot=self.snapshot)
+        service.numeric_mode = modo
+        resultados, _ = service.process_individuals_batch([(i, ind, {}) for i, ind in enumerate(self.individuos)])
+        return resultados
+
+    def test_igual_a_serializacao_pydantic(self):
+        for modo in ('decimal', 'float'):
+            resultados = self.resultados(modo)
+            summary = {"total_processed": len(resultados) + 1, "success_count": len(resultados), "error_count": 1}
+            esperado = BatchProcessingResponse(success=True, summary=summary, results=[r.para_modelo() for r in resultados],
+                                               errors=self.erros, results_handle="abc").model_dump_json()
+            self.assertEqual(json.loads(resposta_lote_json(resultados, self.erros, summary, "abc")), json.loads(esperado))
+
+    def test_ndjson(self):
+        resultados = self.resultados('decimal')[:3]
+        linhas = [json.loads(linha) for linha in iter_ndjson_lote(iter([(resultados, self.erros)]))]
+        self.assertEqual([linha["tipo"] for linha in linhas], ["resultado"] * 3 + ["erro", "resumo"])
+        self.assertEqual(linhas[0]["dados"], json.loads(resultados[0].para_modelo().model_dump_json()))
+        self.assertEqual(linhas[3]["dados"]["dados_originais"], {"nome": "Ana", "peso_kg": "14.2", "sexo": "F", "cpf": None})
+        self.assertEqual(linhas[-1]["summary"], {"total_processed": 4, "success_count": 3, "error_count": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
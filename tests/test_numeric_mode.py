@@ -0,0 +1,91 @@
+import random
+import unittest
+from datetime import date, timedelta
+from decimal import Decimal
+
+from app.models import IndividuoCreate, SexoEnum
+from app.services.anthropometry_service import AnthropometryService
+from app.services.reference_snapshot import INDICADORES, SEXOS
+from tests.test_batch_engine import snapshot_com_lms, snapshot_das_tabelas_csv
+
+
+def individuos_de_teste(snapshot, quantidade=1500, semente=7):
+    """Pessoas aleatórias, metade com peso/altura exatamente sobre uma curva de referência."""
+    rng = random.Random(semente)
+    individuos = []
+    for i in range(quantidade):
+        nascimento = date(2005, 1, 1) + timedelta(days=rng.randint(0, 7000))
+        avaliacao = nascimento + timedelta(days=rng.randint(0, 228 * 30))
+        sexo = rng.choice(list(SexoEnum))
+        peso = Decimal(str(round(rng.uniform(2, 90), 1)))
+        altura = Decimal(str(round(rng.uniform(45, 190), 1)))
+        if i % 2:
+            meses = min((avaliacao - nascimento).days * 12 // 365, 120)
+            curvas = snapshot.valores[INDICADORES.index('peso_idade'), SEXOS.index(sexo.value), meses]
+            if curvas[0] == curvas[0]:  # Não é NaN
+                peso = Decimal(str(curvas[rng.randrange(7)]))
+        individuos.append(IndividuoCreate(nome=f"P{i}", data_nascimento=nascimento, data_avaliacao=avaliacao,
+                                          sexo=sexo, peso_kg=peso, altura_cm=altura))
+    return individuos
+
+
+def resumo(resultado):
+    return (resultado.imc, [(i.tipo, i.escore_z, i.classificacao) for i in resultado.indicadores])
+
+
+class TestNumericMode(unittest.TestCase):
+    """Os modos "decimal" e "float" produzem as mesmas classificações, escores z arredondados e IMC."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.snapshot = snapshot_das_tabelas_csv()
+        cls.individuos = individuos_de_teste(cls.snapshot)
+
+    def servico(self, snapshot, metodo, modo):
+        service = AnthropometryService(db=None, snapshot=snapshot)
+        service.z_score_metodo = metodo
+        service.numeric_mode = modo
+        return service
+
+    def comparar_modos(self, snapshot, metodo):
+        decimal = self.servico(snapshot, metodo, 'decimal')
+        flutuante = self.servico(snapshot, metodo, 'float')
+        for individuo in self.individuos:
+            self.assertEqual(resumo(flutuante.process_individual_data(individuo)),
+                             resumo(decimal.process_individual_data(individuo)), individuo)
+
+        linhas = [(i, individuo, {}) for i, individuo in enumerate(self.individuos)]
+        resultados_decimal, _ = decimal.process_individuals_batch(linhas)
+        resultados_float, _ = flutuante.process_individuals_batch(linhas)
+        self.assertEqual([resumo(r) for r in resultados_float], [resumo(r) for r in resultados_decimal])
+
+    def test_interpolacao(self):
+        self.comparar_modos(self.snapshot, 'interpolacao')
+
+    def test_lms(self):
+        self.comparar_modos(snapshot_com_lms(self.snapshot), 'lms')
+
+    def test_empates(self):
+        # IMC exatamente 15.625 e P/I exatamente em z = 2.125: round() sobre o float divergia do Decimal
+        empates = [
+            IndividuoCreate(nome="IMC", data_nascimento=date(2010, 1, 1), data_avaliacao=date(2023, 2, 1),
+                            sexo=SexoEnum.M, peso_kg=Decimal("44.1"), altura_cm=Decimal("168")),
+            IndividuoCreate(nome="P/I", data_nascimento=date(2023, 1, 1), data_avaliacao=date(2023, 2, 1),
+                            sexo=SexoEnum.M, peso_kg=Decimal("5.9"), altura_cm=Decimal("55")),
+        ]
+        linhas = [(i, individuo, {}) for i, individuo in enumerate(empates)]
+        for modo in ('decimal', 'float'):
+            service = self.servico(self.snapshot, 'interpolacao', modo)
+            for resultado in [service.process_individual_data(i) for i in empates] + service.process_individuals_batch(linhas)[0]:
+                esperado = {"IMC": 15.62, "P/I": 19.5}[resultado.nome]
+                self.assertEqual(resultado.imc, esperado, (modo, resultado.nome))
+                if resultado.nome == "P/I":
+                    self.assertEqual(resultado.indicadores[0].escore_z, 2.12, modo)
+
+    def test_valor_observado_continua_decimal(self):
+        resultado = self.servico(self.snapshot, 'interpolacao', 'float').process_individual_data(self.individuos[0])
+        self.assertTrue(all(isinstance(i.valor_observado, Decimal) for i in resultado.indicadores))
+
+
+if __name__ == '__main__':
+    unittest.main()
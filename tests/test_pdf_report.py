@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+
+from app.services.pdf_report import FilaPdfCheia, PdfRenderPool
+from tests.test_export_service import resultado_exemplo
+
+
+class TestPdfRenderPool(unittest.TestCase):
+
+    def test_renderiza_em_thread_e_em_processo(self):
+        for tipo in ('thread', 'process'):
+            pool = PdfRenderPool(tipo, max_workers=1, max_fila=1)
+            try:
+                pdf = asyncio.run(pool.renderizar("Escola", "Turma", [resultado_exemplo()], []))
+            finally:
+                pool.encerrar()
+            self.assertTrue(pdf.startswith(b"%PDF"))
+            self.assertEqual(pool.metricas()["completed"], 1)
+
+    def test_fila_cheia_recusa(self):
+        pool = PdfRenderPool('thread', max_workers=1, max_fila=1)
+        liberar = threading.Event()
+
+        def gerar_bloqueado(*args):
+            liberar.wait(5)
+            return b"%PDF"
+
+        async def cenario():
+            with patch('app.services.pdf_report.gerar_pdf_relatorio', gerar_bloqueado):
+                tarefas = [asyncio.create_task(pool.renderizar("A", None, [], [])) for _ in range(2)]
+                await asyncio.sleep(0.05)
+                metricas = pool.metricas()
+                with self.assertRaises(FilaPdfCheia):
+                    await pool.renderizar("A", None, [], [])
+                liberar.set()
+                await asyncio.gather(*tarefas)
+                return metricas
+
+        try:
+            metricas = asyncio.run(cenario())
+        finally:
+            pool.encerrar()
+        self.assertEqual((metricas["running"], metricas["queue_depth"]), (1, 1))
+        self.assertEqual(pool.metricas()["rejected"], 1)
+
+    def test_cancelamento_mantem_vaga_ate_o_fim_e_falhas_contadas(self):
+        pool = PdfRenderPool('thread', max_workers=1, max_fila=0)
+        liberar = threading.Event()
+
+        def gerar(identifier, *args):
+            if identifier == "erro":
+                raise RuntimeError("falhou")
+            liberar.wait(5)
+            return b"%PDF"
+
+        async def cenario():
+            with patch('app.services.pdf_report.gerar_pdf_relatorio', gerar):
+                tarefa = asyncio.create_task(pool.renderizar("A", None, [], []))
+                await asyncio.sleep(0.05)
+                tarefa.cancel()
+                await asyncio.sleep(0.05)
+                # O relatório cancelado ainda está em execução e ocupa a única vaga
+                with self.assertRaises(FilaPdfCheia):
+                    await pool.renderizar("A", None, [], [])
+                liberar.set()
+                while pool.metricas()["running"]:
+                    await asyncio.sleep(0.01)
+                with self.assertRaises(RuntimeError):
+                    await pool.renderizar("erro", None, [], [])
+
+        try:
+            asyncio.run(cenario())
+        finally:
+            pool.encerrar()
+        metricas = pool.metricas()
+        self.assertEqual((metricas["completed"], metricas["failed"], metricas["rejected"]), (1, 1, 1))
+        self.assertEqual(metricas["running"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
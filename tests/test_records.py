@@ -0,0 +1,62 @@
+import pickle
+import re
+import unittest
+from datetime import date
+from decimal import Decimal
+
+from app.models import IndividuoCreate, ResultadoProcessamentoIndividual, SexoEnum
+from app.services.anthropometry_service import AnthropometryService
+from app.services.records import IndicadorRegistro, IndividuoRegistro, ResultadoRegistro
+from tests.test_batch_engine import snapshot_das_tabelas_csv
+
+
+def registro_exemplo(**alteracoes):
+    dados = dict(
+        id_paciente="1", nome="Ana", sexo="Feminino", data_nascimento=date(2020, 1, 10),
+        data_avaliacao=date(2023, 2, 11), idade=None, idade_meses=37, peso_kg=Decimal("14.2"),
+        altura_cm=Decimal("95.0"), imc=15.73,
+        indicadores=[IndicadorRegistro("IMC-para-Idade (IMC/I)", 15.734072022160666, 0.41, "Eutrofia")]
+    )
+    dados.update(alteracoes)
+    return ResultadoRegistro(**dados)
+
+
+class TestRecords(unittest.TestCase):
+
+    def test_modelo_igual_ao_validado(self):
+        registro = registro_exemplo()
+        modelo = registro.para_modelo()
+        validado = ResultadoProcessamentoIndividual.model_validate(modelo.model_dump())
+        self.assertEqual(modelo.model_dump_json(), validado.model_dump_json())
+        self.assertEqual(modelo.model_dump()['idade'], "3 anos e 1 mês")
+        self.assertEqual(modelo.indicadores[0].valor_observado, Decimal("15.734072022160666"))
+
+    def test_registro_picklable_e_comparavel(self):
+        registro = registro_exemplo()
+        copia = pickle.loads(pickle.dumps(registro))
+        self.assertEqual(copia, registro)
+        self.assertNotEqual(copia, registro_exemplo(imc=16.0))
+        self.assertEqual(copia.idade_formatada, "3 anos e 1 mês")
+
+    def test_individuo_mantem_restricoes_do_modelo(self):
+        for peso in (Decimal("0"), Decimal("-1"), Decimal("NaN")):
+            dados = dict(id_paciente=None, nome="Ana", data_nascimento=date(2020, 1, 1), data_avaliacao=date(2021, 1, 1),
+                         sexo=SexoEnum.F, peso_kg=peso, altura_cm=Decimal("80"))
+            with self.assertRaises(ValueError) as esperado:
+                IndividuoCreate(**dados)
+            # A mensagem mostrada na linha com erro é a mesma do modelo da API
+            with self.assertRaisesRegex(ValueError, "^" + re.escape(str(esperado.exception)) + "$"):
+                IndividuoRegistro(**dados)
+
+    def test_lote_com_registros_igual_ao_modelo_da_api(self):
+        service = AnthropometryService(db=None, snapshot=snapshot_das_tabelas_csv())
+        dados = dict(id_paciente=None, nome="Ana", data_nascimento=date(2019, 5, 2), data_avaliacao=date(2023, 5, 2),
+                     sexo=SexoEnum.F, peso_kg=Decimal("16.0"), altura_cm=Decimal("101.3"))
+        (registro,), _ = service.process_individuals_batch([(2, IndividuoRegistro(**dados), {})])
+        self.assertIsInstance(registro, ResultadoRegistro)
+        self.assertEqual(registro.para_modelo().model_dump(),
+                         service.process_individual_data(IndividuoCreate(**dados)).model_dump())
+
+
+if __name__ == '__main__':
+    unittest.main()
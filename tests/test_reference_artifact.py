@@ -0,0 +1,72 @@
+import os
+import pickle
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db.session import Base
+from app.services.reference_artifact import carregar_artefato, escrever_artefato
+from app.services.reference_loader import carregar_referencias, snapshot_dos_csvs
+from app.services.reference_snapshot import get_reference_snapshot, load_reference_snapshot
+
+
+class TestArtefatoReferencia(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.snapshot = snapshot_dos_csvs()
+
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.caminho = os.path.join(self.diretorio.name, "referencia.bin")
+        escrever_artefato(self.caminho, self.snapshot, {"teste": "1"})
+
+    def tearDown(self):
+        self.diretorio.cleanup()
+
+    def test_artefato_igual_ao_snapshot(self):
+        artefato = carregar_artefato(self.caminho)
+        np.testing.assert_array_equal(artefato.valores, self.snapshot.valores)
+        np.testing.assert_array_equal(artefato.lms, self.snapshot.lms)
+        self.assertEqual(artefato.regras, self.snapshot.regras)
+        self.assertFalse(artefato.valores.flags.writeable)
+        self.assertEqual(artefato.classificar('imc_idade', 30, 0.0), "Eutrofia")
+
+    def test_pickle_reabre_o_artefato(self):
+        copia = pickle.loads(pickle.dumps(carregar_artefato(self.caminho)))
+        self.assertEqual(copia.caminho_artefato, self.caminho)
+        np.testing.assert_array_equal(copia.valores, self.snapshot.valores)
+
+    def test_arquivo_invalido(self):
+        with open(self.caminho, "r+b") as f:
+            f.write(b"XXXX")
+        with self.assertRaises(ValueError):
+            carregar_artefato(self.caminho)
+
+    def test_snapshot_usa_artefato_configurado(self):
+        with patch.object(settings, 'REFERENCE_ARTIFACT_PATH', self.caminho), \
+                patch('app.services.reference_snapshot._snapshot_atual', None):
+            snapshot = get_reference_snapshot(db=None)
+        self.assertEqual(snapshot.caminho_artefato, self.caminho)
+
+    def test_csvs_iguais_ao_banco(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            carregar_referencias(db)
+            do_banco = load_reference_snapshot(db)
+        finally:
+            db.close()
+        np.testing.assert_array_equal(do_banco.valores, self.snapshot.valores)
+        np.testing.assert_allclose(do_banco.lms, self.snapshot.lms)
+        self.assertEqual(do_banco.regras, self.snapshot.regras)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import Base
+from app.models import TabelaReferenciaSISVAN, TabelaClassificacao
+from app.services.reference_loader import DADOS_DIR, carregar_referencias
+from app.services.reference_snapshot import load_reference_snapshot
+
+
+class TestCargaReferencias(unittest.TestCase):
+
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        shutil.copytree(DADOS_DIR, self.diretorio.name, dirs_exist_ok=True)
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+
+    def tearDown(self):
+        self.db.close()
+        self.diretorio.cleanup()
+
+    def _contar(self, *filtros):
+        return self.db.scalar(select(func.count()).select_from(TabelaReferenciaSISVAN).where(*filtros))
+
+    def test_carga_idempotente(self):
+        status = carregar_referencias(self.db, self.diretorio.name)
+        self.assertEqual(set(status.values()), {"carregado"})
+        # A idade de 60 meses está nos dois arquivos (61 + 60 linhas) e entra uma única vez
+        self.assertEqual(self._contar(TabelaReferenciaSISVAN.indicador == 'peso_idade', TabelaReferenciaSISVAN.sexo == 'M'), 120)
+        self.assertEqual(self.db.scalar(select(func.count()).select_from(TabelaClassificacao)), 26)
+        total = self._contar()
+
+        status = carregar_referencias(self.db, self.diretorio.name)
+        self.assertEqual(set(status.values()), {"inalterado"})
+        self.assertEqual(self._contar(), total)
+
+        snapshot = load_reference_snapshot(self.db)
+        self.assertIsNotNone(snapshot.parametros_lms('peso_idade', 'M', 12))
+        self.assertEqual(snapshot.classificar('imc_idade', 30, 0.0), "Eutrofia")
+
+    def test_apenas_grupo_alterado_e_recarregado(self):
+        carregar_referencias(self.db, self.diretorio.name)
+        with open(os.path.join(self.diretorio.name, "ei_f_60a228m.csv"), "w", encoding="utf-8") as f:
+            f.write("-3,-2,-1,0,1,2,3\n9,9,9,9,9,9,9\n1,2,3,4,5,6,7\n")
+
+        status = carregar_referencias(self.db, self.diretorio.name)
+        self.assertEqual(status["ei_f_60a228m.csv"], "carregado")
+        self.assertEqual(status["ei_f_0a59m.csv"], "carregado")
+        self.assertEqual(status["ei_m_60a228m.csv"], "inalterado")
+        self.assertEqual(status["regras_classificacao_sisvan.csv"], "inalterado")
+        snapshot = load_reference_snapshot(self.db)
+        self.assertEqual(snapshot.valores_referencia('estatura_idade', 'F', 61), (1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0))
+        self.assertIsNone(snapshot.valores_referencia('estatura_idade', 'F', 62))
+        self.assertIsNotNone(snapshot.valores_referencia('estatura_idade', 'M', 62))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.db.session import get_async_db
+from app.main import app
+from app.services.result_store import ResultStore
+from tests.test_batch_engine import snapshot_das_tabelas_csv
+from tests.test_batch_stream import CSV_LOTE
+
+
+class TestResultStore(unittest.TestCase):
+
+    def test_expiracao_e_limite(self):
+        store = ResultStore(ttl_segundos=10, max_entradas=2)
+        with patch('app.services.result_store.time.monotonic', return_value=100.0):
+            primeiro = store.guardar([], [], {})
+            segundo = store.guardar([], [], {})
+            terceiro = store.guardar([], [], {})
+            self.assertIsNone(store.obter(primeiro))
+            self.assertIsNotNone(store.obter(segundo))
+        with patch('app.services.result_store.time.monotonic', return_value=110.0):
+            self.assertIsNone(store.obter(terceiro))
+
+
+class TestExportacaoPorHandle(unittest.TestCase):
+
+    def setUp(self):
+        app.dependency_overrides[get_async_db] = lambda: object()
+        self.patcher = patch('app.services.reference_snapshot._snapshot_atual', snapshot_das_tabelas_csv())
+        self.patcher.start()
+        self.client = TestClient(app)
+        self.lote = self.client.post("/api/processar/lote",
+                                     files={"batchFile": ("lote.csv", CSV_LOTE.encode('utf-8'), "text/csv")}).json()
+
+    def tearDown(self):
+        self.patcher.stop()
+        app.dependency_overrides.clear()
+
+    def test_csv_por_handle_igual_ao_corpo_completo(self):
+        por_handle = self.client.post("/api/export/csv", json={"results_handle": self.lote["results_handle"], "escola": "E1"})
+        completo = self.client.post("/api/export/csv", json={"results": self.lote["results"],
+                                                             "summary": self.lote["summary"], "escola": "E1"})
+        self.assertEqual(por_handle.status_code, 200)
+        self.assertEqual(por_handle.content, completo.content)
+
+    def test_pdf_por_handle(self):
+        response = self.client.post("/api/export/pdf", json={"identifier": "Escola",
+                                                             "results_handle": self.lote["results_handle"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/pdf")
+
+    def test_handle_expirado_ou_ausente(self):
+        self.assertEqual(self.client.post("/api/export/xlsx", json={"results_handle": "expirado"}).status_code, 404)
+        self.assertEqual(self.client.post("/api/export/csv", json={}).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
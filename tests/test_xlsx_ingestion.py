@@ -0,0 +1,78 @@
+import io
+import unittest
+from datetime import date, datetime
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from openpyxl import Workbook
+
+from app.core.config import settings
+from app.db.session import get_async_db
+from app.main import app
+from app.services.anthropometry_service import AnthropometryService
+from tests.test_batch_engine import snapshot_das_tabelas_csv
+from tests.test_batch_stream import CSV_LOTE
+
+
+def planilha_lote(linha_vazia=True):
+    """O lote de CSV_LOTE como planilha: datas e medidas tipadas pelo Excel, com alguns textos."""
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Nome", "Data de Nascimento", "Data da Avaliacao", "Sexo", "Peso (kg)", "Altura (cm)", "Observação"])
+    ws.append(["Ana Conceição", datetime(2020, 1, 10), datetime(2023, 1, 10), "F", 14.2, 95, "x"])
+    ws.append(["João", date(2019, 5, 2), "02/05/2023", "M", 16, "101.3"])
+    if linha_vazia:
+        ws.append([])
+    ws.append(["Maria\nda Silva", datetime(2021, 3, 3), datetime(2023, 3, 3), "f", 11.5, 88.0])
+    ws.append(["Sem Data", None, datetime(2023, 3, 3), "F", 11.5, 88.0])
+    ws.append(["Pedro", datetime(2018, 7, 7), datetime(2023, 7, 7), "Masculino", "19,4", "110,2"])
+    destino = io.BytesIO()
+    wb.save(destino)
+    return destino.getvalue()
+
+
+class TestXlsxIngestion(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.service = AnthropometryService(db=None, snapshot=snapshot_das_tabelas_csv())
+        cls.esperado = cls.service.process_batch_data(CSV_LOTE.encode('utf-8'), "lote.csv")
+
+    def test_xlsx_igual_ao_csv(self):
+        with patch.object(settings, 'BATCH_CHUNK_ROWS', 2):
+            blocos = list(self.service.iter_batch_stream(io.BytesIO(planilha_lote(linha_vazia=False)), "lote.xlsx"))
+            resultado = self.service.process_batch_stream(io.BytesIO(planilha_lote(linha_vazia=False)), "lote.xlsx")
+
+        self.assertEqual(len(blocos), 3)
+        self.assertEqual(resultado["resultados_individuais"], self.esperado["resultados_individuais"])
+        self.assertEqual([(e.linha, e.erro) for e in resultado["erros_por_linha"]],
+                         [(e.linha, e.erro) for e in self.esperado["erros_por_linha"]])
+
+    def test_linhas_vazias_e_numeracao_da_planilha(self):
+        resultado = self.service.process_batch_stream(io.BytesIO(planilha_lote()), "lote.xlsx")
+        self.assertEqual(len(resultado["resultados_individuais"]), 4)
+        # A linha vazia é ignorada, mas o número do erro continua sendo o da planilha
+        self.assertEqual([e.linha for e in resultado["erros_por_linha"]], [6])
+
+    def test_planilha_invalida(self):
+        with self.assertRaisesRegex(ValueError, "Arquivo está vazio"):
+            destino = io.BytesIO()
+            Workbook().save(destino)
+            self.service.process_batch_stream(io.BytesIO(destino.getvalue()), "lote.xlsx")
+        with self.assertRaisesRegex(ValueError, "Não foi possível ler o arquivo lote.xlsx"):
+            self.service.process_batch_stream(io.BytesIO(b"nao e xlsx"), "lote.xlsx")
+
+    def test_endpoint_aceita_xlsx(self):
+        app.dependency_overrides[get_async_db] = lambda: object()
+        try:
+            with patch('app.services.reference_snapshot._snapshot_atual', self.service.snapshot):
+                response = TestClient(app).post("/api/processar/lote", files={
+                    "batchFile": ("lote.xlsx", planilha_lote(), "application/octet-stream")})
+        finally:
+            app.dependency_overrides.clear()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["summary"]["success_count"], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()